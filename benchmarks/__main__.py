@@ -0,0 +1,313 @@
+"""
+Benchmarks for CRUDView's roles, at realistic data sizes.
+
+Run from the repository root::
+
+    just bench
+    python -m benchmarks --rows 10000 100000 1000000 --json results.json
+    python -m benchmarks --compare results.json
+
+The tests app's ``Bookmark`` and ``BookmarkTag`` tables are seeded with the
+given number of rows each, in a SQLite file (``benchmarks/benchmark.sqlite3``,
+or ``$NEAPOLITAN_BENCHMARK_DB``) that's kept between runs, so that only the
+difference is seeded next time.
+
+Each scenario makes a warm-up request, then ``--requests`` timed requests with
+the test client, and a final request counting the queries and tracing the peak
+memory allocated, which aren't timed. Results can be saved with ``--json``,
+and compared with a previous run's with ``--compare``.
+
+``python -m benchmarks.dispatch`` times the view's dispatch alone.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+
+import neapolitan  # noqa: E402
+from tests.models import Bookmark, BookmarkTag  # noqa: E402
+
+SEED_BATCH_SIZE = 10_000
+PAGE_SIZE = 50
+
+
+def seed(rows):
+    """
+    Ensures there are exactly `rows` bookmarks and tags, with primary keys
+    1 to `rows`.
+    """
+    # _raw_delete() avoids loading the rows, for the cascade to the tags.
+    BookmarkTag.objects.filter(pk__gt=rows)._raw_delete(connection.alias)
+    BookmarkTag.objects.filter(bookmark_id__gt=rows)._raw_delete(connection.alias)
+    Bookmark.objects.filter(pk__gt=rows)._raw_delete(connection.alias)
+
+    existing = Bookmark.objects.count()
+    for start in range(existing, rows, SEED_BATCH_SIZE):
+        pks = range(start + 1, min(start + SEED_BATCH_SIZE, rows) + 1)
+        with transaction.atomic():
+            Bookmark.objects.bulk_create(
+                Bookmark(
+                    pk=pk,
+                    url=f"https://example.com/{pk}/",
+                    title=f"Bookmark {pk}",
+                    note="A note. " * (pk % 20),
+                    favourite=pk % 10 == 0,
+                )
+                for pk in pks
+            )
+            BookmarkTag.objects.bulk_create(
+                BookmarkTag(pk=pk, bookmark_id=pk, tag=f"tag-{pk % 100}")
+                for pk in pks
+            )
+        print(f"Seeded {pks[-1]:,} of {rows:,} rows.", end="\r", file=sys.stderr)
+    if existing < rows:
+        print(file=sys.stderr)
+
+
+class Scenarios:
+    """
+    The benchmarked requests, for `rows` rows. Each scenario method returns
+    the client method, path, and data of a request.
+    """
+
+    # (name, method name, the largest number of rows it's run for)
+    scenarios = [
+        ("list", "list", None),
+        ("list-filtered", "list_filtered", None),
+        ("list-unpaginated", "list_unpaginated", 100_000),
+        ("list-related", "list_related", None),
+        ("detail", "detail", None),
+        ("create-get", "create_get", None),
+        ("create-post", "create_post", None),
+        ("update-get", "update_get", None),
+        ("update-post", "update_post", None),
+        ("delete-get", "delete_get", None),
+        ("delete-post", "delete_post", None),
+    ]
+
+    def __init__(self, rows, seed=0):
+        self.rows = rows
+        self.random = random.Random(seed)
+        self.created = 0
+
+    def get_page(self):
+        return self.random.randint(1, max(1, self.rows // PAGE_SIZE))
+
+    def get_pk(self):
+        return self.random.randint(1, self.rows)
+
+    def list(self):
+        return "get", f"/bookmark/?page={self.get_page()}", None
+
+    def list_filtered(self):
+        # One in ten bookmarks is a favourite.
+        page = max(1, self.get_page() // 10)
+        return "get", f"/bookmark/?favourite=true&page={page}", None
+
+    def list_unpaginated(self):
+        return "get", "/unpaginated/", None
+
+    def list_related(self):
+        return "get", f"/bookmarktag/?page={self.get_page()}", None
+
+    def detail(self):
+        return "get", f"/bookmark/{self.get_pk()}/", None
+
+    def create_get(self):
+        return "get", "/bookmark/new/", None
+
+    def create_post(self):
+        self.created += 1
+        data = {
+            "url": f"https://example.com/new/{self.created}/",
+            "title": f"New bookmark {self.created}",
+            "note": "",
+        }
+        return "post", "/bookmark/new/", data
+
+    def update_get(self):
+        return "get", f"/bookmark/{self.get_pk()}/edit/", None
+
+    def update_post(self):
+        pk = self.get_pk()
+        data = {
+            "url": f"https://example.com/{pk}/",
+            "title": f"Bookmark {pk}",
+            "note": "Updated.",
+        }
+        return "post", f"/bookmark/{pk}/edit/", data
+
+    def delete_get(self):
+        return "get", f"/bookmark/{self.get_pk()}/delete/", None
+
+    def delete_post(self):
+        self.created += 1
+        victim = Bookmark.objects.create(
+            url=f"https://example.com/deleted/{self.created}/",
+            title="Deleted",
+        )
+        return "post", f"/bookmark/{victim.pk}/delete/", None
+
+
+def run_scenario(client, make_request, requests):
+    # The requests are made up front, so that any setup isn't timed.
+    warm_up, *timed, profiled = [make_request() for _ in range(requests + 2)]
+
+    def request(method, path, data):
+        response = getattr(client, method)(path, data)
+        if response.status_code not in (200, 302):
+            raise RuntimeError(f"{method.upper()} {path}: {response.status_code}")
+
+    request(*warm_up)
+
+    latencies = []
+    start = time.perf_counter()
+    for args in timed:
+        request_start = time.perf_counter()
+        request(*args)
+        latencies.append(time.perf_counter() - request_start)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            request(*profiled)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "requests_per_second": requests / elapsed,
+        "p50_ms": percentiles[49] * 1000,
+        "p95_ms": percentiles[94] * 1000,
+        "p99_ms": percentiles[98] * 1000,
+        "queries": len(queries),
+        "peak_memory_kib": peak_memory / 1024,
+    }
+
+
+def run(rows_sizes, requests, names=None):
+    call_command("migrate", verbosity=0)
+    client = Client()
+    results = []
+    for rows in rows_sizes:
+        seed(rows)
+        scenarios = Scenarios(rows)
+        for name, method_name, max_rows in scenarios.scenarios:
+            if names and name not in names:
+                continue
+            if max_rows is not None and rows > max_rows and not names:
+                print(f"Skipping {name} for {rows:,} rows.", file=sys.stderr)
+                continue
+            result = run_scenario(
+                client, getattr(scenarios, method_name), requests
+            )
+            results.append({"rows": rows, "scenario": name, **result})
+            print_result(results[-1])
+        # Remove the rows created by the scenarios.
+        seed(rows)
+    return results
+
+
+def print_header():
+    print(
+        f"{'rows':>9}  {'scenario':<18}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}"
+        f"{'p99 ms':>9}{'queries':>9}{'peak KiB':>10}"
+    )
+
+
+def print_result(result, baseline=None):
+    line = (
+        f"{result['rows']:>9,}  {result['scenario']:<18}"
+        f"{result['requests_per_second']:>8.1f}{result['p50_ms']:>9.2f}"
+        f"{result['p95_ms']:>9.2f}{result['p99_ms']:>9.2f}"
+        f"{result['queries']:>9}{result['peak_memory_kib']:>10.0f}"
+    )
+    if baseline is not None:
+        change = (result["p50_ms"] - baseline["p50_ms"]) / baseline["p50_ms"]
+        line += f"  p50 {change:+.0%}"
+        if result["queries"] != baseline["queries"]:
+            line += f", queries {baseline['queries']} -> {result['queries']}"
+    print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description=__doc__.strip().splitlines()[0]
+    )
+    parser.add_argument(
+        "--rows",
+        type=int,
+        nargs="+",
+        default=[10_000],
+        help="The numbers of rows to seed, e.g. 10000 100000 1000000.",
+    )
+    parser.add_argument(
+        "--requests",
+        type=int,
+        default=100,
+        help="The number of timed requests per scenario (at least 2).",
+    )
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        dest="scenarios",
+        help="Run only the named scenario. May be repeated.",
+    )
+    parser.add_argument("--json", help="Save the results to a JSON file.")
+    parser.add_argument(
+        "--compare", help="Compare the results with those in a JSON file."
+    )
+    args = parser.parse_args(argv)
+    if args.requests < 2:
+        parser.error("--requests must be at least 2.")
+
+    baselines = {}
+    if args.compare:
+        with open(args.compare) as f:
+            for result in json.load(f)["results"]:
+                baselines[result["rows"], result["scenario"]] = result
+
+    print_header()
+    results = run(sorted(args.rows), args.requests, args.scenarios)
+
+    if baselines:
+        print(f"\nCompared with {args.compare}:")
+        print_header()
+        for result in results:
+            baseline = baselines.get((result["rows"], result["scenario"]))
+            if baseline is not None:
+                print_result(result, baseline)
+
+    if args.json:
+        metadata = {
+            "neapolitan": neapolitan.__version__,
+            "django": django.__version__,
+            "python": platform.python_version(),
+            "database": connection.vendor,
+            "requests": args.requests,
+        }
+        with open(args.json, "w") as f:
+            json.dump({"metadata": metadata, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
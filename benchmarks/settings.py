@@ -0,0 +1,19 @@
+import os
+from pathlib import Path
+
+from tests.settings import *  # noqa: F401, F403
+
+# A file, rather than an in-memory database, so that seeded rows persist
+# between runs.
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.environ.get(
+            "NEAPOLITAN_BENCHMARK_DB",
+            Path(__file__).resolve().parent / "benchmark.sqlite3",
+        ),
+    },
+}
+DEBUG = False
+ALLOWED_HOSTS = ["testserver"]
+ROOT_URLCONF = "benchmarks.urls"
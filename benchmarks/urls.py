@@ -0,0 +1,30 @@
+from neapolitan.views import CRUDView, Role
+
+from tests.models import Bookmark, BookmarkTag
+
+
+class BookmarkView(CRUDView):
+    model = Bookmark
+    fields = ["url", "title", "note"]
+    filterset_fields = ["favourite"]
+    ordering = ["pk"]
+    paginate_by = 50
+
+
+class UnpaginatedBookmarkView(BookmarkView):
+    paginate_by = None
+    url_base = "unpaginated"
+
+
+class BookmarkTagView(CRUDView):
+    model = BookmarkTag
+    fields = ["bookmark", "tag"]
+    ordering = ["pk"]
+    paginate_by = 50
+
+
+urlpatterns = [
+    *BookmarkView.get_urls(),
+    *UnpaginatedBookmarkView.get_urls(roles={Role.LIST}),
+    *BookmarkTagView.get_urls(roles={Role.LIST, Role.DETAIL}),
+]
@@ -0,0 +1,17 @@
+from django.apps import AppConfig
+from django.core import checks
+from django.db.models.signals import post_migrate
+
+
+class NeapolitanConfig(AppConfig):
+    name = "neapolitan"
+
+    def ready(self):
+        from neapolitan.checks import check_ordering_indexes
+        from neapolitan.search import create_search_indexes
+
+        checks.register(check_ordering_indexes, checks.Tags.urls)
+
+        post_migrate.connect(
+            create_search_indexes, dispatch_uid="neapolitan:search:create"
+        )
@@ -0,0 +1,301 @@
+"""
+Caching of rendered list rows and pages.
+
+With ``row_cache = True``, each row of a ``CRUDView``'s list table is stored in
+Django's cache framework, keyed by the view class and the object's primary key.
+Cached rows are invalidated when the object is saved or deleted, via
+``post_save`` and ``post_delete``, and by ``CRUDView.objects_changed()``. Each
+entry also records a fingerprint of the view's fields, the object's
+``last_modified_field`` value (if set), and the active language and script
+prefix, so rows are never served for a different configuration.
+
+With ``list_cache = True``, whole LIST responses are cached, keyed by the
+request's path, the view's ``as_view()`` initkwargs, and the normalised query
+string. Entries record the model's list version, a counter
+bumped by the same signals and ``objects_changed()``. An entry for an older
+version is stale: one request re-renders it, while the others are served the
+stale response in the meantime.
+"""
+
+import collections
+import hashlib
+import time
+
+from django.core.cache import caches
+from django.core.exceptions import EmptyResultSet
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.http import HttpResponse
+from django.urls import get_script_prefix
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from django.utils.translation import get_language
+
+ROW_KEY = "neapolitan:row:{label}:{pk}"
+LIST_KEY = "neapolitan:list:{label}:{digest}"
+LIST_VERSION_KEY = "neapolitan:list-version:{model}"
+
+# How long a request may take to re-render a stale list before another
+# request takes over.
+REFRESH_TIMEOUT = 30
+
+# The headers stored with cached list responses.
+LIST_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+# The (cache alias, view label) pairs caching rows, and the aliases caching
+# lists, by model.
+_row_caches = collections.defaultdict(set)
+_list_caches = collections.defaultdict(set)
+_connected_models = set()
+
+
+def get_view_label(view_class):
+    return f"{view_class.__module__}.{view_class.__qualname__}"
+
+
+def _connect_signals(model):
+    if model not in _connected_models:
+        uid = f"neapolitan:cache:{model._meta.label}"
+        post_save.connect(_invalidate_saved, sender=model, dispatch_uid=uid)
+        post_delete.connect(_invalidate_saved, sender=model, dispatch_uid=uid)
+        _connected_models.add(model)
+
+
+def register_row_cache(view_class, alias):
+    """
+    Registers the view class as caching rows of its model, in the cache
+    ``alias``, connecting the invalidation signals for the model.
+    """
+    _connect_signals(view_class.model)
+    _row_caches[view_class.model].add((alias, get_view_label(view_class)))
+
+
+def register_list_cache(view_class, alias):
+    """
+    Registers the view class as caching lists of its model, in the cache
+    ``alias``, connecting the invalidation signals for the model.
+    """
+    _connect_signals(view_class.model)
+    _list_caches[view_class.model].add(alias)
+
+
+def _describe(value):
+    # A stable description of an initkwarg value: querysets by their SQL, and
+    # classes and functions by name, rather than by their repr().
+    if isinstance(value, QuerySet):
+        try:
+            return (value.model._meta.label, str(value.query))
+        except EmptyResultSet:
+            return (value.model._meta.label, None)
+    if isinstance(value, dict):
+        return tuple((key, _describe(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(_describe(item) for item in value)
+    if isinstance(value, type) or callable(value):
+        return getattr(value, "__module__", None), getattr(value, "__qualname__", None)
+    return value
+
+
+def get_initkwargs_fingerprint(initkwargs):
+    """
+    Returns a digest of a view's ``as_view()`` initkwargs, so that views of
+    the same class configured differently don't share cached lists. Returns
+    None for views configured by their class alone.
+    """
+    if not initkwargs:
+        return None
+    key = repr(sorted((name, _describe(value)) for name, value in initkwargs.items()))
+    return hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()
+
+
+def get_list_cache_key(view):
+    """
+    Returns the cache key for the view's LIST response to the current request.
+
+    The key varies by the request's path and the view's ``as_view()``
+    initkwargs, so that each URL routed to the view class has its own entries.
+    The query string is normalised, sorting the parameters and dropping empty
+    ones, so that equivalent queries share an entry.
+    """
+    query = sorted(
+        (name, value)
+        for name, values in view.request.GET.lists()
+        for value in values
+        if value
+    )
+    key = repr(
+        (
+            view.request.path,
+            getattr(view, "initkwargs_fingerprint", None),
+            query,
+            tuple(view.fields),
+            view.get_paginate_by(),
+            get_language(),
+            get_script_prefix(),
+        )
+    )
+    digest = hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()
+    return LIST_KEY.format(label=get_view_label(type(view)), digest=digest)
+
+
+def invalidate_rows(model, pks):
+    """
+    Deletes the cached rows of all views of the ``model`` for the given
+    primary keys.
+    """
+    keys = collections.defaultdict(list)
+    for alias, label in _row_caches.get(model, ()):
+        keys[alias].extend(ROW_KEY.format(label=label, pk=pk) for pk in pks)
+    for alias, alias_keys in keys.items():
+        caches[alias].delete_many(alias_keys)
+
+
+def invalidate_lists(model):
+    """
+    Bumps the list version of the ``model``, so that its cached lists are
+    stale.
+    """
+    for alias in _list_caches.get(model, ()):
+        _bump_list_version(caches[alias], model)
+
+
+def _invalidate_saved(sender, instance, **kwargs):
+    invalidate_rows(sender, [instance.pk])
+    invalidate_lists(sender)
+
+
+def _get_list_version(cache, model):
+    key = LIST_VERSION_KEY.format(model=model._meta.label)
+    version = cache.get(key)
+    if version is None:
+        # Start from the time, rather than 0, so that entries cached against an
+        # evicted counter aren't taken as current.
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_list_version(cache, model):
+    key = LIST_VERSION_KEY.format(model=model._meta.label)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # The counter isn't set, so there's no current version to bump.
+        _get_list_version(cache, model)
+
+
+class RowCache:
+    """
+    Gets and sets the rendered rows of a view's list. ``selectable`` is
+    whether the rows have checkboxes for the bulk roles.
+    """
+
+    def __init__(self, view, selectable=False):
+        self.cache = caches[view.row_cache_alias]
+        self.timeout = view.row_cache_timeout
+        self.label = get_view_label(type(view))
+        self.last_modified_field = view.last_modified_field
+        self.context = (
+            tuple(view.fields),
+            selectable,
+            get_language(),
+            get_script_prefix(),
+        )
+
+    def get_fingerprint(self, object):
+        version = None
+        if self.last_modified_field is not None:
+            version = getattr(object, self.last_modified_field)
+        key = repr((*self.context, version))
+        return hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()
+
+    def render(self, objects, render_row):
+        """
+        Returns the rows for the ``objects``, rendering those that aren't
+        cached, or are stale, with ``render_row``, and caching them.
+        """
+        objects = list(objects)
+        keys = [ROW_KEY.format(label=self.label, pk=obj.pk) for obj in objects]
+        cached = self.cache.get_many(keys)
+        rows = []
+        missing = {}
+        for key, obj in zip(keys, objects):
+            fingerprint = self.get_fingerprint(obj)
+            entry = cached.get(key)
+            if entry is not None and entry[0] == fingerprint:
+                rows.append(entry[1])
+            else:
+                row = render_row(obj)
+                rows.append(row)
+                missing[key] = (fingerprint, str(row))
+        if missing:
+            self.cache.set_many(missing, self.timeout)
+        return rows
+
+
+class ListCache:
+    """
+    Gets and sets a view's cached LIST response for the current request.
+
+    The model's list version is read on creation, before the list is
+    rendered, so that a change during rendering leaves the stored entry
+    stale.
+    """
+
+    def __init__(self, view):
+        self.request = view.request
+        self.cache = caches[view.list_cache_alias]
+        self.timeout = view.list_cache_timeout
+        self.key = view.get_list_cache_key()
+        self.lock_key = f"{self.key}:refresh"
+        self.version = _get_list_version(self.cache, view.model)
+
+    def get_response(self):
+        """
+        Returns the cached response, or None if the list should be rendered:
+        because it isn't cached, or because it's stale and this request is to
+        refresh it.
+        """
+        entry = self.cache.get(self.key)
+        if entry is None:
+            return None
+        version, content, headers = entry
+        if version != self.version and self.cache.add(
+            self.lock_key, True, REFRESH_TIMEOUT
+        ):
+            return None
+
+        # Validate the client's copy against the cached headers, as for a
+        # rendered response.
+        response = get_conditional_response(
+            self.request,
+            etag=headers.get("ETag"),
+            last_modified=parse_http_date_safe(headers.get("Last-Modified", "")),
+        )
+        if response is None:
+            response = HttpResponse(content)
+        for name, value in headers.items():
+            response.headers[name] = value
+        return response
+
+    def set_response(self, response):
+        """
+        Caches the response, once it's rendered, if it's a 200 OK.
+        """
+
+        def store(response):
+            if response.status_code == 200:
+                headers = {
+                    name: response[name]
+                    for name in LIST_HEADERS
+                    if response.has_header(name)
+                }
+                entry = (self.version, response.content, headers)
+                self.cache.set(self.key, entry, self.timeout)
+            self.cache.delete(self.lock_key)
+
+        if hasattr(response, "add_post_render_callback") and not response.is_rendered:
+            response.add_post_render_callback(store)
+        elif not response.streaming:
+            store(response)
+        return response
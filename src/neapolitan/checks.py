@@ -0,0 +1,52 @@
+"""
+System checks for the CRUD views in the URLconf.
+"""
+
+from django.conf import settings
+from django.core import checks
+
+from neapolitan.indexes import is_indexed, resolve_field
+
+
+def check_ordering_fields(view):
+    """
+    Returns a warning for each of the ``view``'s ``ordering_fields`` that
+    doesn't lead an index declared on its model.
+    """
+    warnings = []
+    for name in view.ordering_fields or ():
+        resolved = resolve_field(view.model, name)
+        if resolved is None:
+            continue
+        model, field = resolved
+        if not is_indexed(model, field):
+            warnings.append(
+                checks.Warning(
+                    f"{type(view).__qualname__}.ordering_fields includes "
+                    f"{name!r}, which has no index.",
+                    hint=(
+                        f"Add an index on {model._meta.label}.{field.name}, or "
+                        "remove the field: ordering by it sorts every matching "
+                        "row."
+                    ),
+                    obj=type(view),
+                    id="neapolitan.W001",
+                )
+            )
+    return warnings
+
+
+def check_ordering_indexes(app_configs=None, **kwargs):
+    from neapolitan.views import get_crud_views
+
+    if not getattr(settings, "ROOT_URLCONF", None):
+        return []
+    warnings = []
+    checked = set()
+    for view in get_crud_views():
+        if app_configs is not None and view.model._meta.app_config not in app_configs:
+            continue
+        if type(view) not in checked:
+            checked.add(type(view))
+            warnings.extend(check_ordering_fields(view))
+    return warnings
@@ -0,0 +1,73 @@
+"""
+Streaming serializers for the EXPORT role.
+
+Each export format provides an encoder: given the exported field names, it
+returns a header and a function encoding a single ``values_list()`` row. The
+rows are encoded as they're read, one chunk of ``chunk_size`` rows at a time,
+so that they're never all held in memory.
+"""
+
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+class _Buffer:
+    # A file-like object for csv.writer, returning each written line rather
+    # than storing it.
+    def write(self, value):
+        return value
+
+
+def csv_encoder(fields):
+    """
+    CSV, with a header row of the field names.
+    """
+    writer = csv.writer(_Buffer())
+    return writer.writerow(fields), writer.writerow
+
+
+def jsonl_encoder(fields):
+    """
+    JSON Lines, one object per row, keyed by the field names.
+    """
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    return "", lambda row: encoder.encode(dict(zip(fields, row))) + "\n"
+
+
+# Export formats: (encoder, content type) by file extension.
+EXPORT_FORMATS = {
+    "csv": (csv_encoder, "text/csv; charset=utf-8"),
+    "jsonl": (jsonl_encoder, "application/jsonl; charset=utf-8"),
+}
+
+
+def stream_rows(encoder, fields, rows, chunk_size):
+    """
+    Yields the encoded ``rows``, in chunks of ``chunk_size`` rows.
+    """
+    header, encode = encoder(fields)
+    chunk = [header] if header else []
+    for row in rows:
+        chunk.append(encode(row))
+        if len(chunk) >= chunk_size:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+async def astream_rows(encoder, fields, rows, chunk_size):
+    """
+    Async version of ``stream_rows()``, for an async iterable of ``values()``
+    dicts of the ``fields``.
+    """
+    header, encode = encoder(fields)
+    chunk = [header] if header else []
+    async for row in rows:
+        chunk.append(encode([row[field] for field in fields]))
+        if len(chunk) >= chunk_size:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
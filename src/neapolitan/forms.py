@@ -0,0 +1,194 @@
+"""
+Forms used by ``CRUDView`` for the bulk, import, and grid roles.
+"""
+
+import os
+from functools import partial
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.forms.models import (
+    BaseModelFormSet,
+    ModelChoiceIterator,
+    modelformset_factory,
+)
+from django.forms.utils import pretty_name
+from django.utils.translation import gettext_lazy as _
+
+
+class ImportForm(forms.Form):
+    """
+    The upload form for the IMPORT role. If no format is chosen, it's taken
+    from the file's extension.
+    """
+
+    file = forms.FileField(label=_("File"))
+    format = forms.ChoiceField(label=_("Format"), required=False)
+
+    def __init__(self, *args, formats, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.formats = list(formats)
+        self.fields["format"].choices = [
+            ("", _("From the file extension")),
+            *((name, name.upper()) for name in self.formats),
+        ]
+
+    def clean(self):
+        cleaned_data = super().clean()
+        file = cleaned_data.get("file")
+        if file is not None and not cleaned_data.get("format"):
+            extension = os.path.splitext(file.name)[1].lstrip(".").lower()
+            if extension not in self.formats:
+                raise forms.ValidationError(
+                    _("Choose the format of the file."), code="format"
+                )
+            cleaned_data["format"] = extension
+        return cleaned_data
+
+
+def bulk_update_form_factory(form_class, fields):
+    """
+    Returns a subclass of ``form_class`` for the BULK_UPDATE role.
+
+    The form has only the given ``fields``, and a ``bulk_fields`` field,
+    choosing which of them to apply. The other fields are not validated, so
+    they may be left blank, even if they're required.
+    """
+
+    class BulkUpdateForm(form_class):
+        bulk_fields = forms.MultipleChoiceField(
+            label=_("Fields to update"),
+            widget=forms.CheckboxSelectMultiple,
+        )
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            for name in list(self.fields):
+                if name != "bulk_fields" and name not in fields:
+                    del self.fields[name]
+            self.fields["bulk_fields"].choices = [
+                (name, self.fields[name].label or pretty_name(name))
+                for name in fields
+                if name in self.fields
+            ]
+            self.order_fields(["bulk_fields"])
+
+        def full_clean(self):
+            super().full_clean()
+            if not self.is_bound:
+                return
+            applied = set(self.cleaned_data.get("bulk_fields", ()))
+            for name in list(self._errors):
+                if name in self.fields and name not in {"bulk_fields", *applied}:
+                    del self._errors[name]
+
+        def get_bulk_values(self):
+            """
+            Returns the cleaned values of the fields chosen to be applied.
+            """
+            applied = self.cleaned_data["bulk_fields"]
+            return {name: self.cleaned_data[name] for name in applied}
+
+    BulkUpdateForm.__name__ = f"Bulk{form_class.__name__}"
+    BulkUpdateForm.__qualname__ = BulkUpdateForm.__name__
+    return BulkUpdateForm
+
+
+class _SharedChoiceIterator(ModelChoiceIterator):
+    # Iterates choices fetched once, and shared by the forms of a formset, in
+    # the choices dict, by field name.
+    def __init__(self, field, choices, name):
+        super().__init__(field)
+        self.choices = choices
+        self.name = name
+
+    def _get_choices(self):
+        if self.name not in self.choices:
+            self.choices[self.name] = list(super().__iter__())
+        return self.choices[self.name]
+
+    def __iter__(self):
+        return iter(self._get_choices())
+
+    def __len__(self):
+        return len(self._get_choices())
+
+    def __bool__(self):
+        return bool(self._get_choices())
+
+
+class _ObjectChoiceField(forms.ModelChoiceField):
+    # Chooses from a list of objects by primary key, without a query.
+    def __init__(self, objects, **kwargs):
+        super().__init__(queryset=None, **kwargs)
+        self.objects = {str(obj.pk): obj for obj in objects}
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            return self.objects[str(value)]
+        except KeyError:
+            raise ValidationError(
+                self.error_messages["invalid_choice"], code="invalid_choice"
+            )
+
+
+class GridFormSet(BaseModelFormSet):
+    """
+    The formset for the GRID role, editing a list of objects, such as a page
+    of the list view, rather than a queryset.
+
+    Forms that haven't changed aren't validated, and the submitted primary
+    keys must be those of the objects. The choices of the forms'
+    ``ModelChoiceField`` fields are fetched once, when first rendered, and
+    shared by all of the forms, so each field must choose from the same
+    queryset in every form.
+    """
+
+    def __init__(self, *args, **kwargs):
+        # The shared choices, by field name.
+        self._choices = {}
+        super().__init__(*args, **kwargs)
+
+    def get_queryset(self):
+        if not hasattr(self, "_queryset"):
+            self._queryset = list(self.queryset)
+        return self._queryset
+
+    def get_form_kwargs(self, index):
+        kwargs = super().get_form_kwargs(index)
+        kwargs["empty_permitted"] = True
+        return kwargs
+
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        name = self.model._meta.pk.name
+        field = form.fields[name]
+        if isinstance(field, forms.ModelChoiceField):
+            form.fields[name] = _ObjectChoiceField(
+                self.get_queryset(),
+                initial=field.initial,
+                required=field.required,
+                widget=field.widget,
+            )
+        for field_name, field in form.fields.items():
+            if field_name != name and isinstance(field, forms.ModelChoiceField):
+                field.iterator = partial(
+                    _SharedChoiceIterator, choices=self._choices, name=field_name
+                )
+                field.widget.choices = field.choices
+
+
+def grid_formset_factory(form_class):
+    """
+    Returns a ``GridFormSet`` subclass for the GRID role, with a form of
+    ``form_class`` for each object, and no forms for adding objects.
+    """
+    return modelformset_factory(
+        form_class._meta.model,
+        form=form_class,
+        formset=GridFormSet,
+        extra=0,
+        edit_only=True,
+    )
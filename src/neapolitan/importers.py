@@ -0,0 +1,91 @@
+"""
+Readers for the IMPORT role.
+
+Each reader takes a text file, and yields ``(line number, data)`` pairs, one
+row at a time, so that the file is never read into memory as a whole. ``data``
+is a dict of form data, keyed by field name, or ``None`` if the row can't be
+parsed.
+"""
+
+import csv
+import json
+
+from django.utils.translation import gettext as _
+
+
+def read_csv(file):
+    """
+    Reads CSV, with a header row of field names. A malformed row, such as one
+    with an unterminated quote, ends the file.
+    """
+    reader = csv.DictReader(file)
+    try:
+        for data in reader:
+            # Values beyond the header are collected under the None key.
+            data.pop(None, None)
+            yield reader.line_num, data
+    except csv.Error:
+        yield reader.line_num, None
+
+
+def read_jsonl(file):
+    """
+    Reads JSON Lines, one object per line, keyed by field name. Blank lines are
+    skipped.
+    """
+    for line_number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            data = None
+        yield line_number, data if isinstance(data, dict) else None
+
+
+# Import formats: readers by file extension.
+IMPORT_FORMATS = {
+    "csv": read_csv,
+    "jsonl": read_jsonl,
+}
+
+
+class ImportResult:
+    """
+    The outcome of an import: the number, and primary keys, of the objects
+    created, and the errors of the rows that weren't.
+
+    Only the first ``max_errors`` rows' errors are kept. ``error_count`` is the
+    total number of rows with errors.
+    """
+
+    max_errors = 100
+
+    def __init__(self):
+        self.created = 0
+        self.created_pks = []
+        self.error_count = 0
+        self.errors = []
+
+    def __repr__(self):
+        return "<ImportResult: %d created, %d errors>" % (
+            self.created,
+            self.error_count,
+        )
+
+    def add_created(self, objects):
+        self.created += len(objects)
+        # Primary keys aren't set by bulk_create() on some databases.
+        self.created_pks.extend(obj.pk for obj in objects if obj.pk is not None)
+
+    def add_error(self, line_number, errors):
+        """
+        Records the errors, a dict of lists of messages by field name, for the
+        row at ``line_number``.
+        """
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((line_number, errors))
+
+    def add_invalid_row(self, line_number):
+        self.add_error(line_number, {"__all__": [_("The row could not be read.")]})
@@ -0,0 +1,257 @@
+"""
+Finding the columns CRUD views query by that have no index.
+
+A view queries its model by its ``lookup_field``, for the object roles, and
+by its filters, ordering, ``ordering_fields``, and ``search_fields``, for the
+list. Each of those columns should lead an index, declared on the model (a
+primary key, unique or ``db_index`` field, ``Meta.indexes``, or a unique
+constraint) or found in the database, else the queries read, and maybe sort,
+every row. The ``suggest_indexes`` management command reports them, and the
+``neapolitan.W001`` system check warns of unindexed ``ordering_fields``.
+"""
+
+from typing import NamedTuple
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections, models, router
+from django.db.models import UniqueConstraint
+
+from neapolitan.search import ContainsBackend, PostgresBackend, SQLiteFTS5Backend
+
+
+class MissingIndex(NamedTuple):
+    """
+    A field of ``model`` with no index, that the ``view`` queries by, for the
+    ``reason``, such as ``"filter"``.
+    """
+
+    model: type
+    field: str
+    view: object
+    reason: str
+
+
+def resolve_field(model, name):
+    """
+    Returns the (model, field) pair a field name or lookup, such as
+    ``"bookmark__title"`` or ``"-title"``, refers to, following relations.
+    Returns None for names that aren't fields, such as transforms or
+    expressions, and for many-valued relations.
+    """
+    if not isinstance(name, str):
+        return None
+    parts = name.lstrip("-").split("__")
+    for i, part in enumerate(parts):
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return None
+        if not field.concrete or field.many_to_many:
+            return None
+        if i < len(parts) - 1:
+            if not field.is_relation:
+                # A transform or lookup, such as "date__year".
+                return (model, field)
+            model = field.related_model
+    return (model, field)
+
+
+def get_declared_indexes(model):
+    """
+    Returns the column tuples of the indexes declared on the ``model``.
+    """
+    opts = model._meta
+    columns = []
+    for field in opts.concrete_fields:
+        if field.primary_key or field.unique or field.db_index:
+            columns.append((field.column,))
+
+    def add(names):
+        columns.append(
+            tuple(opts.get_field(name.lstrip("-")).column for name in names)
+        )
+
+    for index in opts.indexes:
+        if index.fields and index.condition is None:
+            add(index.fields)
+    for constraint in opts.constraints:
+        if (
+            isinstance(constraint, UniqueConstraint)
+            and constraint.fields
+            and constraint.condition is None
+        ):
+            add(constraint.fields)
+    for names in opts.unique_together:
+        add(names)
+    for names in getattr(opts, "index_together", ()):
+        add(names)
+    return columns
+
+
+def get_database_indexes(model, using):
+    """
+    Returns the column tuples of the indexes on the ``model``'s table in the
+    database ``using``, or None if the table doesn't exist.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if table not in connection.introspection.table_names(cursor):
+            return None
+        constraints = connection.introspection.get_constraints(cursor, table)
+    return [
+        tuple(constraint["columns"])
+        for constraint in constraints.values()
+        if constraint["columns"]
+        and (constraint["index"] or constraint["unique"] or constraint["primary_key"])
+    ]
+
+
+def is_indexed(model, field, using=None):
+    """
+    Returns whether the ``model``'s ``field`` leads an index, declared on the
+    model or, if ``using`` is given, in that database.
+    """
+    indexes = get_declared_indexes(model)
+    if using is not None:
+        indexes += get_database_indexes(model, using) or []
+    return any(columns[0] == field.column for columns in indexes)
+
+
+def get_query_fields(view):
+    """
+    Returns (name, reason) pairs for the fields the ``view`` queries by.
+    """
+    names = []
+    if view.lookup_field != "pk":
+        names.append((view.lookup_field, "lookup_field"))
+
+    filterset_class = getattr(view, "filterset_class", None)
+    filterset_fields = getattr(view, "filterset_fields", None)
+    if filterset_class is not None:
+        for filter in filterset_class.base_filters.values():
+            names.append((filter.field_name, "filter"))
+    elif filterset_fields:
+        names.extend((name, "filter") for name in filterset_fields)
+
+    ordering = view.get_ordering() or view.model._meta.ordering
+    if ordering:
+        names.append((ordering[0], "ordering"))
+    names.extend((name, "ordering_fields") for name in view.ordering_fields or ())
+    return names
+
+
+def find_missing_indexes(view):
+    """
+    Returns a `MissingIndex` for each field the ``view`` queries by that
+    doesn't lead an index, on the model or in the database.
+    """
+    missing = []
+    for name, reason in get_query_fields(view):
+        resolved = resolve_field(view.model, name)
+        if resolved is None:
+            continue
+        model, field = resolved
+        if not is_indexed(model, field, router.db_for_read(model)):
+            missing.append(MissingIndex(model, field.name, view, reason))
+    return missing
+
+
+def check_search_index(view):
+    """
+    Returns a message describing what the ``view``'s search lacks to use an
+    index, or None.
+    """
+    if not view.search_fields:
+        return None
+    backend = view.get_search_backend()
+    connection = connections[backend.using]
+    if isinstance(backend, SQLiteFTS5Backend):
+        with connection.cursor() as cursor:
+            tables = connection.introspection.table_names(cursor)
+        if backend.table not in tables:
+            return (
+                f"the search table {backend.table} doesn't exist. Run migrate and "
+                "rebuild_search_index."
+            )
+    elif isinstance(backend, PostgresBackend):
+        if not any(index.expressions for index in view.model._meta.indexes):
+            return (
+                "no GinIndex on a SearchVector of the search fields is declared "
+                "on the model."
+            )
+    elif isinstance(backend, ContainsBackend):
+        if connection.vendor == "postgresql":
+            return (
+                "icontains search reads every row, unless the search fields have "
+                'trigram indexes: GinIndex(opclasses=["gin_trgm_ops"]).'
+            )
+        return "icontains search reads every row."
+    return None
+
+
+def get_sample_queries(view, page_size=20):
+    """
+    Returns (name, queryset) pairs of queries representative of the
+    ``view``'s: the first page of the list, the object lookup, the list
+    filtered by each of its filters, with a value from the table, and ordered
+    by each of its ``ordering_fields``.
+    """
+    queryset = view.get_queryset()
+    page_size = view.paginate_by or page_size
+    queries = [("list", queryset[:page_size])]
+    for name, reason in get_query_fields(view):
+        if reason == "ordering" or resolve_field(view.model, name) is None:
+            continue
+        name = name.lstrip("-")
+        if reason == "ordering_fields":
+            ordered = queryset.order_by(name, view.lookup_field)
+            queries.append((f"order by {name}", ordered[:page_size]))
+            continue
+        value = (
+            queryset.exclude(**{f"{name}__isnull": True})
+            .values_list(name, flat=True)
+            .first()
+        )
+        if value is None:
+            continue
+        if reason == "lookup_field":
+            queries.append(("detail", queryset.filter(**{name: value})))
+        else:
+            queries.append(
+                (f"filter {name}", queryset.filter(**{name: value})[:page_size])
+            )
+    return queries
+
+
+def get_plan_problems(plan, vendor, filtered=True):
+    """
+    Returns the problems in an EXPLAIN ``plan``, for SQLite and PostgreSQL:
+    reading the whole table, for a ``filtered`` query, and sorting.
+    """
+    problems = []
+    if vendor == "sqlite":
+        scans = [
+            line
+            for line in plan.splitlines()
+            if "SCAN " in line and "USING" not in line and "INDEX" not in line
+        ]
+        if filtered and scans:
+            problems.append("full table scan")
+        if "USE TEMP B-TREE FOR ORDER BY" in plan:
+            problems.append("sort")
+    elif vendor == "postgresql":
+        if filtered and "Seq Scan" in plan:
+            problems.append("full table scan")
+        if "Sort" in plan:
+            problems.append("sort")
+    return problems
+
+
+def get_index(model, fields):
+    """
+    Returns a named ``models.Index`` on the ``model``'s ``fields``.
+    """
+    index = models.Index(fields=list(fields))
+    index.set_name_with_model(model)
+    return index
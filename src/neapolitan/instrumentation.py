@@ -0,0 +1,94 @@
+"""
+Measurement of the phases of handling a request, for ``CRUDView.instrument``.
+
+The view's handlers wrap each phase, such as building the queryset, filtering,
+pagination, and ``get_context_data()``, in ``CRUDView.measure()``, recording
+its duration and the number of database queries it made. Template rendering,
+which happens after the handler returns, is measured by the response itself.
+"""
+
+import collections
+import contextlib
+import time
+
+from django.db import connections
+from django.template.response import TemplateResponse
+
+# A measured phase: its name, its duration in seconds, and the number of
+# database queries it made, or None if queries weren't counted.
+Phase = collections.namedtuple("Phase", ["name", "duration", "queries"])
+
+
+class Timings:
+    """
+    Records the phases of handling a request, in the order they finish.
+
+    Queries are counted with a wrapper on each database connection of the
+    current thread, so ``count_queries`` should be False for async views,
+    whose queries run on other threads.
+    """
+
+    def __init__(self, count_queries=True):
+        self.count_queries = count_queries
+        self.phases = []
+        self.start = time.perf_counter()
+
+    @contextlib.contextmanager
+    def measure(self, name):
+        """
+        Measures the code run in the context as a phase named ``name``.
+        """
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with contextlib.ExitStack() as stack:
+            if self.count_queries:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(count))
+            start = time.perf_counter()
+            try:
+                yield
+            finally:
+                duration = time.perf_counter() - start
+                self.phases.append(
+                    Phase(name, duration, queries if self.count_queries else None)
+                )
+
+    def finish(self):
+        """
+        Records the "total" phase, from the creation of the timings.
+        """
+        self.phases.append(Phase("total", time.perf_counter() - self.start, None))
+
+    def get_server_timing(self):
+        """
+        Returns the phases as the value of a Server-Timing header, with
+        durations in milliseconds.
+        """
+        metrics = []
+        for phase in self.phases:
+            metric = f"{phase.name};dur={phase.duration * 1000:.1f}"
+            if phase.queries is not None:
+                metric += f';desc="{phase.queries} queries"'
+            metrics.append(metric)
+        return ", ".join(metrics)
+
+
+class MeasuredTemplateResponse(TemplateResponse):
+    """
+    A ``TemplateResponse`` measuring its rendering as the "render" phase of
+    the ``timings``.
+    """
+
+    def __init__(self, *args, timings, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timings = timings
+
+    @property
+    def rendered_content(self):
+        with self.timings.measure("render"):
+            return super().rendered_content
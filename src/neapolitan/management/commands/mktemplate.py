@@ -64,6 +64,34 @@ class Command(BaseCommand):
             dest="role",
             help="Delete role",
         )
+        group.add_argument(
+            "--bulk-delete",
+            action="store_const",
+            const="bulk_delete",
+            dest="role",
+            help="Bulk delete role",
+        )
+        group.add_argument(
+            "--bulk-update",
+            action="store_const",
+            const="bulk_update",
+            dest="role",
+            help="Bulk update role",
+        )
+        group.add_argument(
+            "--import",
+            action="store_const",
+            const="import",
+            dest="role",
+            help="Import role",
+        )
+        group.add_argument(
+            "--grid",
+            action="store_const",
+            const="grid",
+            dest="role",
+            help="Grid role",
+        )
 
     def handle(self, *args, **options):
         model = options["model"]
@@ -77,6 +105,14 @@ class Command(BaseCommand):
             suffix = "_form.html"
         elif role == "delete":
             suffix = "_confirm_delete.html"
+        elif role == "bulk_delete":
+            suffix = "_confirm_bulk_delete.html"
+        elif role == "bulk_update":
+            suffix = "_bulk_form.html"
+        elif role == "import":
+            suffix = "_import.html"
+        elif role == "grid":
+            suffix = "_grid.html"
 
         app_name, model_name = model.split(".")
         template_name = f"{app_name}/{model_name.lower()}{suffix}"
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from neapolitan.views import get_crud_views
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the search indexes of the CRUD views in the URLconf with "
+        "search_fields set."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "models",
+            nargs="*",
+            metavar="app_label.ModelName",
+            help="Only rebuild the indexes of views of these models.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="The number of objects indexed at a time. Defaults to 1000.",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        models = {label.lower() for label in options["models"]}
+
+        backends = {}
+        for view in get_crud_views():
+            if not view.search_fields:
+                continue
+            if models and view.model._meta.label_lower not in models:
+                continue
+            backend = view.get_search_backend()
+            backends.setdefault(backend.key, backend)
+
+        if not backends:
+            raise CommandError("No CRUD views with search_fields found.")
+
+        for backend in backends.values():
+            label = f"{backend.model._meta.label} ({', '.join(backend.fields)})"
+            if not backend.maintains_index:
+                self.stdout.write(f"{label}: no index to build.")
+                continue
+            count = backend.rebuild(options["batch_size"])
+            self.stdout.write(f"{label}: indexed {count} objects.")
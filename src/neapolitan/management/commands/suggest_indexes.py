@@ -0,0 +1,135 @@
+import re
+from pathlib import Path
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connections, migrations
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.writer import MigrationWriter
+
+from neapolitan.indexes import (
+    check_search_index,
+    find_missing_indexes,
+    get_index,
+    get_plan_problems,
+    get_sample_queries,
+)
+from neapolitan.views import get_crud_views
+
+
+class Command(BaseCommand):
+    help = (
+        "Report the fields the CRUD views in the URLconf look up, filter, order, "
+        "or search by that have no index, and optionally write migrations adding "
+        "them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--write-migrations",
+            action="store_true",
+            help="Write a migration adding the missing indexes to each app.",
+        )
+        parser.add_argument(
+            "--no-explain",
+            action="store_false",
+            dest="explain",
+            help="Don't EXPLAIN the views' representative queries.",
+        )
+
+    def handle(self, *args, **options):
+        verbosity = options["verbosity"]
+        missing = {}
+        problem_count = 0
+
+        for view in get_crud_views():
+            label = (
+                f"{view.model._meta.label} "
+                f"({type(view).__module__}.{type(view).__qualname__})"
+            )
+            problems = []
+            for index in find_missing_indexes(view):
+                problems.append(
+                    f"{index.reason} {index.field}: no index on "
+                    f"{index.model._meta.label}.{index.field}."
+                )
+                missing.setdefault((index.model, index.field), index)
+
+            search_problem = check_search_index(view)
+            if search_problem is not None:
+                problems.append(f"search: {search_problem}")
+
+            plans = []
+            if options["explain"]:
+                for name, queryset in get_sample_queries(view):
+                    plan = queryset.explain()
+                    plans.append((name, plan))
+                    vendor = connections[queryset.db].vendor
+                    filtered = name == "detail" or name.startswith("filter ")
+                    for problem in get_plan_problems(plan, vendor, filtered):
+                        problems.append(f"{name} query: {problem}.")
+
+            problem_count += len(problems)
+            if problems or verbosity >= 2:
+                self.stdout.write(label)
+                for problem in problems:
+                    self.stdout.write(f"  {problem}")
+                if verbosity >= 2:
+                    for name, plan in plans:
+                        self.stdout.write(f"  EXPLAIN {name}:")
+                        for line in plan.splitlines():
+                            self.stdout.write(f"    {line}")
+
+        if not problem_count:
+            self.stdout.write("No missing indexes found.")
+            return
+
+        if options["write_migrations"]:
+            self.write_migrations(missing.values())
+        elif missing:
+            self.stdout.write(
+                "Add the indexes to the models' Meta.indexes, or run with "
+                "--write-migrations:"
+            )
+            for index in missing.values():
+                model_index = get_index(index.model, [index.field])
+                self.stdout.write(
+                    f"  {index.model._meta.label}: models.Index(fields="
+                    f"{model_index.fields!r}, name={model_index.name!r})"
+                )
+
+    def write_migrations(self, missing):
+        loader = MigrationLoader(None, ignore_no_migrations=True)
+        by_app = {}
+        for index in missing:
+            by_app.setdefault(index.model._meta.app_label, []).append(index)
+
+        for app_label, indexes in by_app.items():
+            if app_label in loader.unmigrated_apps:
+                self.stdout.write(f"Skipping {app_label}, which has no migrations.")
+                continue
+            leaves = loader.graph.leaf_nodes(app_label)
+            numbers = [int(re.match(r"\d*", name).group() or 0) for _, name in leaves]
+            name = f"{max(numbers, default=0) + 1:04d}_neapolitan_indexes"
+            operations = [
+                migrations.AddIndex(
+                    model_name=index.model._meta.model_name,
+                    index=get_index(index.model, [index.field]),
+                )
+                for index in indexes
+            ]
+            migration = type(
+                "Migration",
+                (migrations.Migration,),
+                {"dependencies": leaves, "operations": operations},
+            )(name, app_label)
+            writer = MigrationWriter(migration)
+            Path(writer.path).write_text(writer.as_string())
+            self.stdout.write(f"Wrote {writer.path}.")
+            for operation in operations:
+                model = apps.get_model(app_label, operation.model_name)
+                self.stdout.write(
+                    f"  Add models.Index(fields={operation.index.fields!r}, "
+                    f"name={operation.index.name!r}) to {model.__name__}.Meta.indexes, "
+                    "so that makemigrations doesn't remove it."
+                )
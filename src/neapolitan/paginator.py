@@ -0,0 +1,334 @@
+"""
+Alternative paginators for ``CRUDView``.
+
+Django's ``Paginator`` uses ``OFFSET`` to fetch a page and ``COUNT(*)`` to know
+how many pages there are. Both get slow on large tables. The paginators here
+trade some of ``Paginator``'s features for queries that stay fast regardless of
+how deep into the results you are.
+"""
+
+import base64
+import binascii
+import collections.abc
+import datetime
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import (
+    EmptyPage,
+    InvalidPage,
+    Page,
+    PageNotAnInteger,
+    Paginator,
+)
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """
+    Encodes cursor positions. Unlike ``DjangoJSONEncoder``, keeps the
+    microseconds of datetimes and times, so that positions match the rows they
+    were taken from.
+    """
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class CursorPage(collections.abc.Sequence):
+    """
+    A page of results from a ``CursorPaginator``.
+
+    Provides the same ``has_next()``/``has_previous()`` interface as Django's
+    ``Page``. There are no page numbers, so ``next_page_number()`` and
+    ``previous_page_number()`` return the opaque cursor for the adjacent page,
+    which can be used in the ``page`` query parameter in the same way.
+    """
+
+    def __init__(self, object_list, paginator, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return "<Cursor page of %s objects>" % len(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+    def next_page_number(self):
+        return self.next_cursor
+
+    def previous_page_number(self):
+        return self.previous_cursor
+
+
+class CursorPaginator:
+    """
+    Keyset (a.k.a. cursor) pagination.
+
+    Rather than using ``OFFSET``, each page is fetched with a ``WHERE`` clause
+    continuing from the last row of the previous page, and fetching
+    ``per_page + 1`` rows to know whether there's a next page. No ``COUNT(*)``
+    is performed.
+
+    ``ordering`` must identify rows uniquely. The primary key is appended as a
+    tiebreaker if it's not already included. Ordering fields should not be
+    nullable. Foreign keys are ordered by their key, rather than by the related
+    model's ordering.
+    """
+
+    def __init__(self, object_list, per_page, ordering=None):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = self._get_ordering(object_list, ordering)
+
+    def _get_ordering(self, queryset, ordering):
+        ordering = list(
+            ordering
+            or queryset.query.order_by
+            or queryset.model._meta.ordering
+            or ["pk"]
+        )
+        pk_names = {"pk", queryset.model._meta.pk.name}
+        if not any(f.lstrip("-") in pk_names for f in ordering):
+            ordering.append("pk")
+        return [self._get_key_ordering(queryset.model, f) for f in ordering]
+
+    def _get_key_ordering(self, model, ordering):
+        # Replaces a trailing foreign key with its attname, such as
+        # "bookmark_id", so that the cursor encodes the key, rather than the
+        # related object.
+        descending = ordering.startswith("-")
+        parts = ordering.lstrip("-").split("__")
+        for i, part in enumerate(parts):
+            try:
+                field = model._meta.get_field(part)
+            except FieldDoesNotExist:
+                break
+            if not (field.many_to_one or field.one_to_one) or not field.concrete:
+                break
+            if i == len(parts) - 1:
+                parts[i] = field.attname
+            model = field.related_model
+        return ("-" if descending else "") + "__".join(parts)
+
+    def encode_cursor(self, obj, reverse=False):
+        position = [self._get_value(obj, f.lstrip("-")) for f in self.ordering]
+        data = json.dumps({"p": position, "r": reverse}, cls=CursorEncoder)
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            position, reverse = data["p"], data["r"]
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise InvalidPage(_("Invalid cursor."))
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise InvalidPage(_("Invalid cursor."))
+        return position, bool(reverse)
+
+    def _get_value(self, obj, field):
+        for attr in field.split("__"):
+            obj = getattr(obj, attr)
+        return obj
+
+    def _filter_after(self, ordering, position):
+        # Expands the row comparison (a, b, c) > (x, y, z) as
+        # a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z), which also
+        # allows mixing ascending and descending fields.
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition |= Q(**equal, **{f"{name}__{lookup}": value})
+            equal[name] = value
+        return condition
+
+    def page(self, cursor=None):
+        """
+        Returns the page following (or, for a previous cursor, preceding) the
+        position encoded in ``cursor``. Returns the first page if ``cursor`` is
+        ``None``.
+        """
+        ordering = self.ordering
+        reverse = False
+        queryset = self.object_list
+        if cursor:
+            position, reverse = self.decode_cursor(cursor)
+            if reverse:
+                ordering = [f[1:] if f.startswith("-") else f"-{f}" for f in ordering]
+            try:
+                queryset = queryset.filter(self._filter_after(ordering, position))
+            except (ValidationError, ValueError, TypeError):
+                raise InvalidPage(_("Invalid cursor."))
+
+        objects = list(queryset.order_by(*ordering)[: self.per_page + 1])
+        has_more = len(objects) > self.per_page
+        objects = objects[: self.per_page]
+
+        if reverse:
+            objects.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, bool(cursor)
+
+        next_cursor = previous_cursor = None
+        if objects and has_next:
+            next_cursor = self.encode_cursor(objects[-1])
+        if objects and has_previous:
+            previous_cursor = self.encode_cursor(objects[0], reverse=True)
+        return CursorPage(objects, self, next_cursor, previous_cursor)
+
+
+class NoCountPage(Page):
+    """
+    A page from a ``NoCountPaginator``. Knows whether there's a next page
+    without knowing how many pages there are.
+    """
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+    def start_index(self):
+        if not self.object_list:
+            return 0
+        return (self.paginator.per_page * (self.number - 1)) + 1
+
+    def end_index(self):
+        return self.start_index() + len(self.object_list) - 1
+
+
+class NoCountPaginator(Paginator):
+    """
+    A ``Paginator`` that doesn't count the rows.
+
+    Each page fetches ``per_page + 1`` rows to know whether there's a next page.
+    Pages numbers work as usual, but ``count``, ``num_pages``, and
+    ``page_range`` still require a ``COUNT(*)`` if you use them. (So does
+    requesting the ``last`` page.) ``orphans`` is not supported.
+    """
+
+    def validate_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_("That page number is not an integer"))
+        if number < 1:
+            raise EmptyPage(_("That page number is less than 1"))
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        objects = list(self.object_list[bottom : bottom + self.per_page + 1])
+        if not objects and number > 1:
+            raise EmptyPage(_("That page contains no results"))
+        has_next = len(objects) > self.per_page
+        return NoCountPage(objects[: self.per_page], number, self, has_next)
+
+
+class EstimatedCountPaginator(NoCountPaginator):
+    """
+    A ``Paginator`` that uses the database's table statistics, rather than
+    ``COUNT(*)``, for the count of an unfiltered queryset.
+
+    Estimates are available for PostgreSQL (``pg_class.reltuples``), SQLite
+    (``sqlite_stat1``, populated by ``ANALYZE``), and MySQL/MariaDB. If no
+    estimate is available, the queryset is filtered, or the estimate is below
+    ``estimate_threshold``, the exact count is used.
+
+    Because the count may be an estimate, ``has_next()`` is based on whether
+    the next row exists, rather than on ``num_pages``.
+    """
+
+    def __init__(
+        self, object_list, per_page, *args, estimate_threshold=10_000, **kwargs
+    ):
+        super().__init__(object_list, per_page, *args, **kwargs)
+        self.estimate_threshold = estimate_threshold
+
+    @cached_property
+    def count(self):
+        estimate = self.get_estimated_count()
+        if estimate is None or estimate < self.estimate_threshold:
+            return super().count
+        return estimate
+
+    def get_estimated_count(self):
+        """
+        Returns the estimated row count for the queryset's table, or ``None``
+        if the queryset is filtered or there are no statistics available.
+        """
+        queryset = self.object_list
+        if not hasattr(queryset, "query"):
+            return None
+        query = queryset.query
+        if query.where or query.distinct or query.is_sliced or query.combinator:
+            return None
+        if query.group_by is not None:
+            return None
+
+        connection = connections[queryset.db]
+        table = queryset.model._meta.db_table
+        with connection.cursor() as cursor:
+            match connection.vendor:
+                case "postgresql":
+                    cursor.execute(
+                        "SELECT reltuples FROM pg_class WHERE oid = to_regclass(%s)",
+                        [connection.ops.quote_name(table)],
+                    )
+                    row = cursor.fetchone()
+                    estimate = row[0] if row else None
+                case "sqlite":
+                    cursor.execute(
+                        "SELECT 1 FROM sqlite_master "
+                        "WHERE type = 'table' AND name = 'sqlite_stat1'"
+                    )
+                    if cursor.fetchone() is None:
+                        return None
+                    cursor.execute(
+                        "SELECT stat FROM sqlite_stat1 WHERE tbl = %s", [table]
+                    )
+                    row = cursor.fetchone()
+                    estimate = row[0].split()[0] if row else None
+                case "mysql":
+                    cursor.execute(
+                        "SELECT table_rows FROM information_schema.tables "
+                        "WHERE table_schema = DATABASE() AND table_name = %s",
+                        [table],
+                    )
+                    row = cursor.fetchone()
+                    estimate = row[0] if row else None
+                case _:
+                    return None
+
+        if estimate is None or int(estimate) < 0:
+            # PostgreSQL reports -1 for tables that have never been analyzed.
+            return None
+        return int(estimate)
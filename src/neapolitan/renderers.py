@@ -0,0 +1,285 @@
+"""
+Python renderers for the ``neapolitan/partial/`` templates.
+
+Rendering a list through ``neapolitan/partial/list.html`` means a nested
+template loop per row and field. The renderers here produce the same markup
+with a single string join, precomputing the headers and field accessors once
+per view class. They're used by the default templates when the view sets
+``compiled_partials = True``, and to stream the rows of the list when it sets
+``stream_list = True``, or caches rows with ``row_cache = True``.
+
+Customised ``partial/`` templates are not used by the renderers, so leave
+``compiled_partials`` off if you've overridden them.
+"""
+
+import functools
+import operator
+
+from asgiref.sync import sync_to_async
+from django.utils.html import conditional_escape
+from django.utils.safestring import mark_safe
+from django.utils.text import capfirst
+from django.utils.translation import get_language
+
+from neapolitan.cache import RowCache
+from neapolitan.views import Role, StreamedObjectList
+
+TABLE_START = (
+    '<div class="mt-8 flow-root">'
+    '<div class="-mx-4 -my-2 overflow-x-auto sm:-mx-6 lg:-mx-8">'
+    '<div class="inline-block min-w-full py-2 align-middle sm:px-6 lg:px-8">'
+    '<table class="min-w-full divide-y divide-gray-300">'
+)
+TABLE_END = "</tbody></table></div></div></div>"
+HEADER_CELL = (
+    '<th scope="col" class="py-3.5 px-3 text-left text-sm font-semibold '
+    'text-gray-900">{}</th>'
+)
+SORTED_HEADER_CELL = (
+    '<th scope="col" aria-sort="{}" class="py-3.5 px-3 text-left text-sm '
+    'font-semibold text-gray-900">{}</th>'
+)
+SORT_LINK = '<a href="{}">{}{}</a>'
+SORT_INDICATORS = {None: "", "ascending": " ▲", "descending": " ▼"}
+ACTIONS_HEADER_CELL = (
+    '<th scope="col" class="relative py-3.5 pl-3 pr-4 sm:pr-0">'
+    '<span class="sr-only">Actions</span></th>'
+)
+FIRST_CELL = '<td class="py-3.5 px-3 font-medium text-gray-900">{}</td>'
+CELL = '<td class="py-3.5 px-3 text-gray-500">{}</td>'
+ACTIONS_CELL = (
+    '<td class="py-3.5 px-3 text-right text-sm font-medium [&_a]:text-indigo-600 '
+    '[&_a:hover]:text-indigo-900">{}</td>'
+)
+SELECT_HEADER_CELL = (
+    '<th scope="col" class="py-3.5 pl-3"><span class="sr-only">Select</span></th>'
+)
+SELECT_CELL = (
+    '<td class="py-3.5 pl-3"><input type="checkbox" name="selected" value="{}" '
+    'form="neapolitan-bulk-actions"></td>'
+)
+ROWS_MARKER = "<!-- neapolitan:rows -->"
+DETAIL_ROW = (
+    '<div class="px-4 py-6 sm:grid sm:grid-cols-3 sm:gap-4 sm:px-0">'
+    '<dt class="text-sm font-medium leading-6 text-gray-900">{}:</dt>'
+    '<dd class="mt-1 text-sm leading-6 text-gray-700 sm:col-span-2 sm:mt-0">{}</dd>'
+    "</div>"
+)
+
+
+def action_link_builders(view):
+    """
+    Returns (url builder, anchor text) pairs for the object roles routed for
+    the view. See ``Role.url_builder()``.
+    """
+    builders = [
+        (Role.DETAIL.url_builder(view), "View"),
+        (Role.UPDATE.url_builder(view), "Edit"),
+        (Role.DELETE.url_builder(view), "Delete"),
+    ]
+    return [(build, name) for build, name in builders if build is not None]
+
+
+def is_selectable(view):
+    """
+    Returns whether the list's rows have checkboxes, to select them for the
+    view's bulk roles.
+    """
+    return any(
+        role.url_builder(view) is not None
+        for role in (Role.BULK_DELETE, Role.BULK_UPDATE)
+    )
+
+
+def action_links(view, object, builders=None):
+    if builders is None:
+        builders = action_link_builders(view)
+    links = [f"<a href='{build(object)}'>{text}</a>" for build, text in builders]
+    return mark_safe(" | ".join(links))
+
+
+def stream_list_content(content, view):
+    """
+    Yields the rendered ``content`` of a LIST page, rendering the rows of
+    ``view.object_list``, a ``StreamedObjectList``, in chunks, in place of the
+    rows marker.
+    """
+    start, marker, end = content.partition(ROWS_MARKER)
+    yield start
+    if marker:
+        objects = view.object_list
+        renderer = get_list_renderer(view)
+        builders = action_link_builders(view)
+        chunk = []
+        for object in objects:
+            chunk.append(object)
+            if len(chunk) >= objects.chunk_size:
+                yield "".join(render_rows(view, chunk, renderer, builders))
+                chunk = []
+        yield "".join(render_rows(view, chunk, renderer, builders))
+    yield end
+
+
+async def astream_list_content(content, view):
+    """
+    Async version of ``stream_list_content()``, reading the rows with
+    ``aiterator()``. Each chunk is rendered with ``sync_to_async()``, since
+    rendering a row may query the database or the row cache.
+    """
+    start, marker, end = content.partition(ROWS_MARKER)
+    yield start
+    if marker:
+        objects = view.object_list
+        renderer = get_list_renderer(view)
+        builders = action_link_builders(view)
+        arender_rows = sync_to_async(render_rows)
+        chunk = []
+        async for object in objects:
+            chunk.append(object)
+            if len(chunk) >= objects.chunk_size:
+                yield "".join(await arender_rows(view, chunk, renderer, builders))
+                chunk = []
+        yield "".join(await arender_rows(view, chunk, renderer, builders))
+    yield end
+
+
+def render_rows(view, objects, renderer=None, builders=None):
+    """
+    Returns the rendered table rows for the ``objects``, using the view's row
+    cache if it sets ``row_cache = True``.
+    """
+    if renderer is None:
+        renderer = get_list_renderer(view)
+    if builders is None:
+        builders = action_link_builders(view)
+    selectable = is_selectable(view)
+
+    def render_row(object):
+        actions = action_links(view, object, builders)
+        return renderer.render_row(object, actions, selectable)
+
+    if view.row_cache:
+        return RowCache(view, selectable).render(objects, render_row)
+    return [render_row(object) for object in objects]
+
+
+def render_list(view, objects):
+    """
+    Renders the table for the view's list of ``objects``.
+    """
+    renderer = get_list_renderer(view)
+    selectable = is_selectable(view)
+    sort_links = view.get_sort_links()
+    if isinstance(objects, StreamedObjectList):
+        return renderer.render_table(ROWS_MARKER, selectable, sort_links)
+    rows = "".join(render_rows(view, objects, renderer))
+    return renderer.render_table(rows, selectable, sort_links)
+
+
+class ListRenderer:
+    """
+    Renders a table of objects, as ``neapolitan/partial/list.html``.
+    """
+
+    def __init__(self, model, fields):
+        self.fields = fields
+        self.accessors = [operator.attrgetter(f) for f in fields]
+        self.headers = [
+            conditional_escape(capfirst(model._meta.get_field(f).verbose_name))
+            for f in fields
+        ]
+        self.header_cells = self.render_header_cells()
+
+    def render_header_cells(self, sort_links=None):
+        cells = []
+        for name, header in zip(self.fields, self.headers):
+            sort = sort_links.get(name) if sort_links else None
+            if sort is None:
+                cells.append(HEADER_CELL.format(header))
+                continue
+            direction = sort["direction"]
+            link = SORT_LINK.format(
+                conditional_escape(sort["url"]), header, SORT_INDICATORS[direction]
+            )
+            if direction is None:
+                cells.append(HEADER_CELL.format(link))
+            else:
+                cells.append(SORTED_HEADER_CELL.format(direction, link))
+        return f"{''.join(cells)}{ACTIONS_HEADER_CELL}</tr></thead>"
+
+    def render_row(self, object, actions, selectable=False):
+        cells = [conditional_escape(str(get(object))) for get in self.accessors]
+        if cells:
+            cells[0] = FIRST_CELL.format(cells[0])
+            cells[1:] = [CELL.format(cell) for cell in cells[1:]]
+        select = SELECT_CELL.format(conditional_escape(object.pk)) if selectable else ""
+        return f"<tr>{select}{''.join(cells)}{ACTIONS_CELL.format(actions)}</tr>"
+
+    def render(self, objects, action_links):
+        """
+        Renders the table. ``action_links`` is a function taking an object and
+        returning the (safe) HTML for its action links.
+        """
+        rows = "".join(self.render_row(obj, action_links(obj)) for obj in objects)
+        return self.render_table(rows)
+
+    def render_table(self, rows, selectable=False, sort_links=None):
+        """
+        Renders the table around the already rendered ``rows``, with the
+        ``sort_links`` from ``CRUDView.get_sort_links()`` in the headers.
+        """
+        select = SELECT_HEADER_CELL if selectable else ""
+        header_cells = (
+            self.render_header_cells(sort_links) if sort_links else self.header_cells
+        )
+        return mark_safe(
+            f"{TABLE_START}<thead><tr>{select}{header_cells}"
+            f'<tbody class="divide-y divide-gray-200">{rows}{TABLE_END}'
+        )
+
+
+class DetailRenderer:
+    """
+    Renders the fields of an object, as ``neapolitan/partial/detail.html``.
+    """
+
+    def __init__(self, model, fields):
+        self.rows = [
+            (
+                conditional_escape(capfirst(model._meta.get_field(f).verbose_name)),
+                operator.attrgetter(f),
+            )
+            for f in fields
+        ]
+
+    def render(self, object):
+        rows = "".join(
+            DETAIL_ROW.format(label, conditional_escape(str(get(object))))
+            for label, get in self.rows
+        )
+        return mark_safe(f'<dl class="divide-y divide-gray-100">{rows}</dl>')
+
+
+# Renderers are built once per view class (and active language, since verbose
+# names may be translated), and the fields they render.
+@functools.lru_cache(maxsize=None)
+def _get_renderer(renderer_class, view_class, model, fields, language_code):
+    return renderer_class(model, fields)
+
+
+def get_list_renderer(view):
+    """
+    Returns the ``ListRenderer`` for the view.
+    """
+    return _get_renderer(
+        ListRenderer, type(view), view.model, tuple(view.fields), get_language()
+    )
+
+
+def get_detail_renderer(view):
+    """
+    Returns the ``DetailRenderer`` for the view.
+    """
+    return _get_renderer(
+        DetailRenderer, type(view), view.model, tuple(view.fields), get_language()
+    )
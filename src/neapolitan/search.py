@@ -0,0 +1,303 @@
+"""
+Full-text search for the LIST role.
+
+With ``search_fields`` set, a ``CRUDView``'s list, and the roles acting on its
+filtered objects, are filtered by the ``search_kwarg`` query parameter. The
+search is made by a backend, named by ``search_backend``, or chosen for the
+model's database:
+
+``"fts5"``
+    An SQLite FTS5 table of the search fields of each object, by primary key,
+    searched for words starting with each term of the query. The table is
+    created by ``migrate``, updated on ``post_save`` and ``post_delete``, and
+    by ``CRUDView.objects_changed()``, and (re)built by the
+    ``rebuild_search_index`` management command.
+``"postgres"``
+    PostgreSQL full-text search, matching the ``SearchVector`` of the search
+    fields against a ``websearch`` query. Add a ``GinIndex`` on the same
+    ``SearchVector`` to the model, for the search to use it. The database
+    keeps the index up to date.
+``"contains"``
+    An ``icontains`` match of each term of the query on any search field. It
+    reads every row, unless, on PostgreSQL, the fields have trigram indexes:
+    a ``GinIndex`` with ``opclasses=["gin_trgm_ops"]``.
+"""
+
+import collections
+import functools
+import hashlib
+
+from django.db import connections, router, transaction
+from django.db.models import IntegerField, Q
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+
+# The backends maintaining an index, by model and key.
+_indexes = collections.defaultdict(dict)
+
+
+class SearchBackend:
+    """
+    Searches objects of the ``model`` by their ``fields``: field names, or
+    lookups spanning relations, such as ``"bookmark__title"``. Backends
+    maintaining an index of their own, with ``maintains_index = True``, keep it
+    in the database ``using``.
+    """
+
+    maintains_index = False
+
+    def __init__(self, model, fields, using):
+        self.model = model
+        self.fields = tuple(fields)
+        self.using = using
+
+    @property
+    def key(self):
+        return (type(self), self.fields, self.using)
+
+    def search(self, queryset, query):
+        """
+        Returns the ``queryset`` filtered by the search ``query``.
+        """
+        raise NotImplementedError
+
+    def create_index(self):
+        """
+        Creates the backend's index, empty, if it doesn't exist.
+        """
+
+    def update(self, pks):
+        """
+        Indexes the objects with the given primary keys.
+        """
+
+    def remove(self, pks):
+        """
+        Removes the objects with the given primary keys from the index.
+        """
+
+    def rebuild(self, batch_size):
+        """
+        Indexes every object afresh, ``batch_size`` at a time, returning the
+        number indexed.
+        """
+        return 0
+
+
+class ContainsBackend(SearchBackend):
+    def search(self, queryset, query):
+        for term in query.split():
+            lookups = Q()
+            for field in self.fields:
+                lookups |= Q(**{f"{field}__icontains": term})
+            queryset = queryset.filter(lookups)
+        return queryset
+
+
+class PostgresBackend(SearchBackend):
+    # The text search configuration, which must match the index's.
+    config = "english"
+
+    def get_vector(self):
+        from django.contrib.postgres.search import SearchVector
+
+        return SearchVector(*self.fields, config=self.config)
+
+    def search(self, queryset, query):
+        from django.contrib.postgres.search import SearchQuery
+
+        query = SearchQuery(query, config=self.config, search_type="websearch")
+        return queryset.alias(neapolitan_search=self.get_vector()).filter(
+            neapolitan_search=query
+        )
+
+
+class SQLiteFTS5Backend(SearchBackend):
+    """
+    Indexes the search fields in an FTS5 table, keyed by the object's primary
+    key, which must be an integer. The values of lookups spanning multi-valued
+    relations are joined. Values from related objects are indexed when the
+    object itself changes.
+    """
+
+    maintains_index = True
+    # The number of objects updated per statement.
+    batch_size = 500
+
+    def __init__(self, model, fields, using):
+        super().__init__(model, fields, using)
+        digest = hashlib.md5(repr(self.fields).encode(), usedforsecurity=False)
+        table = model._meta.db_table
+        self.table = f"neapolitan_search_{table}_{digest.hexdigest()[:8]}"
+
+    def create_index(self):
+        # Not lazily, when first written: rolling back to a savepoint after
+        # creating a virtual table corrupts SQLite's schema.
+        connection = connections[self.using]
+        quote_name = connection.ops.quote_name
+        columns = ", ".join(quote_name(field) for field in self.fields)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {quote_name(self.table)} "
+                f"USING fts5({columns})"
+            )
+
+    def get_match(self, query):
+        # Each term is quoted, so that FTS5's query syntax is taken literally,
+        # and matched as a prefix.
+        return " ".join(
+            '"{}"*'.format(term.replace('"', '""')) for term in query.split()
+        )
+
+    def search(self, queryset, query):
+        match = self.get_match(query)
+        if not match:
+            return queryset
+        table = connections[queryset.db].ops.quote_name(self.table)
+        return queryset.filter(
+            pk__in=RawSQL(f"SELECT rowid FROM {table} WHERE {table} MATCH %s", [match])
+        )
+
+    def get_rows(self, pks):
+        rows = {}
+        queryset = self.model._default_manager.using(self.using).filter(pk__in=pks)
+        for pk, *values in queryset.values_list("pk", *self.fields):
+            row = rows.setdefault(pk, [[] for _ in self.fields])
+            for column, value in zip(row, values):
+                if value is not None:
+                    column.append(str(value))
+        return [(pk, *(" ".join(column) for column in row)) for pk, row in rows.items()]
+
+    def _write(self, pks, insert=True):
+        pks = list(pks)
+        connection = connections[self.using]
+        quote_name = connection.ops.quote_name
+        table = quote_name(self.table)
+        columns = ", ".join(["rowid", *(quote_name(field) for field in self.fields)])
+        values = ", ".join(["%s"] * (len(self.fields) + 1))
+        with (
+            transaction.atomic(using=self.using, savepoint=False),
+            connection.cursor() as cursor,
+        ):
+            for start in range(0, len(pks), self.batch_size):
+                batch = pks[start : start + self.batch_size]
+                placeholders = ", ".join(["%s"] * len(batch))
+                cursor.execute(
+                    f"DELETE FROM {table} WHERE rowid IN ({placeholders})", batch
+                )
+                if insert:
+                    cursor.executemany(
+                        f"INSERT INTO {table} ({columns}) VALUES ({values})",
+                        self.get_rows(batch),
+                    )
+
+    def update(self, pks):
+        self._write(pks)
+
+    def remove(self, pks):
+        self._write(pks, insert=False)
+
+    def rebuild(self, batch_size):
+        connection = connections[self.using]
+        with connection.cursor() as cursor:
+            table = connection.ops.quote_name(self.table)
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        self.create_index()
+
+        manager = self.model._default_manager.using(self.using)
+        count = 0
+        last = None
+        while True:
+            queryset = manager.order_by("pk")
+            if last is not None:
+                queryset = queryset.filter(pk__gt=last)
+            pks = list(queryset.values_list("pk", flat=True)[:batch_size])
+            if not pks:
+                return count
+            self.update(pks)
+            count += len(pks)
+            last = pks[-1]
+
+
+# Search backends, by name.
+SEARCH_BACKENDS = {
+    "contains": ContainsBackend,
+    "postgres": PostgresBackend,
+    "fts5": SQLiteFTS5Backend,
+}
+
+
+@functools.cache
+def _has_fts5():
+    import sqlite3
+
+    with sqlite3.connect(":memory:") as connection:
+        options = connection.execute("PRAGMA compile_options").fetchall()
+    return ("ENABLE_FTS5",) in options
+
+
+def get_default_backend_name(model, using):
+    """
+    Returns the name of the best backend for the ``model``'s database
+    ``using``.
+    """
+    vendor = connections[using].vendor
+    if vendor == "postgresql":
+        return "postgres"
+    if (
+        vendor == "sqlite"
+        and isinstance(model._meta.pk, IntegerField)
+        and _has_fts5()
+    ):
+        return "fts5"
+    return "contains"
+
+
+def get_search_backend(model, fields, name=None):
+    """
+    Returns the search backend named ``name``, or the default for the model's
+    database, searching the model's ``fields``.
+    """
+    using = router.db_for_write(model)
+    if name is None:
+        name = get_default_backend_name(model, using)
+    return SEARCH_BACKENDS[name](model, fields, using)
+
+
+def register_search_index(backend):
+    """
+    Registers the ``backend``, connecting the signals keeping its index up to
+    date, if it maintains one.
+    """
+    if not backend.maintains_index:
+        return
+    model = backend.model
+    if not _indexes[model]:
+        uid = f"neapolitan:search:{model._meta.label}"
+        post_save.connect(_update_saved, sender=model, dispatch_uid=uid)
+        post_delete.connect(_remove_deleted, sender=model, dispatch_uid=uid)
+    _indexes[model][backend.key] = backend
+
+
+def _update_saved(sender, instance, **kwargs):
+    for backend in _indexes[sender].values():
+        backend.update([instance.pk])
+
+
+def _remove_deleted(sender, instance, **kwargs):
+    for backend in _indexes[sender].values():
+        backend.remove([instance.pk])
+
+
+def create_search_indexes(sender, using, **kwargs):
+    """
+    Creates the indexes of the search backends of the CRUD views in the
+    URLconf for the migrated app's models, on ``post_migrate``.
+    """
+    from neapolitan.views import get_crud_views
+
+    for view in get_crud_views():
+        if view.search_fields and view.model._meta.app_label == sender.label:
+            backend = view.get_search_backend()
+            if backend.using == using:
+                backend.create_index()
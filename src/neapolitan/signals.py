@@ -0,0 +1,7 @@
+from django.dispatch import Signal
+
+# Sent by a CRUDView with `instrument = True` once it has handled a request,
+# and rendered its response, with the arguments `view`, `request`, and
+# `phases`, a list of neapolitan.instrumentation.Phase. The sender is the
+# view class.
+request_measured = Signal()
@@ -0,0 +1,100 @@
+// Adds a search box to each select rendered by neapolitan's
+// AutocompleteSelect, replacing its options with the matching objects fetched
+// from the AUTOCOMPLETE view. The select only ever holds the selected object
+// and the pages of matches fetched so far.
+(function () {
+  "use strict";
+
+  const DELAY = 250;
+
+  function enhance(select) {
+    if (select.dataset.autocompleteReady) {
+      return;
+    }
+    select.dataset.autocompleteReady = "true";
+
+    const search = document.createElement("input");
+    search.type = "search";
+    search.placeholder = "Search…";
+    search.setAttribute("aria-label", "Search");
+    search.className = "neapolitan-autocomplete-search";
+    select.before(search);
+
+    const more = document.createElement("button");
+    more.type = "button";
+    more.textContent = "More…";
+    more.hidden = true;
+    select.after(more);
+
+    let next = null;
+    let timer = null;
+    let controller = null;
+
+    async function load(after) {
+      if (controller) {
+        controller.abort();
+      }
+      controller = new AbortController();
+      const url = new URL(select.dataset.autocompleteUrl, window.location.href);
+      url.searchParams.set("q", search.value.trim());
+      if (after !== null) {
+        url.searchParams.set("after", after);
+      }
+      let data;
+      try {
+        const response = await fetch(url, {
+          headers: { Accept: "application/json" },
+          signal: controller.signal,
+        });
+        if (!response.ok) {
+          return;
+        }
+        data = await response.json();
+      } catch (error) {
+        if (error.name === "AbortError") {
+          return;
+        }
+        throw error;
+      }
+
+      if (after === null) {
+        // Keep the empty and selected options, replacing the matches.
+        for (const option of Array.from(select.options)) {
+          if (option.value !== "" && !option.selected) {
+            option.remove();
+          }
+        }
+      }
+      const present = new Set(Array.from(select.options, (option) => option.value));
+      for (const result of data.results) {
+        const value = String(result.id);
+        if (!present.has(value)) {
+          select.add(new Option(result.text, value));
+        }
+      }
+      next = data.next;
+      more.hidden = next === null;
+    }
+
+    search.addEventListener("input", () => {
+      clearTimeout(timer);
+      timer = setTimeout(() => load(null), DELAY);
+    });
+    search.addEventListener("focus", () => {
+      if (select.options.length <= 2 && next === null) {
+        load(null);
+      }
+    }, { once: true });
+    more.addEventListener("click", () => load(next));
+  }
+
+  function enhanceAll() {
+    document.querySelectorAll("select[data-autocomplete-url]").forEach(enhance);
+  }
+
+  if (document.readyState === "loading") {
+    document.addEventListener("DOMContentLoaded", enhanceAll);
+  } else {
+    enhanceAll();
+  }
+})();
@@ -1,24 +1,16 @@
 from django import template
-from django.utils.safestring import mark_safe
 
-from neapolitan.views import Role
+from neapolitan.renderers import (
+    action_link_builders,
+    action_links,
+    get_detail_renderer,
+    is_selectable,
+    render_list,
+)
 
 register = template.Library()
 
 
-def action_links(view, object):
-    actions = [
-        (url, name)
-        for url, name in [
-            (Role.DETAIL.maybe_reverse(view, object), "View"),
-            (Role.UPDATE.maybe_reverse(view, object), "Edit"),
-            (Role.DELETE.maybe_reverse(view, object), "Delete"),
-        ] if url is not None
-    ]
-    links = [f"<a href='{url}'>{anchor_text}</a>" for url, anchor_text in actions]
-    return mark_safe(" | ".join(links))
-
-
 @register.inclusion_tag("neapolitan/partial/detail.html")
 def object_detail(object, fields):
     """
@@ -50,20 +42,61 @@ def object_list(objects, view):
         {% object_list objects view %}
 
     Template: ``neapolitan/partial/list.html`` — Will render a table of objects
-    with links to view, edit, and delete views.
+    with links to view, edit, and delete views, checkboxes to select them if
+    the view's bulk roles are routed, and sort links in the headers of the
+    columns in the view's ``ordering_fields``.
     """
 
     fields = view.fields
     headers = [objects[0]._meta.get_field(f).verbose_name for f in fields]
+    sort_links = view.get_sort_links()
+    builders = action_link_builders(view)
     object_list = [
         {
             "object": object,
             "fields": [{"name": f, "value": str(getattr(object, f))} for f in fields],
-            "actions": action_links(view, object),
+            "actions": action_links(view, object, builders),
         }
         for object in objects
     ]
     return {
         "headers": headers,
+        "header_sorts": [
+            (header, sort_links.get(f)) for header, f in zip(headers, fields)
+        ],
         "object_list": object_list,
+        "selectable": is_selectable(view),
     }
+
+
+@register.simple_tag
+def render_object_list(objects, view):
+    """
+    Renders a list of objects, as ``object_list``, but in Python, rather than
+    via the ``neapolitan/partial/list.html`` template.
+
+    Tag usage::
+
+        {% render_object_list objects view %}
+
+    The default ``object_list.html`` template uses this in place of
+    ``object_list`` when the view sets ``compiled_partials = True``, and to
+    render rows from the view's row cache when it sets ``row_cache = True``.
+    """
+    return render_list(view, objects)
+
+
+@register.simple_tag
+def render_object_detail(object, view):
+    """
+    Renders a detail view of an object, as ``object_detail``, but in Python,
+    rather than via the ``neapolitan/partial/detail.html`` template.
+
+    Tag usage::
+
+        {% render_object_detail object view %}
+
+    The default ``object_detail.html`` template uses this in place of
+    ``object_detail`` when the view sets ``compiled_partials = True``.
+    """
+    return get_detail_renderer(view).render(object)
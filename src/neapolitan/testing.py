@@ -0,0 +1,101 @@
+"""
+Test utilities for ``CRUDView`` subclasses.
+
+``assert_constant_queries()`` catches N+1 query regressions: it requests each
+of a view's routed roles with a few objects, and again with many, and fails,
+with the SQL, if any page takes more queries with more objects.
+"""
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.db import connections, router
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from neapolitan.cache import invalidate_lists
+from neapolitan.views import Role
+
+# The query parameters of the requests to each role.
+QUERY_PARAMS = {
+    Role.BULK_DELETE: {"select_all": "1"},
+    Role.BULK_UPDATE: {"select_all": "1"},
+}
+
+
+def get_role_queries(view_class, roles=None):
+    """
+    Requests the GET handler of each of the view's routed `roles` (see
+    `CRUDView.get_urls()`), returning the queries taken by each, rendering
+    included, as a dict of `CaptureQueriesContext` by role.
+
+    The roles for a single object are requested for the model's first object,
+    by primary key, and the AUTOCOMPLETE role for the first of the view's
+    `autocomplete_fields`.
+    """
+    model = view_class.model
+    connection = connections[router.db_for_read(model)]
+    roles_by_name = {
+        f"{view_class.url_base}-{role.url_name_component}": role for role in Role
+    }
+    factory = RequestFactory()
+    url_kwarg = view_class.lookup_url_kwarg or view_class.lookup_field
+    object = model._default_manager.order_by("pk").first()
+
+    queries = {}
+    for pattern in view_class.get_urls(roles):
+        role = roles_by_name[pattern.name]
+        if "get" not in role.handlers():
+            continue
+        params = QUERY_PARAMS.get(role)
+        if role is Role.AUTOCOMPLETE:
+            if not view_class.autocomplete_fields:
+                continue
+            params = {"field": next(iter(view_class.autocomplete_fields))}
+        kwargs = {}
+        if role in (Role.DETAIL, Role.UPDATE, Role.DELETE):
+            kwargs[url_kwarg] = getattr(object, view_class.lookup_field)
+        request = factory.get("/", params)
+        view = pattern.callback
+        if iscoroutinefunction(view):
+            view = async_to_sync(view)
+
+        with CaptureQueriesContext(connection) as context:
+            response = view(request, **kwargs)
+            if hasattr(response, "render"):
+                response.render()
+            elif response.streaming:
+                b"".join(response.streaming_content)
+        queries[role] = context
+    return queries
+
+
+def assert_constant_queries(view_class, make_objects, roles=None, few=1, many=100):
+    """
+    Asserts that the number of queries taken by each of the view's routed
+    `roles` doesn't grow with the number of objects.
+
+    `make_objects(count)` should create objects of the view's model until
+    there are `count` of them. It's called with `few`, before the roles are
+    requested the first time, and then with `many`, for the second time. Only
+    GET handlers are requested, so that the objects aren't changed.
+    """
+    make_objects(few)
+    invalidate_lists(view_class.model)
+    before = get_role_queries(view_class, roles)
+    make_objects(many)
+    # The objects may have been made without sending signals.
+    invalidate_lists(view_class.model)
+    after = get_role_queries(view_class, roles)
+
+    failures = []
+    for role, context in after.items():
+        if len(context) > len(before[role]):
+            sql = "\n".join(
+                f"{i}. {query['sql']}" for i, query in enumerate(context, start=1)
+            )
+            failures.append(
+                f"{view_class.__name__}'s {role.value} page took "
+                f"{len(before[role])} queries with {few} objects, but "
+                f"{len(context)} with {many}:\n{sql}"
+            )
+    if failures:
+        raise AssertionError("\n\n".join(failures))
@@ -1,18 +1,195 @@
+import contextlib
+import datetime
 import enum
-
-from django.core.exceptions import ImproperlyConfigured
+import functools
+import hashlib
+import io
+import logging
+import re
+from urllib.parse import quote
+
+from asgiref.sync import markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import (
+    FieldDoesNotExist,
+    ImproperlyConfigured,
+    ValidationError,
+)
 from django.core.paginator import InvalidPage, Paginator
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import Count, Max, Q
 from django.forms import models as model_forms
-from django.http import Http404, HttpResponseRedirect
+from django.forms.widgets import Select
+from django.http import (
+    Http404,
+    HttpResponseRedirect,
+    JsonResponse,
+    QueryDict,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404
-from django.template.response import TemplateResponse
-from django.urls import NoReverseMatch, path, reverse
+from django.template.loader import select_template
+from django.template.response import SimpleTemplateResponse, TemplateResponse
+from django.urls import (
+    NoReverseMatch,
+    URLResolver,
+    get_resolver,
+    get_script_prefix,
+    get_urlconf,
+    path,
+    reverse,
+)
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
 from django.utils.decorators import classonlymethod
-from django.utils.functional import classproperty
+from django.utils.functional import cached_property, classproperty
+from django.utils.http import RFC3986_SUBDELIMS, escape_leading_slashes, http_date
+from django.utils.translation import get_language
 from django.utils.translation import gettext as _
 from django.views.generic import View
 from django_filters.filterset import filterset_factory
 
+from neapolitan.cache import (
+    ListCache,
+    get_initkwargs_fingerprint,
+    get_list_cache_key,
+    invalidate_lists,
+    invalidate_rows,
+    register_list_cache,
+    register_row_cache,
+)
+from neapolitan.export import EXPORT_FORMATS, astream_rows, stream_rows
+from neapolitan.forms import (
+    ImportForm,
+    bulk_update_form_factory,
+    grid_formset_factory,
+)
+from neapolitan.importers import IMPORT_FORMATS, ImportResult
+from neapolitan.instrumentation import MeasuredTemplateResponse, Timings
+from neapolitan.paginator import (
+    CursorPaginator,
+    EstimatedCountPaginator,
+    NoCountPaginator,
+)
+from neapolitan.search import (
+    SEARCH_BACKENDS,
+    get_search_backend,
+    register_search_index,
+)
+from neapolitan.signals import request_measured
+from neapolitan.widgets import AutocompleteSelect
+
+logger = logging.getLogger("neapolitan")
+
+
+# Form and filterset classes generated by CRUDView, keyed by the view class and
+# the attributes they are built from. Changing any of those attributes, e.g. in
+# a subclass or via as_view() initkwargs, gives a different key.
+_generated_classes = {}
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _get_generated_class(key, factory):
+    try:
+        return _generated_classes[key]
+    except KeyError:
+        return _generated_classes.setdefault(key, factory())
+
+
+@functools.lru_cache(maxsize=256)
+def _get_url_template(resolver, url_name, language_code):
+    """
+    Precompiles the URL pattern named `url_name`, for _reverse().
+
+    Returns a (format string, params, regex, converters) tuple, None if the name
+    isn't routed, or False if the pattern can't be precompiled (e.g. because
+    the name is routed more than once) and reverse() must be used.
+    """
+    possibilities = resolver.reverse_dict.getlist(url_name)
+    if not possibilities:
+        return None
+    if len(possibilities) != 1:
+        return False
+    possibility, pattern, defaults, converters = possibilities[0]
+    if defaults or len(possibility) != 1:
+        return False
+    result, params = possibility[0]
+    return result, frozenset(params), re.compile(f"^{pattern}"), converters
+
+
+def _get_url_builder(url_name):
+    """
+    Returns a function building the URL named `url_name` from a dict of kwargs,
+    or None if the name isn't routed.
+
+    The URL pattern is precompiled, and the current URLconf, language, and
+    script prefix are looked up once, so that building each URL is just string
+    formatting, rather than a call to reverse().
+    """
+    resolver = get_resolver(get_urlconf())
+    template = _get_url_template(resolver, url_name, get_language())
+    if template is None:
+        return None
+    if template is False:
+        return lambda kwargs: reverse(url_name, kwargs=kwargs)
+
+    result, params, regex, converters = template
+    prefix = get_script_prefix()
+    safe = RFC3986_SUBDELIMS + "/~:@"
+
+    def build(kwargs):
+        if params.symmetric_difference(kwargs):
+            return reverse(url_name, kwargs=kwargs)
+        try:
+            subs = {
+                k: converters[k].to_url(v) if k in converters else str(v)
+                for k, v in kwargs.items()
+            }
+        except ValueError:
+            return reverse(url_name, kwargs=kwargs)
+        # As reverse(), check the arguments match the pattern before quoting.
+        url = result % subs
+        if not regex.search(url):
+            return reverse(url_name, kwargs=kwargs)
+        return escape_leading_slashes(quote(prefix + url, safe=safe))
+
+    return build
+
+
+class StreamedObjectList:
+    """
+    Stands in for the object list of a streamed LIST response.
+
+    Truthiness checks whether there are any objects with ``exists()``. Passed to
+    ``render_object_list``, it renders a marker in place of the table rows,
+    which ``neapolitan.renderers.stream_list_content()`` then replaces as the
+    queryset is iterated.
+    """
+
+    def __init__(self, queryset, chunk_size):
+        self.queryset = queryset
+        self.chunk_size = chunk_size
+
+    @cached_property
+    def _exists(self):
+        return self.queryset.exists()
+
+    def __bool__(self):
+        return self._exists
+
+    def __iter__(self):
+        return self.queryset.iterator(chunk_size=self.chunk_size)
+
+    def __aiter__(self):
+        return self.queryset.aiterator(chunk_size=self.chunk_size)
+
 
 # A CRUDView is a view that can perform all the CRUD operations on a model. The
 # `role` attribute determines which operations are available for a given
@@ -20,6 +197,12 @@ from django_filters.filterset import filterset_factory
 class Role(enum.Enum):
     LIST = "list"
     CREATE = "create"
+    EXPORT = "export"
+    BULK_DELETE = "bulk-delete"
+    BULK_UPDATE = "bulk-update"
+    IMPORT = "import"
+    GRID = "grid"
+    AUTOCOMPLETE = "autocomplete"
     DETAIL = "detail"
     UPDATE = "update"
     DELETE = "delete"
@@ -45,6 +228,30 @@ class Role(enum.Enum):
                     "get": "confirm_delete",
                     "post": "process_deletion",
                 }
+            case Role.EXPORT:
+                return {"get": "export"}
+            case Role.BULK_DELETE:
+                return {
+                    "get": "confirm_bulk_delete",
+                    "post": "process_bulk_deletion",
+                }
+            case Role.BULK_UPDATE:
+                return {
+                    "get": "show_bulk_form",
+                    "post": "process_bulk_form",
+                }
+            case Role.IMPORT:
+                return {
+                    "get": "show_import_form",
+                    "post": "process_import",
+                }
+            case Role.GRID:
+                return {
+                    "get": "show_grid",
+                    "post": "process_grid",
+                }
+            case Role.AUTOCOMPLETE:
+                return {"get": "autocomplete"}
 
     def extra_initkwargs(self):
         # Provide template_name_suffix, "_list", "_detail", "_form", etc. for Role.
@@ -57,6 +264,32 @@ class Role(enum.Enum):
                 return {"template_name_suffix": "_form"}
             case Role.DELETE:
                 return {"template_name_suffix": "_confirm_delete"}
+            case Role.EXPORT | Role.AUTOCOMPLETE:
+                return {}
+            case Role.BULK_DELETE:
+                return {"template_name_suffix": "_confirm_bulk_delete"}
+            case Role.BULK_UPDATE:
+                return {"template_name_suffix": "_bulk_form"}
+            case Role.IMPORT:
+                return {"template_name_suffix": "_import"}
+            case Role.GRID:
+                return {"template_name_suffix": "_grid"}
+
+    @property
+    def routed_by_default(self):
+        # Whether get_urls() routes the role when not passed explicit roles.
+        match self:
+            case (
+                Role.EXPORT
+                | Role.BULK_DELETE
+                | Role.BULK_UPDATE
+                | Role.IMPORT
+                | Role.GRID
+                | Role.AUTOCOMPLETE
+            ):
+                return False
+            case _:
+                return True
 
     @property
     def url_name_component(self):
@@ -77,6 +310,18 @@ class Role(enum.Enum):
                 return f"{url_base}/<{path_converter}:{url_kwarg}>/edit/"
             case Role.DELETE:
                 return f"{url_base}/<{path_converter}:{url_kwarg}>/delete/"
+            case Role.EXPORT:
+                return f"{url_base}/export/"
+            case Role.BULK_DELETE:
+                return f"{url_base}/bulk-delete/"
+            case Role.BULK_UPDATE:
+                return f"{url_base}/bulk-update/"
+            case Role.IMPORT:
+                return f"{url_base}/import/"
+            case Role.GRID:
+                return f"{url_base}/grid/"
+            case Role.AUTOCOMPLETE:
+                return f"{url_base}/autocomplete/"
 
     def get_url(self, view_cls):
         return path(
@@ -85,21 +330,39 @@ class Role(enum.Enum):
             name=f"{view_cls.url_base}-{self.url_name_component}"
         )
 
-    def reverse(self, view, object=None):
-        url_name = f"{view.url_base}-{self.url_name_component}"
+    def url_builder(self, view):
+        """
+        Returns a function taking an object (ignored for the roles that aren't
+        for a single object) and returning the URL for this role, or None if
+        the role isn't routed for the view.
+
+        Use this rather than reverse() when building URLs for many objects.
+        """
+        build = _get_url_builder(f"{view.url_base}-{self.url_name_component}")
+        if build is None:
+            return None
         url_kwarg = view.lookup_url_kwarg or view.lookup_field
+        lookup_field = view.lookup_field
         match self:
-            case Role.LIST | Role.CREATE:
-                return reverse(url_name)
+            case Role.DETAIL | Role.UPDATE | Role.DELETE:
+                return lambda object: build({url_kwarg: getattr(object, lookup_field)})
             case _:
-                return reverse(
-                    url_name,
-                    kwargs={url_kwarg: getattr(object, view.lookup_field)},
-                )
+                return lambda object=None: build({})
+
+    def reverse(self, view, object=None):
+        build = self.url_builder(view)
+        if build is None:
+            url_name = f"{view.url_base}-{self.url_name_component}"
+            raise NoReverseMatch(
+                "Reverse for '%s' not found. '%s' is not a valid view function "
+                "or pattern name." % (url_name, url_name)
+            )
+        return build(object)
 
     def maybe_reverse(self, view, object=None):
         try:
-            return self.reverse(view, object)
+            build = self.url_builder(view)
+            return None if build is None else build(object)
         except NoReverseMatch:
             return None
 
@@ -131,56 +394,239 @@ class CRUDView(View):
     form_class = None
     template_name = None
     context_object_name = None
+    ordering = None
 
     # Pagination parameters.
     # Set `paginate_by` to an integer value to turn pagination on.
+    # Set `pagination_mode` to "cursor" to use keyset pagination, which avoids
+    # OFFSET and COUNT(*) queries on large tables, to "nocount" to avoid the
+    # COUNT(*) only, or to "estimated" to use the database's row estimate for
+    # unfiltered querysets of at least `estimated_count_threshold` rows.
     paginate_by = None
     page_kwarg = "page"
     allow_empty = True
+    pagination_mode = "page"
+    estimated_count_threshold = 10_000
+
+    # Sortable columns for the LIST role.
+    # Set `ordering_fields` to the fields the list may be ordered by, with the
+    # `ordering_kwarg` query parameter, e.g. "?ordering=-title". Their column
+    # headers link to order by them. The `lookup_field` is appended to the
+    # ordering as a unique tiebreaker, so that pages are stable. Allow only
+    # indexed fields: the neapolitan.W001 check warns of others.
+    ordering_fields = None
+    ordering_kwarg = "ordering"
+
+    # Related object loading for the LIST and DETAIL roles.
+    # Relations named in `fields` are loaded with select_related() (forward
+    # foreign keys and one-to-ones) or prefetch_related() (reverse and
+    # many-to-many relations). Set `auto_related = False` to disable this, and
+    # use `select_related` and `prefetch_related` to add further lookups.
+    auto_related = True
+    select_related = ()
+    prefetch_related = ()
+
+    # Column projection for the LIST role.
+    # Set `list_projection = True` to load only the columns needed to render the
+    # list: `fields`, the ordering, and the lookup field. Rows joined with
+    # select_related() are loaded in full, so that their __str__() works. Add
+    # further columns, including related ones such as "bookmark__title", in
+    # `list_projection_fields`.
+    list_projection = False
+    list_projection_fields = ()
+
+    # Conditional GET for the LIST and DETAIL roles.
+    # Set `last_modified_field` to a field updated whenever an object changes,
+    # such as a DateTimeField with auto_now=True, to send ETag headers, and
+    # Last-Modified for DETAIL, and to respond 304 Not Modified, without
+    # rendering, when the client's copy is current. See `get_validators()`.
+    last_modified_field = None
+
+    # When DEBUG is on, log a warning if rendering a LIST or DETAIL page takes
+    # more than `query_budget` queries.
+    query_budget = None
+
+    # Set `instrument = True` to measure the duration, and the number of
+    # queries, of each phase of the list, detail, form, and delete handlers,
+    # and of rendering (see neapolitan.instrumentation). The phases are sent
+    # with the `neapolitan.signals.request_measured` signal and, with
+    # `server_timing = True`, in a Server-Timing response header.
+    instrument = False
+    server_timing = False
+    timings = None
 
     # Suffix that should be appended to automatically generated template names.
     template_name_suffix = None
 
+    # Set `compiled_partials = True` to have the default list and detail
+    # templates render their tables in Python (see neapolitan.renderers),
+    # rather than via the neapolitan/partial/ templates.
+    compiled_partials = False
+
+    # Set `stream_list = True` to stream unpaginated LIST responses, rendering
+    # the rows as the queryset is iterated in chunks of `stream_chunk_size`.
+    stream_list = False
+    stream_chunk_size = 2000
+
+    # Set `row_cache = True` to cache the rendered rows of the LIST table in
+    # the `row_cache_alias` cache (see neapolitan.cache). Cached rows are
+    # invalidated when objects are saved or deleted, and checked against
+    # `last_modified_field`, if set.
+    row_cache = False
+    row_cache_alias = "default"
+    row_cache_timeout = 300
+
+    # Set `list_cache = True` to cache whole LIST responses in the
+    # `list_cache_alias` cache, by query string (see `get_list_cache_key()`).
+    # Cached lists become stale when objects are saved or deleted. A stale
+    # response is re-rendered by one request, and served to others meanwhile.
+    # Responses are shared between users, so the page must not vary by user.
+    list_cache = False
+    list_cache_alias = "default"
+    list_cache_timeout = 300
+
+    # The EXPORT role streams the filtered list as CSV or JSON Lines, in the
+    # format named by the `export_format_kwarg` query parameter (defaulting to
+    # the first of `export_formats`). Rows are read as tuples, with
+    # values_list(), in chunks of `stream_chunk_size`.
+    export_formats = ("csv", "jsonl")
+    export_format_kwarg = "format"
+
+    # The BULK_DELETE and BULK_UPDATE roles act on the objects selected by
+    # primary key in the `selected` query parameter or, with `select_all`, on
+    # all objects matching the list's filters. Changes are made with
+    # QuerySet.delete() and update(), `bulk_batch_size` objects at a time, in
+    # a transaction.
+    bulk_batch_size = 1000
+
+    # The IMPORT role creates objects from an uploaded CSV or JSON Lines file,
+    # in one of `import_formats`. Each row is validated by the form from
+    # `get_form_class()`, and the valid rows are inserted with bulk_create(),
+    # `import_batch_size` objects at a time, each batch in a transaction.
+    import_formats = ("csv", "jsonl")
+    import_batch_size = 1000
+
+    # Foreign keys in `autocomplete_fields`, a dict mapping their names to
+    # lists of the related model's fields to search, are rendered in forms and
+    # filters with an AutocompleteSelect (see neapolitan.widgets), rather than
+    # a <select> of every related object. Matches are fetched from the
+    # AUTOCOMPLETE role, `autocomplete_page_size` at a time. get_urls() routes
+    # the role when this is set.
+    autocomplete_fields = None
+    autocomplete_page_size = 20
+
+    # Set `search_fields` to a list of fields, or lookups such as
+    # "bookmark__title", to filter the list by the `search_kwarg` query
+    # parameter, with the search backend named by `search_backend`, or
+    # chosen for the model's database (see neapolitan.search).
+    search_fields = None
+    search_kwarg = "q"
+    search_backend = None
+
+    # Set `save_changed_fields = True` for the UPDATE role to save only the
+    # fields the user changed, with save(update_fields=...), and to skip the
+    # save when nothing changed. See `get_update_fields()`.
+    save_changed_fields = False
+
     def list(self, request, *args, **kwargs):
         """GET handler for the list view."""
 
-        queryset = self.get_queryset()
-        filterset = self.get_filterset(queryset)
-        if filterset is not None:
-            queryset = filterset.qs
+        if self.list_cache and not self.stream_list:
+            list_cache = ListCache(self)
+            response = list_cache.get_response()
+            if response is not None:
+                return response
+            return list_cache.set_response(self.get_list_response(request))
+        return self.get_list_response(request)
+
+    def get_list_response(self, request):
+        """
+        Returns the response for the list view, bypassing `list_cache`.
+        """
+        with self.measure("queryset"):
+            queryset = self.get_queryset()
+        with self.measure("filter"):
+            queryset, filterset = self.get_filtered_queryset(queryset)
+
+        with self.measure("validators"):
+            validators = self.get_validators(queryset)
+        not_modified = self.get_not_modified_response(validators)
+        if not_modified is not None:
+            return not_modified
 
         if not self.allow_empty and not queryset.exists():
             raise Http404
 
         paginate_by = self.get_paginate_by()
         if paginate_by is None:
-            # Unpaginated response
+            # Unpaginated response, optionally streamed.
+            if self.stream_list:
+                queryset = StreamedObjectList(queryset, self.stream_chunk_size)
             self.object_list = queryset
-            context = self.get_context_data(
-                page_obj=None,
-                is_paginated=False,
-                paginator=None,
-                filterset=filterset,
-            )
+            with self.measure("context"):
+                context = self.get_context_data(
+                    page_obj=None,
+                    is_paginated=False,
+                    paginator=None,
+                    filterset=filterset,
+                )
         else:
             # Paginated response
-            page = self.paginate_queryset(queryset, paginate_by)
+            with self.measure("paginate"):
+                page = self.paginate_queryset(queryset, paginate_by)
             self.object_list = page.object_list
-            context = self.get_context_data(
-                page_obj=page,
-                is_paginated=page.has_other_pages(),
-                paginator=page.paginator,
-                filterset=filterset,
-            )
+            with self.measure("context"):
+                context = self.get_context_data(
+                    page_obj=page,
+                    is_paginated=page.has_other_pages(),
+                    paginator=page.paginator,
+                    filterset=filterset,
+                )
+            if self.pagination_mode == "cursor":
+                context["next_cursor"] = page.next_cursor
+                context["previous_cursor"] = page.previous_cursor
 
-        return self.render_to_response(context)
+        if isinstance(self.object_list, StreamedObjectList):
+            response = self.render_to_streaming_response(context)
+        else:
+            response = self.render_to_response(context)
+        return self.add_validator_headers(response, validators)
+
+    def export(self, request, *args, **kwargs):
+        """GET handler for the export view."""
+
+        queryset = self.get_filtered_queryset(self.get_queryset())[0]
+
+        export_format = self.get_export_format()
+        encoder, content_type = EXPORT_FORMATS[export_format]
+        fields = self.get_export_fields()
+        rows = queryset.values_list(*fields).iterator(
+            chunk_size=self.stream_chunk_size
+        )
+        response = StreamingHttpResponse(
+            stream_rows(encoder, fields, rows, self.stream_chunk_size),
+            content_type=content_type,
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="{self.url_base}.{export_format}"'
+        )
+        return response
 
     def detail(self, request, *args, **kwargs):
         """GET handler for the detail view."""
 
-        self.object = self.get_object()
-        context = self.get_context_data()
-        return self.render_to_response(context)
+        with self.measure("object"):
+            self.object = self.get_object()
+        with self.measure("validators"):
+            validators = self.get_validators()
+        not_modified = self.get_not_modified_response(validators)
+        if not_modified is not None:
+            return not_modified
+
+        with self.measure("context"):
+            context = self.get_context_data()
+        response = self.render_to_response(context)
+        return self.add_validator_headers(response, validators)
 
     def show_form(self, request, *args, **kwargs):
         """GET handler for the create and update form views."""
@@ -195,15 +641,20 @@ class CRUDView(View):
         """POST handler for the create and update form views."""
 
         if self.role == Role.UPDATE:
-            self.object = self.get_object()
-        form = self.get_form(
-            data=request.POST,
-            files=request.FILES,
-            instance=self.object,
-        )
-        if form.is_valid():
-            return self.form_valid(form)
-        return self.form_invalid(form)
+            with self.measure("object"):
+                self.object = self.get_object()
+        with self.measure("form"):
+            form = self.get_form(
+                data=request.POST,
+                files=request.FILES,
+                instance=self.object,
+            )
+            is_valid = form.is_valid()
+        if is_valid:
+            with self.measure("save"):
+                return self.form_valid(form)
+        with self.measure("context"):
+            return self.form_invalid(form)
 
     def confirm_delete(self, request, *args, **kwargs):
         """GET handler for the delete confirmation view."""
@@ -215,10 +666,127 @@ class CRUDView(View):
     def process_deletion(self, request, *args, **kwargs):
         """POST handler for the delete confirmation view."""
 
-        self.object = self.get_object()
-        self.object.delete()
+        with self.measure("object"):
+            self.object = self.get_object()
+        with self.measure("delete"):
+            pk = self.object.pk
+            self.object.delete()
+            self.objects_changed([pk])
+        return HttpResponseRedirect(self.get_success_url())
+
+    def confirm_bulk_delete(self, request, *args, **kwargs):
+        """GET handler for the bulk delete confirmation view."""
+
+        queryset = self.get_bulk_queryset()
+        context = self.get_context_data(object_count=queryset.count())
+        return self.render_to_response(context)
+
+    def process_bulk_deletion(self, request, *args, **kwargs):
+        """POST handler for the bulk delete confirmation view."""
+
+        pks = self.get_bulk_pks(self.get_bulk_queryset())
+        self.bulk_delete(pks)
+        self.objects_changed(pks)
         return HttpResponseRedirect(self.get_success_url())
 
+    def show_bulk_form(self, request, *args, **kwargs):
+        """GET handler for the bulk update form view."""
+
+        queryset = self.get_bulk_queryset()
+        form = self.get_bulk_form()
+        context = self.get_context_data(form=form, object_count=queryset.count())
+        return self.render_to_response(context)
+
+    def process_bulk_form(self, request, *args, **kwargs):
+        """POST handler for the bulk update form view."""
+
+        queryset = self.get_bulk_queryset()
+        form = self.get_bulk_form(data=request.POST, files=request.FILES)
+        if not form.is_valid():
+            context = self.get_context_data(form=form, object_count=queryset.count())
+            return self.render_to_response(context)
+
+        pks = self.get_bulk_pks(queryset)
+        self.bulk_update(pks, form.get_bulk_values())
+        self.objects_changed(pks)
+        return HttpResponseRedirect(self.get_success_url())
+
+    def show_import_form(self, request, *args, **kwargs):
+        """GET handler for the import view."""
+
+        form = self.get_import_form()
+        context = self.get_context_data(form=form)
+        return self.render_to_response(context)
+
+    def process_import(self, request, *args, **kwargs):
+        """POST handler for the import view."""
+
+        form = self.get_import_form(data=request.POST, files=request.FILES)
+        if not form.is_valid():
+            return self.form_invalid(form)
+
+        result = self.import_rows(
+            form.cleaned_data["file"], form.cleaned_data["format"]
+        )
+        context = self.get_context_data(
+            form=self.get_import_form(), import_result=result
+        )
+        return self.render_to_response(context)
+
+    def autocomplete(self, request, *args, **kwargs):
+        """GET handler for the autocomplete view."""
+
+        field = self.get_autocomplete_field()
+        queryset = self.get_autocomplete_queryset(field)
+        objects = list(queryset[: self.autocomplete_page_size + 1])
+        return self.render_autocomplete_response(field, objects)
+
+    def show_grid(self, request, *args, **kwargs):
+        """GET handler for the grid view."""
+
+        context = self._get_grid_context()
+        formset = self.get_grid_formset(objects=self.object_list)
+        context = self.get_context_data(formset=formset, **context)
+        return self.render_to_response(context)
+
+    def process_grid(self, request, *args, **kwargs):
+        """POST handler for the grid view."""
+
+        context = self._get_grid_context()
+        formset = self.get_grid_formset(
+            data=request.POST, files=request.FILES, objects=self.object_list
+        )
+        if not formset.is_valid():
+            context = self.get_context_data(formset=formset, **context)
+            return self.render_to_response(context)
+
+        objects = self.grid_update(formset)
+        self.objects_changed([obj.pk for obj in objects])
+        return HttpResponseRedirect(self.get_success_url())
+
+    def _get_grid_context(self):
+        # Sets object_list to the current page of the list, returning the
+        # pagination and filter context.
+        queryset, filterset = self.get_filtered_queryset(self.get_queryset())
+
+        context = {"filterset": filterset}
+        paginate_by = self.get_paginate_by()
+        if paginate_by is None:
+            self.object_list = list(queryset)
+            context.update(page_obj=None, is_paginated=False, paginator=None)
+        else:
+            page = self.paginate_queryset(queryset, paginate_by)
+            self.object_list = list(page.object_list)
+            context.update(
+                page_obj=page,
+                is_paginated=page.has_other_pages(),
+                paginator=page.paginator,
+            )
+            if self.pagination_mode == "cursor":
+                context["next_cursor"] = page.next_cursor
+                context["previous_cursor"] = page.previous_cursor
+        return context
+
     # Queryset and object lookup
 
     def get_queryset(self):
@@ -229,16 +797,247 @@ class CRUDView(View):
         from which to perform the individual object lookup.
         """
         if self.queryset is not None:
-            return self.queryset._clone()
+            queryset = self.queryset._clone()
+        elif self.model is not None:
+            queryset = self.model._default_manager.all()
+        else:
+            msg = (
+                "'%s' must either define 'queryset' or 'model', or override "
+                + "'get_queryset()'"
+            )
+            raise ImproperlyConfigured(msg % self.__class__.__name__)
 
-        if self.model is not None:
-            return self.model._default_manager.all()
+        ordering = self.get_ordering()
+        if ordering:
+            queryset = queryset.order_by(*ordering)
 
-        msg = (
-            "'%s' must either define 'queryset' or 'model', or override "
-            + "'get_queryset()'"
+        if getattr(self, "role", None) in (Role.LIST, Role.DETAIL):
+            select_related, prefetch_related = self.get_related_lookups()
+            if select_related:
+                queryset = queryset.select_related(*select_related)
+            if prefetch_related:
+                queryset = queryset.prefetch_related(*prefetch_related)
+
+        if getattr(self, "role", None) == Role.LIST and self.list_projection:
+            queryset = queryset.only(*self.get_projection_fields())
+        return queryset
+
+    def get_ordering(self):
+        """
+        Returns the field names used to order the queryset.
+
+        With `ordering_fields` set, that's the requested ordering, if valid, or
+        else `ordering` or the model's, followed by the `lookup_field`.
+        """
+        if not self.ordering_fields:
+            return self.ordering
+        ordering = list(
+            self.get_requested_ordering()
+            or self.ordering
+            or self.model._meta.ordering
         )
-        raise ImproperlyConfigured(msg % self.__class__.__name__)
+        if self.lookup_field not in {name.lstrip("-") for name in ordering}:
+            ordering.append(self.lookup_field)
+        return ordering
+
+    def get_requested_ordering(self):
+        """
+        Returns the ordering requested by the `ordering_kwarg` query parameter,
+        a comma-separated list of field names, each optionally prefixed by "-"
+        for descending order. Returns None if it's not given, or if any field
+        isn't in `ordering_fields`.
+        """
+        request = getattr(self, "request", None)
+        if not self.ordering_fields or request is None:
+            return None
+        value = request.GET.get(self.ordering_kwarg)
+        if not value:
+            return None
+        ordering = value.split(",")
+        if all(name.removeprefix("-") in self.ordering_fields for name in ordering):
+            return ordering
+        return None
+
+    def get_sort_links(self):
+        """
+        Returns a dict, by field name, of the sort links for the headers of the
+        list's columns in `ordering_fields`. Each link is a dict of the `url`,
+        a query string ordering the list by the field (descending, if it's
+        already ascending), and the current sort `direction`: "ascending",
+        "descending", or None.
+        """
+        if not self.ordering_fields:
+            return {}
+        request = getattr(self, "request", None)
+        query = request.GET.copy() if request is not None else QueryDict(mutable=True)
+        # Return to the first page.
+        query.pop(self.page_kwarg, None)
+        ordering = (
+            self.get_requested_ordering()
+            or self.ordering
+            or self.model._meta.ordering
+            or [None]
+        )
+        links = {}
+        for name in self.fields:
+            if name not in self.ordering_fields:
+                continue
+            direction = None
+            if ordering[0] == name:
+                direction = "ascending"
+            elif ordering[0] == f"-{name}":
+                direction = "descending"
+            query[self.ordering_kwarg] = (
+                f"-{name}" if direction == "ascending" else name
+            )
+            links[name] = {"url": f"?{query.urlencode()}", "direction": direction}
+        return links
+
+    def get_related_lookups(self):
+        """
+        Returns a pair of lists: the lookups to pass to `select_related()` and
+        to `prefetch_related()` for the LIST and DETAIL roles.
+        """
+        select_related = list(self.select_related)
+        prefetch_related = list(self.prefetch_related)
+        if not self.auto_related or self.model is None or not self.fields:
+            return select_related, prefetch_related
+
+        for name in self.fields:
+            try:
+                field = self.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if not field.is_relation:
+                continue
+            # Generic foreign keys are neither concrete nor auto-created, and
+            # can only be prefetched.
+            if (field.many_to_one or field.one_to_one) and (
+                field.concrete or field.auto_created
+            ):
+                select_related.append(name)
+            else:
+                prefetch_related.append(name)
+        return select_related, prefetch_related
+
+    def get_projection_fields(self):
+        """
+        Returns the field names to pass to `only()` when `list_projection` is
+        enabled.
+        """
+        opts = self.model._meta
+        ordering = [f for f in self.get_ordering() or [] if isinstance(f, str)]
+        select_related = self.get_related_lookups()[0]
+        candidates = [
+            *(self.fields or []),
+            *(f.lstrip("-").split("__")[0] for f in ordering),
+            # Relations can't be both deferred and selected.
+            *(lookup.split("__")[0] for lookup in select_related),
+            self.lookup_field,
+            # Read by the row cache, to version the rows.
+            *([self.last_modified_field] if self.last_modified_field else []),
+        ]
+        names = [opts.pk.name]
+        for name in candidates:
+            try:
+                field = opts.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            # Reverse relations and many-to-many fields have no column.
+            if field.concrete and not field.many_to_many and name not in names:
+                names.append(name)
+        names.extend(self.list_projection_fields)
+        return names
+
+    def get_autocomplete_field(self):
+        """
+        Returns the foreign key named by the `field` query parameter, which
+        must be in `autocomplete_fields`.
+        """
+        name = self.request.GET.get("field")
+        if name not in (self.autocomplete_fields or {}):
+            raise Http404(_("Invalid autocomplete field."))
+        return self.model._meta.get_field(name)
+
+    def get_autocomplete_choices(self, field):
+        """
+        Returns the queryset the form field for the foreign key `field`
+        chooses from: that of the form from `get_form()`, or, if the form
+        doesn't have the field, of the filterset's form. Custom querysets, and
+        `limit_choices_to`, are thereby respected.
+        """
+        form_fields = self.get_form().fields
+        if field.name not in form_fields:
+            filterset = self.get_filterset()
+            form_fields = filterset.form.fields if filterset is not None else {}
+        form_field = form_fields.get(field.name)
+        if not isinstance(form_field, model_forms.ModelChoiceField):
+            raise Http404(_("Invalid autocomplete field."))
+        return form_field.queryset
+
+    def get_autocomplete_queryset(self, field):
+        """
+        Returns the choices for the foreign key `field`, from
+        `get_autocomplete_choices()`, matching the `q` query parameter, in
+        primary key order, after the primary key in the `after` query
+        parameter, if given.
+
+        Objects match if any of the field's search fields, in
+        `autocomplete_fields`, starts with the query, ignoring case. Unlike
+        `icontains`, such a prefix match can use an index, but only one on the
+        case-insensitive expression the database compares. See the
+        autocomplete docs.
+        """
+        queryset = self.get_autocomplete_choices(field)
+        query = self.request.GET.get("q", "").strip()
+        if query:
+            lookups = Q()
+            for name in self.autocomplete_fields[field.name]:
+                lookups |= Q(**{f"{name}__istartswith": query})
+            queryset = queryset.filter(lookups)
+        after = self.request.GET.get("after")
+        if after:
+            try:
+                after = queryset.model._meta.pk.to_python(after)
+            except ValidationError:
+                raise Http404(_("Invalid autocomplete page."))
+            queryset = queryset.filter(pk__gt=after)
+        return queryset.order_by("pk")
+
+    def render_autocomplete_response(self, field, objects):
+        """
+        Returns the JSON response for the autocomplete view, given up to one
+        more than `autocomplete_page_size` objects: the `results`, with their
+        `id` and `text`, and the `next` value of the `after` query parameter,
+        or null for the last page.
+        """
+        page_size = self.autocomplete_page_size
+        to_field = field.target_field.attname
+        results = [
+            {"id": getattr(obj, to_field), "text": str(obj)}
+            for obj in objects[:page_size]
+        ]
+        after = objects[page_size - 1].pk if len(objects) > page_size else None
+        return JsonResponse({"results": results, "next": after})
+
+    def get_export_format(self):
+        """
+        Returns the requested export format, raising Http404 if it's not one
+        of `export_formats`.
+        """
+        export_format = self.request.GET.get(self.export_format_kwarg, "")
+        export_format = export_format or self.export_formats[0]
+        if export_format not in self.export_formats:
+            msg = "Unsupported export format: %s"
+            raise Http404(_(msg) % export_format)
+        return export_format
+
+    def get_export_fields(self):
+        """
+        Returns the field names to export. Relations are exported as their
+        primary key.
+        """
+        return list(self.fields)
 
     def get_object(self):
         """
@@ -257,6 +1056,175 @@ class CRUDView(View):
 
         return get_object_or_404(queryset, **lookup)
 
+    def get_bulk_queryset(self):
+        """
+        Returns the queryset of objects selected for the bulk roles.
+
+        The list's filters are applied. Unless the `select_all` query parameter
+        is set, only the objects whose primary keys are given in the `selected`
+        query parameter are included.
+        """
+        queryset = self.get_filtered_queryset(self.get_queryset())[0]
+        if self.request.GET.get("select_all"):
+            return queryset
+
+        to_python = self.model._meta.pk.to_python
+        try:
+            pks = [to_python(pk) for pk in self.request.GET.getlist("selected")]
+        except ValidationError:
+            raise Http404(_("Invalid selection."))
+        return queryset.filter(pk__in=pks)
+
+    def get_bulk_pks(self, queryset):
+        """
+        Returns the list of primary keys of the selected objects.
+        """
+        return list(queryset.order_by().values_list("pk", flat=True))
+
+    def _get_batches(self, pks):
+        for start in range(0, len(pks), self.bulk_batch_size):
+            yield pks[start : start + self.bulk_batch_size]
+
+    def bulk_delete(self, pks):
+        """
+        Deletes the objects with the given primary keys.
+        """
+        manager = self.model._default_manager
+        with transaction.atomic(using=router.db_for_write(self.model)):
+            for batch in self._get_batches(pks):
+                manager.filter(pk__in=batch).delete()
+
+    def bulk_update(self, pks, values):
+        """
+        Updates the objects with the given primary keys, setting the field
+        `values`, a dict. Fields with `auto_now` are also set, as by `save()`.
+        """
+        values = {
+            **{
+                field.name: timezone.now()
+                for field in self.model._meta.concrete_fields
+                if getattr(field, "auto_now", False)
+            },
+            **values,
+        }
+        manager = self.model._default_manager
+        with transaction.atomic(using=router.db_for_write(self.model)):
+            for batch in self._get_batches(pks):
+                manager.filter(pk__in=batch).update(**values)
+
+    def import_rows(self, file, import_format):
+        """
+        Creates objects from the rows of the uploaded ``file``, in the named
+        import format, returning an ``ImportResult``.
+
+        The file is read a row at a time. Each row is validated by the form
+        from `get_form_class()`, and the objects of valid rows are inserted
+        in batches of `import_batch_size` (see `import_batch()`). Many-to-many
+        fields aren't saved.
+        """
+        result = ImportResult()
+        text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+        rows = IMPORT_FORMATS[import_format](text)
+        form_class = self.get_form_class()
+        batch = []
+        line_number = 0
+        try:
+            for line_number, data in rows:
+                if data is None:
+                    result.add_invalid_row(line_number)
+                    continue
+                form = form_class(data=data)
+                if not form.is_valid():
+                    errors = {name: list(e) for name, e in form.errors.items()}
+                    result.add_error(line_number, errors)
+                    continue
+                batch.append((line_number, form.save(commit=False)))
+                if len(batch) >= self.import_batch_size:
+                    self.import_batch(batch, result)
+                    batch = []
+        except UnicodeDecodeError:
+            result.add_error(
+                line_number + 1, {"__all__": [_("The file isn't valid UTF-8.")]}
+            )
+        # Leave the upload open, for the request to close.
+        text.detach()
+        if batch:
+            self.import_batch(batch, result)
+        self.objects_changed(result.created_pks)
+        return result
+
+    def import_batch(self, batch, result):
+        """
+        Inserts a batch of ``(line number, object)`` pairs, in a transaction,
+        recording the outcome in the ``result``.
+
+        If the insert fails, such as for rows of the file that duplicate each
+        other's unique values, the objects are saved one at a time instead,
+        recording the rows that fail as errors.
+        """
+        using = router.db_for_write(self.model)
+        objects = [obj for _line_number, obj in batch]
+        try:
+            with transaction.atomic(using=using):
+                self.model._default_manager.bulk_create(
+                    objects, batch_size=self.import_batch_size
+                )
+        except IntegrityError:
+            pass
+        else:
+            result.add_created(objects)
+            return
+
+        pk_field = self.model._meta.pk
+        with transaction.atomic(using=using):
+            for line_number, obj in batch:
+                if pk_field.db_returning:
+                    # Clear primary keys set before the insert was rolled back.
+                    obj.pk = None
+                obj._state.adding = True
+                try:
+                    with transaction.atomic(using=using):
+                        obj.save(force_insert=True, using=using)
+                except IntegrityError as e:
+                    result.add_error(line_number, {"__all__": [str(e)]})
+                else:
+                    result.add_created([obj])
+
+    def grid_update(self, formset):
+        """
+        Saves the changed objects of a valid grid `formset`, with a single
+        `bulk_update()` of the fields changed in any of its forms, and returns
+        them. Fields with `auto_now` are also set, as by `save()`.
+
+        Many-to-many fields aren't saved.
+        """
+        forms = [form for form in formset.initial_forms if form.has_changed()]
+        changed_data = {name for form in forms for name in form.changed_data}
+        fields = [
+            field
+            for field in self.model._meta.concrete_fields
+            if field.name in changed_data and not field.primary_key
+        ]
+        if not fields:
+            return []
+
+        fields += [
+            field
+            for field in self.model._meta.concrete_fields
+            if getattr(field, "auto_now", False) and field not in fields
+        ]
+        objects = [form.instance for form in forms]
+        for obj in objects:
+            for field in fields:
+                # Sets auto_now fields.
+                field.pre_save(obj, add=False)
+        self.model._default_manager.bulk_update(
+            objects,
+            [field.name for field in fields],
+            batch_size=self.bulk_batch_size,
+        )
+        return objects
+
     # Form handling
 
     def get_form_class(self):
@@ -267,7 +1235,11 @@ class CRUDView(View):
             return self.form_class
 
         if self.model is not None and self.fields is not None:
-            return model_forms.modelform_factory(self.model, fields=self.fields)
+            key = ("form", self.__class__, self.model, _freeze(self.fields))
+            return _get_generated_class(
+                key,
+                lambda: model_forms.modelform_factory(self.model, fields=self.fields),
+            )
 
         msg = (
             "'%s' must either define 'form_class' or both 'model' and "
@@ -280,23 +1252,184 @@ class CRUDView(View):
         Returns a form instance.
         """
         cls = self.get_form_class()
-        return cls(data=data, files=files, **kwargs)
+        return self.use_autocomplete_widgets(cls(data=data, files=files, **kwargs))
+
+    def get_bulk_update_fields(self):
+        """
+        Returns the names of the fields that may be set by the BULK_UPDATE
+        role: those in `fields` with a column that isn't unique.
+        """
+        names = []
+        for name in self.fields or []:
+            try:
+                field = self.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if field.concrete and not field.many_to_many and not field.unique:
+                names.append(name)
+        return names
+
+    def get_bulk_form_class(self):
+        """
+        Returns the form class for the BULK_UPDATE role, from
+        `get_form_class()` and `get_bulk_update_fields()`. See
+        `neapolitan.forms.bulk_update_form_factory()`.
+        """
+        form_class = self.get_form_class()
+        fields = tuple(self.get_bulk_update_fields())
+        key = ("bulk_form", self.__class__, form_class, fields)
+        return _get_generated_class(
+            key, lambda: bulk_update_form_factory(form_class, fields)
+        )
+
+    def get_bulk_form(self, data=None, files=None, **kwargs):
+        """
+        Returns a bulk update form instance.
+        """
+        cls = self.get_bulk_form_class()
+        return self.use_autocomplete_widgets(cls(data=data, files=files, **kwargs))
+
+    def get_import_form(self, data=None, files=None, **kwargs):
+        """
+        Returns an import form instance. See `neapolitan.forms.ImportForm`.
+        """
+        return ImportForm(
+            data=data, files=files, formats=self.import_formats, **kwargs
+        )
+
+    def get_grid_formset_class(self):
+        """
+        Returns the formset class for the GRID role, with a form from
+        `get_form_class()` for each object. See
+        `neapolitan.forms.grid_formset_factory()`.
+        """
+        form_class = self.get_form_class()
+        key = ("grid_formset", self.__class__, form_class)
+        return _get_generated_class(key, lambda: grid_formset_factory(form_class))
+
+    def get_grid_formset(self, data=None, files=None, objects=(), **kwargs):
+        """
+        Returns a grid formset instance, for the list of `objects`.
+        """
+        cls = self.get_grid_formset_class()
+        formset = cls(data=data, files=files, queryset=objects, **kwargs)
+        for form in formset.forms:
+            self.use_autocomplete_widgets(form)
+        return formset
+
+    def use_autocomplete_widgets(self, form):
+        """
+        Replaces the widgets of the `form`'s fields in `autocomplete_fields`
+        with an `AutocompleteSelect`, if the AUTOCOMPLETE role is routed, and
+        returns the form.
+        """
+        if not self.autocomplete_fields:
+            return form
+        url = Role.AUTOCOMPLETE.maybe_reverse(self)
+        if url is None:
+            return form
+        for name in self.autocomplete_fields:
+            field = form.fields.get(name)
+            if not isinstance(field, model_forms.ModelChoiceField):
+                continue
+            if type(field.widget) is not Select:
+                # Multiple choices, or a customised widget.
+                continue
+            widget = AutocompleteSelect(f"{url}?field={quote(name)}")
+            widget.is_required = field.required
+            widget.choices = field.choices
+            field.widget = widget
+        return form
+
+    def get_update_fields(self, form):
+        """
+        Returns the names of the fields to save for the valid `form`, or None
+        to save them all.
+
+        With `save_changed_fields`, the UPDATE role saves the model fields in
+        `form.changed_data`, and those with `auto_now`, or none if none
+        changed. Override this if the form or model's `save()` sets other
+        fields.
+        """
+        if not self.save_changed_fields or self.role != Role.UPDATE:
+            return None
+        fields = self.model._meta.concrete_fields
+        changed = [
+            field.name
+            for field in fields
+            if field.name in form.changed_data and not field.primary_key
+        ]
+        if not changed:
+            return []
+        return changed + [
+            field.name
+            for field in fields
+            if getattr(field, "auto_now", False) and field.name not in changed
+        ]
 
     def form_valid(self, form):
-        self.object = form.save()
+        update_fields = self.get_update_fields(form)
+        if update_fields is None:
+            self.object = form.save()
+        else:
+            self.object = form.save(commit=False)
+            if update_fields:
+                self.object.save(update_fields=update_fields)
+            form.save_m2m()
+        if update_fields is None or form.has_changed():
+            self.objects_changed([self.object.pk])
         return HttpResponseRedirect(self.get_success_url())
 
     def form_invalid(self, form):
         context = self.get_context_data(form=form)
         return self.render_to_response(context)
 
+    def objects_changed(self, pks):
+        """
+        Called after objects are created, updated, or deleted by the view,
+        with their primary keys. Invalidates their cached rows, and the
+        model's cached lists, and updates the search index.
+
+        Override this to invalidate other caches, or call it after changing
+        objects in ways that don't send model signals, such as
+        `QuerySet.update()`.
+        """
+        if self.row_cache:
+            invalidate_rows(self.model, pks)
+        if self.list_cache:
+            invalidate_lists(self.model)
+        if self.search_fields:
+            self.get_search_backend().update(pks)
+
+    def measure(self, name):
+        """
+        Returns a context manager measuring a phase of handling the request,
+        named `name`, when `instrument` is on.
+        """
+        if self.timings is None:
+            return contextlib.nullcontext()
+        return self.timings.measure(name)
+
+    def get_list_cache_key(self):
+        """
+        Returns the cache key for the LIST response to the current request,
+        when `list_cache` is enabled. Override this to vary cached responses
+        by other parts of the request.
+        """
+        return get_list_cache_key(self)
+
     def get_success_url(self):
         assert self.model is not None, (
             "'%s' must define 'model' or override 'get_success_url()'"
             % self.__class__.__name__
         )
-        if self.role == Role.DELETE:
+        if self.role in (Role.DELETE, Role.BULK_DELETE, Role.BULK_UPDATE):
             success_url = Role.LIST.reverse(self)
+        elif self.role == Role.GRID:
+            # Return to the same page of the grid.
+            success_url = Role.GRID.reverse(self)
+            if self.request.GET:
+                success_url += f"?{self.request.GET.urlencode()}"
         else:
             success_url = Role.DETAIL.reverse(self, self.object)
         return success_url
@@ -311,26 +1444,48 @@ class CRUDView(View):
 
     def get_paginator(self, queryset, page_size):
         """
-        Returns a paginator instance.
+        Returns a paginator instance for the view's `pagination_mode`.
         """
-        return Paginator(queryset, page_size)
+        match self.pagination_mode:
+            case "page":
+                return Paginator(queryset, page_size)
+            case "cursor":
+                return CursorPaginator(queryset, page_size, self.get_ordering())
+            case "nocount":
+                return NoCountPaginator(queryset, page_size)
+            case "estimated":
+                return EstimatedCountPaginator(
+                    queryset,
+                    page_size,
+                    estimate_threshold=self.estimated_count_threshold,
+                )
+        msg = "'%s' has an unknown pagination_mode %r."
+        raise ImproperlyConfigured(
+            msg % (self.__class__.__name__, self.pagination_mode)
+        )
 
     def paginate_queryset(self, queryset, page_size):
         """
         Paginates a queryset, and returns a page object.
         """
-        paginator = self.get_paginator(queryset, page_size)
+        return self._get_page(self.get_paginator(queryset, page_size))
+
+    def _get_page(self, paginator):
         page_kwarg = self.kwargs.get(self.page_kwarg)
         page_query_param = self.request.GET.get(self.page_kwarg)
-        page_number = page_kwarg or page_query_param or 1
-        try:
-            page_number = int(page_number)
-        except ValueError:
-            if page_number == "last":
-                page_number = paginator.num_pages
-            else:
-                msg = "Page is not 'last', nor can it be converted to an int."
-                raise Http404(_(msg))
+        if self.pagination_mode == "cursor":
+            # The page parameter is an opaque cursor, rather than a number.
+            page_number = page_kwarg or page_query_param or None
+        else:
+            page_number = page_kwarg or page_query_param or 1
+            try:
+                page_number = int(page_number)
+            except ValueError:
+                if page_number == "last":
+                    page_number = paginator.num_pages
+                else:
+                    msg = "Page is not 'last', nor can it be converted to an int."
+                    raise Http404(_(msg))
 
         try:
             return paginator.page(page_number)
@@ -343,16 +1498,246 @@ class CRUDView(View):
         filterset_fields = getattr(self, "filterset_fields", None)
 
         if filterset_class is None and filterset_fields:
-            filterset_class = filterset_factory(self.model, fields=filterset_fields)
+            key = ("filterset", self.__class__, self.model, _freeze(filterset_fields))
+            filterset_class = _get_generated_class(
+                key,
+                lambda: filterset_factory(self.model, fields=filterset_fields),
+            )
 
         if filterset_class is None:
             return None
 
-        return filterset_class(
+        filterset = filterset_class(
             self.request.GET,
             queryset=queryset,
             request=self.request,
         )
+        if self.autocomplete_fields:
+            self.use_autocomplete_widgets(filterset.form)
+        return filterset
+
+    def get_filtered_queryset(self, queryset):
+        """
+        Returns a (queryset, filterset) pair: the `queryset` filtered by the
+        filterset from `get_filterset()`, if any, and by the search query, and
+        the filterset, or None.
+
+        The LIST, EXPORT, GRID, and bulk roles all filter their objects with
+        this. Override it to filter them further.
+        """
+        filterset = self.get_filterset(queryset)
+        if filterset is not None:
+            queryset = filterset.qs
+        return self.search_queryset(queryset), filterset
+
+    def get_search_query(self):
+        """
+        Returns the search query, from the `search_kwarg` query parameter.
+        """
+        return self.request.GET.get(self.search_kwarg, "").strip()
+
+    def get_search_backend(self):
+        """
+        Returns the search backend for `search_fields`: the one named by
+        `search_backend`, or the default for the model's database.
+        """
+        if self.search_backend not in (None, *SEARCH_BACKENDS):
+            msg = "'%s' has an unknown search_backend %r."
+            raise ImproperlyConfigured(
+                msg % (self.__class__.__name__, self.search_backend)
+            )
+        return get_search_backend(self.model, self.search_fields, self.search_backend)
+
+    def search_queryset(self, queryset):
+        """
+        Returns the `queryset` filtered by the search query, if
+        `search_fields` is set.
+        """
+        if not self.search_fields:
+            return queryset
+        query = self.get_search_query()
+        if not query:
+            return queryset
+        return self.get_search_backend().search(queryset, query)
+
+    # Conditional GET
+
+    def get_validators(self, queryset=None):
+        """
+        Returns an (ETag, last modified datetime) pair for a LIST or DETAIL
+        response, for conditional GET requests. Either may be None. Returns
+        (None, None), disabling conditional GET, if `last_modified_field` isn't
+        set.
+
+        For DETAIL, this is called after `get_object()`, and uses the object's
+        `last_modified_field`. For LIST, the latest `last_modified_field` and
+        the count of the filtered `queryset` are fetched with one aggregate
+        query, and only the ETag is returned.
+        """
+        if self.last_modified_field is None:
+            return None, None
+        if self.role == Role.LIST:
+            aggregate = queryset.aggregate(**self._get_list_aggregates())
+            return self._make_list_validators(aggregate)
+        return self._make_validators(
+            getattr(self.object, self.last_modified_field), self.object.pk
+        )
+
+    def _get_list_aggregates(self):
+        return {"last_modified": Max(self.last_modified_field), "count": Count("pk")}
+
+    def _make_list_validators(self, aggregate):
+        # Deleting an object other than the latest modified doesn't change the
+        # latest last_modified_field, so a list's Last-Modified can't tell the
+        # client its copy is stale. Only the ETag, which includes the count,
+        # validates it.
+        etag = self._make_validators(aggregate["last_modified"], aggregate["count"])[0]
+        return etag, None
+
+    def _make_validators(self, last_modified, *version):
+        # The ETag also varies with the view and the query string, which
+        # selects the page and filters rendered.
+        key = repr(
+            (
+                self.__class__.__module__,
+                self.__class__.__qualname__,
+                self.role.value,
+                self.request.META.get("QUERY_STRING", ""),
+                last_modified,
+                *version,
+            )
+        )
+        digest = hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()
+        return f'W/"{digest}"', last_modified
+
+    def get_not_modified_response(self, validators):
+        """
+        Returns a 304 Not Modified response if the request's conditional
+        headers match the `validators` from `get_validators()`, else None.
+        """
+        etag, last_modified = validators
+        if etag is None and last_modified is None:
+            return None
+        response = get_conditional_response(
+            self.request,
+            etag=etag,
+            last_modified=self._get_timestamp(last_modified),
+        )
+        if response is None:
+            return None
+        return self.add_validator_headers(response, validators)
+
+    def add_validator_headers(self, response, validators):
+        """
+        Sets the ETag and Last-Modified headers from `validators` on the
+        response, unless already set.
+        """
+        etag, last_modified = validators
+        if etag is not None and not response.has_header("ETag"):
+            response.headers["ETag"] = etag
+        timestamp = self._get_timestamp(last_modified)
+        if timestamp is not None and not response.has_header("Last-Modified"):
+            response.headers["Last-Modified"] = http_date(timestamp)
+        return response
+
+    def _get_timestamp(self, last_modified):
+        if last_modified is None:
+            return None
+        if not isinstance(last_modified, datetime.datetime):
+            # A DateField.
+            last_modified = datetime.datetime.combine(last_modified, datetime.time())
+        if timezone.is_naive(last_modified):
+            last_modified = timezone.make_aware(last_modified, datetime.timezone.utc)
+        return int(last_modified.timestamp())
+
+    # Request dispatch
+
+    def dispatch(self, request, *args, **kwargs):
+        # The Role's handlers are resolved once, in as_view(), but are only
+        # allowed for methods in http_method_names.
+        method = request.method.lower()
+        handler = None
+        if method in self.http_method_names:
+            handler = self.role_handlers.get(method)
+        if handler is None:
+            # OPTIONS, or 405 Method Not Allowed.
+            return super().dispatch(request, *args, **kwargs)
+
+        if self.instrument:
+            # Queries can't be counted for async views, as for query_budget.
+            self.timings = Timings(count_queries=not self.view_is_async)
+            if self.view_is_async:
+                return self._adispatch_measured(handler, request, *args, **kwargs)
+            response = self._dispatch_handler(handler, request, *args, **kwargs)
+            return self._finish_measurement(response)
+        return self._dispatch_handler(handler, request, *args, **kwargs)
+
+    async def _adispatch_measured(self, handler, request, *args, **kwargs):
+        response = await handler(self, request, *args, **kwargs)
+        return self._finish_measurement(response)
+
+    def _finish_measurement(self, response):
+        # Once the response has rendered, records the total, and reports the
+        # phases.
+        def finish(response):
+            self.timings.finish()
+            if self.server_timing:
+                response["Server-Timing"] = self.timings.get_server_timing()
+            request_measured.send(
+                sender=self.__class__,
+                view=self,
+                request=self.request,
+                phases=self.timings.phases,
+            )
+
+        if isinstance(response, SimpleTemplateResponse) and not response.is_rendered:
+            response.add_post_render_callback(finish)
+        else:
+            finish(response)
+        return response
+
+    def _dispatch_handler(self, handler, request, *args, **kwargs):
+        # The query log can't be checked for async views, since their queries
+        # run on another thread's connection.
+        if (
+            self.query_budget is None
+            or not settings.DEBUG
+            or self.role not in (Role.LIST, Role.DETAIL)
+            or self.view_is_async
+        ):
+            return handler(self, request, *args, **kwargs)
+
+        # With DEBUG on, the connection logs every query. Compare the log
+        # before dispatch with after the (lazy) template response has rendered.
+        connection = connections[router.db_for_read(self.model)]
+        start = len(connection.queries_log)
+
+        def check_query_budget(response):
+            queries = list(connection.queries_log)[start:]
+            if len(queries) > self.query_budget:
+                logger.warning(
+                    "%s took %d queries to render %s, exceeding its query_budget "
+                    "of %d:\n%s",
+                    self.__class__.__name__,
+                    len(queries),
+                    request.path,
+                    self.query_budget,
+                    "\n".join(query["sql"] for query in queries),
+                )
+
+        response = handler(self, request, *args, **kwargs)
+        if isinstance(response, SimpleTemplateResponse) and not response.is_rendered:
+            response.add_post_render_callback(check_query_budget)
+        else:
+            check_query_budget(response)
+        return response
+
+    def _allowed_methods(self):
+        return [
+            m.upper()
+            for m in self.http_method_names
+            if m in self.role_handlers or hasattr(self, m)
+        ]
 
     # Response rendering
 
@@ -384,7 +1769,12 @@ class CRUDView(View):
                 kwargs[context_object_name] = self.object
 
         if getattr(self, "object_list", None) is not None:
+            kwargs["bulk_delete_view_url"] = Role.BULK_DELETE.maybe_reverse(self)
+            kwargs["bulk_update_view_url"] = Role.BULK_UPDATE.maybe_reverse(self)
             kwargs["object_list"] = self.object_list
+            if self.search_fields:
+                kwargs["search_kwarg"] = self.search_kwarg
+                kwargs["search_query"] = self.get_search_query()
             context_object_name = self.get_context_object_name(is_list=True)
             if context_object_name:
                 kwargs[context_object_name] = self.object_list
@@ -420,10 +1810,33 @@ class CRUDView(View):
         """
         Given a context dictionary, returns an HTTP response.
         """
+        if self.timings is not None:
+            return MeasuredTemplateResponse(
+                request=self.request,
+                template=self.get_template_names(),
+                context=context,
+                timings=self.timings,
+            )
         return TemplateResponse(
             request=self.request, template=self.get_template_names(), context=context
         )
 
+    def render_to_streaming_response(self, context):
+        """
+        Given a context dictionary, returns a streaming HTTP response for the
+        list view.
+
+        The template is rendered with a marker in place of the table rows. The
+        content before the marker is sent straight away, and the rows follow as
+        the queryset is iterated, so memory use doesn't grow with the number of
+        rows.
+        """
+        from neapolitan.renderers import stream_list_content
+
+        template = select_template(self.get_template_names())
+        content = template.render(context, self.request)
+        return StreamingHttpResponse(stream_list_content(content, self))
+
     # URLs and view callables
 
     @classonlymethod
@@ -435,14 +1848,7 @@ class CRUDView(View):
                     "The method name %s is not accepted as a keyword argument "
                     "to %s()." % (key, cls.__name__)
                 )
-            if key in [
-                "list",
-                "detail",
-                "show_form",
-                "process_form",
-                "confirm_delete",
-                "process_deletion",
-            ]:
+            if key in {action for r in Role for action in r.handlers().values()}:
                 raise TypeError(
                     "CRUDView handler name %s is not accepted as a keyword argument "
                     "to %s()." % (key, cls.__name__)
@@ -454,21 +1860,42 @@ class CRUDView(View):
                     "attributes of the class." % (cls.__name__, key)
                 )
 
+        if initkwargs.get("row_cache", cls.row_cache):
+            register_row_cache(
+                cls, initkwargs.get("row_cache_alias", cls.row_cache_alias)
+            )
+
+        initkwargs_fingerprint = None
+        if initkwargs.get("list_cache", cls.list_cache):
+            register_list_cache(
+                cls, initkwargs.get("list_cache_alias", cls.list_cache_alias)
+            )
+            initkwargs_fingerprint = get_initkwargs_fingerprint(initkwargs)
+
+        if initkwargs.get("search_fields", cls.search_fields):
+            register_search_index(cls(**initkwargs).get_search_backend())
+
+        # Resolve the Role's handlers, and merge the Role default and provided
+        # initkwargs, once here rather than on every request.
+        role_initkwargs = {
+            **role.extra_initkwargs(),
+            **initkwargs,
+            "role": role,
+            "initkwargs_fingerprint": initkwargs_fingerprint,
+            "role_handlers": {
+                method: getattr(cls, action)
+                for method, action in role.handlers().items()
+            },
+        }
+
         def view(request, *args, **kwargs):
-            # Merge Role default and provided initkwargs.
-            self = cls(**{**role.extra_initkwargs(), **initkwargs})
-            self.role = role
+            self = cls(**role_initkwargs)
             self.setup(request, *args, **kwargs)
             if not hasattr(self, "request"):
                 raise AttributeError(
                     f"{cls.__name__} instance has no 'request' attribute. Did you "
                     "override setup() and forget to call super()?"
                 )
-
-            for method, action in role.handlers().items():
-                handler = getattr(self, action)
-                setattr(self, method, handler)
-
             return self.dispatch(request, *args, **kwargs)
 
         view.view_class = cls
@@ -485,8 +1912,8 @@ class CRUDView(View):
         view.__dict__.update(cls.dispatch.__dict__)
 
         # Mark the callback if the view class is async.
-        # if cls.view_is_async:
-        #     markcoroutinefunction(view)
+        if cls.view_is_async:
+            markcoroutinefunction(view)
 
         return view
 
@@ -508,5 +1935,402 @@ class CRUDView(View):
     def get_urls(cls, roles=None):
         """Classmethod to generate URL patterns for the view."""
         if roles is None:
-            roles = iter(Role)
-        return [role.get_url(cls) for role in roles]
+            roles = [role for role in Role if role.routed_by_default]
+            if cls.autocomplete_fields:
+                roles.append(Role.AUTOCOMPLETE)
+        # Route in Role order, so fixed paths such as "new/" and "export/" come
+        # before the lookup patterns that would otherwise match them.
+        order = list(Role)
+        return [role.get_url(cls) for role in sorted(roles, key=order.index)]
+
+
+class AsyncCRUDView(CRUDView):
+    """
+    A CRUDView with async request handlers, using the async ORM.
+
+    Under ASGI, requests are handled on the event loop, rather than in a
+    thread each. Queries that have no async API, such as validating a form or
+    running a filterset, are run with ``sync_to_async()``.
+    """
+
+    view_is_async = True
+
+    async def list(self, request, *args, **kwargs):
+        """GET handler for the list view."""
+
+        if self.list_cache and not self.stream_list:
+            list_cache = await sync_to_async(ListCache)(self)
+            response = await sync_to_async(list_cache.get_response)()
+            if response is not None:
+                return response
+            return list_cache.set_response(await self.get_list_response(request))
+        return await self.get_list_response(request)
+
+    async def get_list_response(self, request):
+        """
+        Returns the response for the list view, bypassing `list_cache`.
+        """
+        with self.measure("queryset"):
+            queryset = self.get_queryset()
+        with self.measure("filter"):
+            # Validating the filters, and searching, may query the database.
+            queryset, filterset = await sync_to_async(self.get_filtered_queryset)(
+                queryset
+            )
+
+        with self.measure("validators"):
+            validators = await self.aget_validators(queryset)
+        not_modified = self.get_not_modified_response(validators)
+        if not_modified is not None:
+            return not_modified
+
+        if not self.allow_empty and not await queryset.aexists():
+            raise Http404
+
+        paginate_by = self.get_paginate_by()
+        if paginate_by is None:
+            # Unpaginated response, optionally streamed.
+            if self.stream_list:
+                self.object_list = StreamedObjectList(
+                    queryset, self.stream_chunk_size
+                )
+            else:
+                with self.measure("objects"):
+                    self.object_list = [obj async for obj in queryset]
+            with self.measure("context"):
+                context = self.get_context_data(
+                    page_obj=None,
+                    is_paginated=False,
+                    paginator=None,
+                    filterset=filterset,
+                )
+        else:
+            # Paginated response
+            with self.measure("paginate"):
+                page = await self.apaginate_queryset(queryset, paginate_by)
+            self.object_list = page.object_list
+            with self.measure("context"):
+                context = self.get_context_data(
+                    page_obj=page,
+                    is_paginated=page.has_other_pages(),
+                    paginator=page.paginator,
+                    filterset=filterset,
+                )
+            if self.pagination_mode == "cursor":
+                context["next_cursor"] = page.next_cursor
+                context["previous_cursor"] = page.previous_cursor
+
+        if isinstance(self.object_list, StreamedObjectList):
+            response = await sync_to_async(self.render_to_streaming_response)(context)
+        else:
+            response = self.render_to_response(context)
+        return self.add_validator_headers(response, validators)
+
+    def render_to_streaming_response(self, context):
+        """
+        As `CRUDView.render_to_streaming_response()`, but the rows are read
+        with `aiterator()`, so that Django streams the response from the event
+        loop rather than reading it all in a thread first.
+        """
+        from neapolitan.renderers import astream_list_content
+
+        template = select_template(self.get_template_names())
+        content = template.render(context, self.request)
+        return StreamingHttpResponse(astream_list_content(content, self))
+
+    async def export(self, request, *args, **kwargs):
+        """GET handler for the export view."""
+
+        queryset, filterset = await sync_to_async(self.get_filtered_queryset)(
+            self.get_queryset()
+        )
+
+        export_format = self.get_export_format()
+        encoder, content_type = EXPORT_FORMATS[export_format]
+        fields = self.get_export_fields()
+        # values_list() executes its query as soon as it's iterated, which
+        # aiterator() does in the async context, so read values() dicts.
+        rows = queryset.values(*fields).aiterator(chunk_size=self.stream_chunk_size)
+        response = StreamingHttpResponse(
+            astream_rows(encoder, fields, rows, self.stream_chunk_size),
+            content_type=content_type,
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="{self.url_base}.{export_format}"'
+        )
+        return response
+
+    async def detail(self, request, *args, **kwargs):
+        """GET handler for the detail view."""
+
+        with self.measure("object"):
+            self.object = await self.aget_object()
+        with self.measure("validators"):
+            validators = await self.aget_validators()
+        not_modified = self.get_not_modified_response(validators)
+        if not_modified is not None:
+            return not_modified
+
+        with self.measure("context"):
+            context = self.get_context_data()
+        response = self.render_to_response(context)
+        return self.add_validator_headers(response, validators)
+
+    async def show_form(self, request, *args, **kwargs):
+        """GET handler for the create and update form views."""
+
+        if self.role == Role.UPDATE:
+            self.object = await self.aget_object()
+        form = await self.aget_form(instance=self.object)
+        context = self.get_context_data(form=form)
+        return self.render_to_response(context)
+
+    async def process_form(self, request, *args, **kwargs):
+        """POST handler for the create and update form views."""
+
+        if self.role == Role.UPDATE:
+            with self.measure("object"):
+                self.object = await self.aget_object()
+        with self.measure("form"):
+            form = await self.aget_form(
+                data=request.POST,
+                files=request.FILES,
+                instance=self.object,
+            )
+            # Validation may query the database, e.g. for unique fields.
+            is_valid = await sync_to_async(form.is_valid)()
+        if is_valid:
+            with self.measure("save"):
+                return await self.form_valid(form)
+        with self.measure("context"):
+            return self.form_invalid(form)
+
+    async def confirm_delete(self, request, *args, **kwargs):
+        """GET handler for the delete confirmation view."""
+
+        self.object = await self.aget_object()
+        context = self.get_context_data()
+        return self.render_to_response(context)
+
+    async def process_deletion(self, request, *args, **kwargs):
+        """POST handler for the delete confirmation view."""
+
+        with self.measure("object"):
+            self.object = await self.aget_object()
+        with self.measure("delete"):
+            pk = self.object.pk
+            await self.object.adelete()
+            await sync_to_async(self.objects_changed)([pk])
+        return HttpResponseRedirect(self.get_success_url())
+
+    async def confirm_bulk_delete(self, request, *args, **kwargs):
+        """GET handler for the bulk delete confirmation view."""
+
+        queryset = await sync_to_async(self.get_bulk_queryset)()
+        context = self.get_context_data(object_count=await queryset.acount())
+        return self.render_to_response(context)
+
+    async def process_bulk_deletion(self, request, *args, **kwargs):
+        """POST handler for the bulk delete confirmation view."""
+
+        queryset = await sync_to_async(self.get_bulk_queryset)()
+        pks = await self.aget_bulk_pks(queryset)
+        # Transactions have no async API.
+        await sync_to_async(self.bulk_delete)(pks)
+        await sync_to_async(self.objects_changed)(pks)
+        return HttpResponseRedirect(self.get_success_url())
+
+    async def show_bulk_form(self, request, *args, **kwargs):
+        """GET handler for the bulk update form view."""
+
+        queryset = await sync_to_async(self.get_bulk_queryset)()
+        form = self.get_bulk_form()
+        context = self.get_context_data(
+            form=form, object_count=await queryset.acount()
+        )
+        return self.render_to_response(context)
+
+    async def process_bulk_form(self, request, *args, **kwargs):
+        """POST handler for the bulk update form view."""
+
+        queryset = await sync_to_async(self.get_bulk_queryset)()
+        form = self.get_bulk_form(data=request.POST, files=request.FILES)
+        if not await sync_to_async(form.is_valid)():
+            context = self.get_context_data(
+                form=form, object_count=await queryset.acount()
+            )
+            return self.render_to_response(context)
+
+        pks = await self.aget_bulk_pks(queryset)
+        await sync_to_async(self.bulk_update)(pks, form.get_bulk_values())
+        await sync_to_async(self.objects_changed)(pks)
+        return HttpResponseRedirect(self.get_success_url())
+
+    async def show_import_form(self, request, *args, **kwargs):
+        """GET handler for the import view."""
+
+        form = self.get_import_form()
+        context = self.get_context_data(form=form)
+        return self.render_to_response(context)
+
+    async def process_import(self, request, *args, **kwargs):
+        """POST handler for the import view."""
+
+        form = self.get_import_form(data=request.POST, files=request.FILES)
+        if not form.is_valid():
+            return self.form_invalid(form)
+
+        # Reading the file, validation, and transactions have no async API.
+        result = await sync_to_async(self.import_rows)(
+            form.cleaned_data["file"], form.cleaned_data["format"]
+        )
+        context = self.get_context_data(
+            form=self.get_import_form(), import_result=result
+        )
+        return self.render_to_response(context)
+
+    async def autocomplete(self, request, *args, **kwargs):
+        """GET handler for the autocomplete view."""
+
+        field = self.get_autocomplete_field()
+        queryset = self.get_autocomplete_queryset(field)
+        objects = [obj async for obj in queryset[: self.autocomplete_page_size + 1]]
+        return self.render_autocomplete_response(field, objects)
+
+    async def show_grid(self, request, *args, **kwargs):
+        """GET handler for the grid view."""
+
+        # Filtersets and pagination have no async API.
+        context = await sync_to_async(self._get_grid_context)()
+        formset = await self.aget_grid_formset(objects=self.object_list)
+        context = self.get_context_data(formset=formset, **context)
+        return self.render_to_response(context)
+
+    async def process_grid(self, request, *args, **kwargs):
+        """POST handler for the grid view."""
+
+        context = await sync_to_async(self._get_grid_context)()
+        formset = await self.aget_grid_formset(
+            data=request.POST, files=request.FILES, objects=self.object_list
+        )
+        if not await sync_to_async(formset.is_valid)():
+            context = self.get_context_data(formset=formset, **context)
+            return self.render_to_response(context)
+
+        objects = await sync_to_async(self.grid_update)(formset)
+        await sync_to_async(self.objects_changed)([obj.pk for obj in objects])
+        return HttpResponseRedirect(self.get_success_url())
+
+    async def aget_form(self, **kwargs):
+        """
+        Async version of `get_form()`. A form for an instance reads the
+        instance's many-to-many values, so forms for models with many-to-many
+        fields are built with `sync_to_async()`.
+        """
+        if self.model._meta.many_to_many:
+            return await sync_to_async(self.get_form)(**kwargs)
+        return self.get_form(**kwargs)
+
+    async def aget_grid_formset(self, **kwargs):
+        """
+        Async version of `get_grid_formset()`, building the formset with
+        `sync_to_async()` for models with many-to-many fields, as
+        `aget_form()`.
+        """
+        if self.model._meta.many_to_many:
+            return await sync_to_async(self.get_grid_formset)(**kwargs)
+        return self.get_grid_formset(**kwargs)
+
+    async def aget_bulk_pks(self, queryset):
+        """
+        Async version of `get_bulk_pks()`.
+        """
+        return [pk async for pk in queryset.order_by().values_list("pk", flat=True)]
+
+    async def aget_validators(self, queryset=None):
+        """
+        Async version of `get_validators()`. Override this, rather than
+        `get_validators()`, to customise the LIST validators.
+        """
+        if self.last_modified_field is None or self.role != Role.LIST:
+            return self.get_validators(queryset)
+        aggregate = await queryset.aaggregate(**self._get_list_aggregates())
+        return self._make_list_validators(aggregate)
+
+    async def aget_object(self):
+        """
+        Async version of `get_object()`.
+        """
+        queryset = self.get_queryset()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+
+        try:
+            lookup = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        except KeyError:
+            msg = "Lookup field '%s' was not provided in view kwargs to '%s'"
+            raise ImproperlyConfigured(
+                msg % (lookup_url_kwarg, self.__class__.__name__)
+            )
+
+        try:
+            return await queryset.aget(**lookup)
+        except queryset.model.DoesNotExist:
+            raise Http404(
+                "No %s matches the given query." % queryset.model._meta.object_name
+            )
+
+    async def form_valid(self, form):
+        update_fields = self.get_update_fields(form)
+        self.object = form.save(commit=False)
+        if update_fields is None:
+            await self.object.asave()
+        elif update_fields:
+            await self.object.asave(update_fields=update_fields)
+        # Saving many-to-many data queries the database.
+        if self.object._meta.many_to_many:
+            await sync_to_async(form.save_m2m)()
+        else:
+            form.save_m2m()
+        if update_fields is None or form.has_changed():
+            await sync_to_async(self.objects_changed)([self.object.pk])
+        return HttpResponseRedirect(self.get_success_url())
+
+    async def apaginate_queryset(self, queryset, page_size):
+        """
+        Async version of `paginate_queryset()`.
+        """
+        paginator = self.get_paginator(queryset, page_size)
+        if self.pagination_mode != "page":
+            # The alternative paginators evaluate the page as they build it.
+            return await sync_to_async(self._get_page)(paginator)
+
+        # Paginator caches its count, so count with the async ORM first. The
+        # page is then a slice of the queryset, to be evaluated.
+        paginator.count = await queryset.acount()
+        page = self._get_page(paginator)
+        page.object_list = [obj async for obj in page.object_list]
+        return page
+
+
+def get_crud_views(urlconf=None):
+    """
+    Returns an instance of each CRUDView subclass routed in the URLconf, with
+    its `as_view()` initkwargs, in URL order. Each is returned once, however
+    many of its roles are routed.
+    """
+    views = {}
+
+    def collect(patterns):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                collect(pattern.url_patterns)
+                continue
+            view_class = getattr(pattern.callback, "view_class", None)
+            if isinstance(view_class, type) and issubclass(view_class, CRUDView):
+                initkwargs = pattern.callback.view_initkwargs
+                key = (view_class, _freeze(initkwargs))
+                if key not in views:
+                    views[key] = view_class(**initkwargs)
+
+    collect(get_resolver(urlconf).url_patterns)
+    return list(views.values())
@@ -0,0 +1,48 @@
+"""
+Widgets used by ``CRUDView`` forms and filters.
+"""
+
+from django import forms
+from django.core.exceptions import ValidationError
+
+
+class AutocompleteSelect(forms.Select):
+    """
+    A select for a ``ModelChoiceField`` rendering only the selected object,
+    rather than every choice. ``neapolitan/autocomplete.js`` adds a search
+    box, fetching matching objects from the AUTOCOMPLETE role at ``url``.
+    """
+
+    class Media:
+        js = ["neapolitan/autocomplete.js"]
+
+    def __init__(self, url, attrs=None):
+        super().__init__(attrs={"data-autocomplete-url": url, **(attrs or {})})
+        self.url = url
+
+    def optgroups(self, name, value, attrs=None):
+        field = self.choices.field
+        options = []
+        if not self.is_required:
+            label = field.empty_label or ""
+            options.append(self.create_option(name, "", label, False, 0))
+
+        selected = {str(v) for v in value if str(v) not in field.empty_values}
+        if selected:
+            key = field.to_field_name or "pk"
+            try:
+                objects = list(field.queryset.filter(**{f"{key}__in": selected}))
+            except (ValueError, ValidationError):
+                # Not a valid value for the field.
+                objects = []
+            for obj in objects:
+                options.append(
+                    self.create_option(
+                        name,
+                        field.prepare_value(obj),
+                        field.label_from_instance(obj),
+                        True,
+                        len(options),
+                    )
+                )
+        return [(None, options, 0)]
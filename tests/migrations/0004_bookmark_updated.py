@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tests', '0003_bookmarktag'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookmark',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tests', '0004_bookmark_updated'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReadingList',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('bookmarks', models.ManyToManyField(blank=True, to='tests.bookmark')),
+            ],
+        ),
+    ]
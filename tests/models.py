@@ -7,6 +7,7 @@ class Bookmark(models.Model):
     title = models.CharField(max_length=255)
     note = models.TextField(blank=True)
     favourite = models.BooleanField(default=False)
+    updated = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.title
@@ -29,3 +30,13 @@ class BookmarkTag(models.Model):
 
     def __str__(self):
         return self.tag
+
+
+class ReadingList(models.Model):
+    """For testing many-to-many fields"""
+
+    name = models.CharField(max_length=50)
+    bookmarks = models.ManyToManyField(Bookmark, blank=True)
+
+    def __str__(self):
+        return self.name
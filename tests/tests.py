@@ -1,15 +1,41 @@
+import io
+import json
 import os
 import uuid
 
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django import forms
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.management import call_command
-from django.http import HttpResponse
-from django.test import RequestFactory, TestCase
-from django.urls import reverse
+from django.db import connection
+from django.http import Http404, HttpResponse
+from django.template import Context, Template
+from django.template.response import TemplateResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import NoReverseMatch, reverse, set_script_prefix
+from django.utils import timezone
 from django.utils.html import escape
-
-from neapolitan.views import CRUDView, Role, classonlymethod
-
-from .models import Bookmark, NamedCollection, BookmarkTag
+from django.utils.http import http_date
+
+from neapolitan.checks import check_ordering_fields, check_ordering_indexes
+from neapolitan.indexes import find_missing_indexes, get_plan_problems, is_indexed
+from neapolitan.paginator import EstimatedCountPaginator
+from neapolitan.search import SQLiteFTS5Backend
+from neapolitan.signals import request_measured
+from neapolitan.testing import assert_constant_queries
+from neapolitan.views import (
+    AsyncCRUDView,
+    CRUDView,
+    Role,
+    classonlymethod,
+    get_crud_views,
+)
+from neapolitan.widgets import AutocompleteSelect
+
+from .models import Bookmark, NamedCollection, BookmarkTag, ReadingList
 
 
 class BookmarkView(CRUDView):
@@ -45,11 +71,49 @@ class BookmarkTagView(CRUDView):
     fields = ["bookmark", "tag"]
 
 
+class BulkBookmarkView(BookmarkView):
+    url_base = "bulkbookmark"
+
+
+class AutocompleteTagView(BookmarkTagView):
+    filterset_fields = ["bookmark"]
+    autocomplete_fields = {"bookmark": ["title", "url"]}
+    autocomplete_page_size = 2
+    url_base = "autocompletetag"
+
+
+class SearchBookmarkView(BookmarkView):
+    search_fields = ["title", "note"]
+    url_base = "searchbookmark"
+
+
+class AsyncBookmarkView(AsyncCRUDView):
+    model = Bookmark
+    fields = ["url", "title", "note"]
+    filterset_fields = [
+        "favourite",
+    ]
+    url_base = "asyncbookmark"
+
+
 urlpatterns = [
     *BookmarkView.get_urls(),
     *NamedCollectionView.get_urls(),
     *BookmarkListOnlyView.get_urls(),
     *BookmarkTagView.get_urls(),
+    *BookmarkView.get_urls(roles={Role.EXPORT, Role.IMPORT}),
+    *AsyncBookmarkView.get_urls(roles=Role),
+    *AutocompleteTagView.get_urls(),
+    *SearchBookmarkView.get_urls(),
+    *BulkBookmarkView.get_urls(
+        roles={
+            Role.LIST,
+            Role.DETAIL,
+            Role.BULK_DELETE,
+            Role.BULK_UPDATE,
+            Role.GRID,
+        }
+    ),
 ]
 
 
@@ -217,6 +281,42 @@ class BasicTests(TestCase):
         self.assertContains(response, "_test_suffix")
 
 
+    def test_dispatch_to_role_handlers(self):
+        response = self.client.options("/bookmark/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["Allow"], "GET, OPTIONS")
+
+        response = self.client.post("/bookmark/")
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(response.headers["Allow"], "GET, OPTIONS")
+
+        response = self.client.options("/bookmark/new/")
+        self.assertEqual(response.headers["Allow"], "GET, POST, OPTIONS")
+
+    def test_dispatch_respects_http_method_names(self):
+        class ReadOnlyBookmarkView(BookmarkView):
+            http_method_names = ["get", "head", "options"]
+
+        view = ReadOnlyBookmarkView.as_view(role=Role.CREATE)
+        data = {"url": "https://example.com/", "title": "Example"}
+        response = view(RequestFactory().post("/", data))
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(response.headers["Allow"], "GET, OPTIONS")
+        self.assertFalse(Bookmark.objects.filter(url=data["url"]).exists())
+
+    def test_role_handlers_resolved_in_as_view(self):
+        class HandlerCRUDView(CRUDView):
+            model = Bookmark
+
+            def confirm_delete(self, request, *args, **kwargs):
+                return HttpResponse(f"{self.role.value} {sorted(self.role_handlers)}")
+
+        view = HandlerCRUDView.as_view(role=Role.DELETE)
+        self.assertEqual(view.view_initkwargs, {})
+        response = view(RequestFactory().get("/"))
+        self.assertContains(response, "delete ['get', 'post']")
+
+
 class RoleTests(TestCase):
     def test_overriding_url_base(self):
         class AlternateCRUDView(CRUDView):
@@ -239,6 +339,7 @@ class RoleTests(TestCase):
             (Role.CREATE, "create"),
             (Role.UPDATE, "update"),
             (Role.DELETE, "delete"),
+            (Role.EXPORT, "export"),
         ]
         for role, name in tests:
             with self.subTest(role=role):
@@ -251,6 +352,7 @@ class RoleTests(TestCase):
             (Role.CREATE, "bookmark/new/"),
             (Role.UPDATE, "bookmark/<int:pk>/edit/"),
             (Role.DELETE, "bookmark/<int:pk>/delete/"),
+            (Role.EXPORT, "bookmark/export/"),
         ]
         for role, pattern in tests:
             with self.subTest(role=role):
@@ -280,6 +382,42 @@ class RoleTests(TestCase):
                     url,
                 )
 
+    def test_precompiled_reversing_matches_reverse(self):
+        bookmark = Bookmark.objects.create(url="https://noumenal.es/", title="N")
+        collection = NamedCollection.objects.create(name="main")
+        tests = [
+            (BookmarkView, bookmark, "bookmark", {"pk": bookmark.pk}),
+            (
+                NamedCollectionView,
+                collection,
+                "named_collections",
+                {"code": collection.code},
+            ),
+        ]
+        for prefix in ["/", "/mount/"]:
+            set_script_prefix(prefix)
+            self.addCleanup(set_script_prefix, "/")
+            for view, obj, url_base, kwargs in tests:
+                for role in [Role.DETAIL, Role.UPDATE, Role.DELETE]:
+                    with self.subTest(prefix=prefix, view=view, role=role):
+                        name = f"{url_base}-{role.url_name_component}"
+                        expected = reverse(name, kwargs=kwargs)
+                        self.assertTrue(expected.startswith(prefix))
+                        self.assertEqual(role.reverse(view, obj), expected)
+                        self.assertEqual(role.url_builder(view)(obj), expected)
+                with self.subTest(prefix=prefix, view=view, role=Role.LIST):
+                    expected = reverse(f"{url_base}-list")
+                    self.assertEqual(Role.LIST.reverse(view), expected)
+
+    def test_unrouted_roles(self):
+        bookmark = Bookmark.objects.create(url="https://noumenal.es/", title="N")
+        for role in [Role.CREATE, Role.DETAIL, Role.UPDATE, Role.DELETE]:
+            with self.subTest(role=role):
+                self.assertIsNone(role.url_builder(BookmarkListOnlyView))
+                self.assertIsNone(role.maybe_reverse(BookmarkListOnlyView, bookmark))
+                with self.assertRaises(NoReverseMatch):
+                    role.reverse(BookmarkListOnlyView, bookmark)
+
     def test_routing_subset_of_roles(self):
         urlpatterns = BookmarkView.get_urls(roles={Role.LIST, Role.DETAIL})
         self.assertEqual(len(urlpatterns), 2)
@@ -323,6 +461,12 @@ class RoleTests(TestCase):
         # Assert that the generated URL paths match the expected order
         self.assertEqual(url_paths, expected_paths)
 
+        # Opt-in roles with fixed paths are also routed before slug-based URLs,
+        # whatever order the roles are passed in.
+        urls = BookmarkCRUDView.get_urls(roles=[Role.DETAIL, Role.EXPORT])
+        url_paths = [url.pattern._route for url in urls]
+        self.assertEqual(url_paths, ["bookmark/export/", "bookmark/<slug:title>/"])
+
     def test_role_equality(self):
         """
         Role instances should be equal to themselves but not to other Role
@@ -378,3 +522,1988 @@ class ForeignKeyDisplayTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, self.bookmark.title)
         self.assertContains(response, "python")
+
+
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.bookmarks = [
+            Bookmark.objects.create(url=f"https://example.com/{i}/", title=title)
+            for i, title in enumerate(["e", "b", "d", "a", "c"])
+        ]
+
+    def get_context(self, view_class, **params):
+        view = view_class.as_view(role=Role.LIST)
+        response = view(RequestFactory().get("/", params))
+        return response.context_data
+
+    def test_cursor_pages(self):
+        class CursorBookmarkView(BookmarkView):
+            paginate_by = 2
+            pagination_mode = "cursor"
+            ordering = ["title"]
+
+        titles = []
+        context = self.get_context(CursorBookmarkView)
+        self.assertIsNone(context["previous_cursor"])
+        while True:
+            self.assertTrue(context["is_paginated"])
+            titles.append([b.title for b in context["object_list"]])
+            if context["next_cursor"] is None:
+                break
+            context = self.get_context(CursorBookmarkView, page=context["next_cursor"])
+        self.assertEqual(titles, [["a", "b"], ["c", "d"], ["e"]])
+
+        # Walk back from the last page.
+        context = self.get_context(
+            CursorBookmarkView, page=context["page_obj"].previous_page_number()
+        )
+        self.assertEqual([b.title for b in context["object_list"]], ["c", "d"])
+        self.assertIsNotNone(context["previous_cursor"])
+        self.assertIsNotNone(context["next_cursor"])
+
+    def test_cursor_keeps_microseconds(self):
+        class CursorBookmarkView(BookmarkView):
+            paginate_by = 2
+            pagination_mode = "cursor"
+
+        # Rows updated within the same millisecond.
+        updated = timezone.now().replace(microsecond=500)
+        for i, bookmark in enumerate(self.bookmarks):
+            Bookmark.objects.filter(pk=bookmark.pk).update(
+                updated=updated + timezone.timedelta(microseconds=i)
+            )
+
+        for ordering in (["updated"], ["-updated"]):
+            with self.subTest(ordering=ordering):
+                CursorBookmarkView.ordering = ordering
+                titles = []
+                context = self.get_context(CursorBookmarkView)
+                for _ in range(len(self.bookmarks)):
+                    titles.extend(b.title for b in context["object_list"])
+                    if context["next_cursor"] is None:
+                        break
+                    context = self.get_context(
+                        CursorBookmarkView, page=context["next_cursor"]
+                    )
+                expected = ["e", "b", "d", "a", "c"]
+                if ordering[0].startswith("-"):
+                    expected.reverse()
+                self.assertEqual(titles, expected)
+
+    def test_cursor_ordered_by_foreign_key(self):
+        class CursorBookmarkTagView(BookmarkTagView):
+            paginate_by = 2
+            pagination_mode = "cursor"
+            ordering = ["-bookmark", "tag"]
+
+        for bookmark in self.bookmarks:
+            for tag in ["x", "y"]:
+                BookmarkTag.objects.create(bookmark=bookmark, tag=tag)
+
+        tags = []
+        context = self.get_context(CursorBookmarkTagView)
+        while True:
+            tags.extend((t.bookmark.title, t.tag) for t in context["object_list"])
+            if context["next_cursor"] is None:
+                break
+            context = self.get_context(
+                CursorBookmarkTagView, page=context["next_cursor"]
+            )
+        titles = [bookmark.title for bookmark in reversed(self.bookmarks)]
+        self.assertEqual(tags, [(title, tag) for title in titles for tag in "xy"])
+
+    def test_cursor_pagination_does_not_count(self):
+        class CursorBookmarkView(BookmarkView):
+            paginate_by = 2
+            pagination_mode = "cursor"
+            ordering = ["-title"]
+
+        with self.assertNumQueries(1) as ctx:
+            context = self.get_context(CursorBookmarkView)
+        self.assertNotIn("COUNT", ctx.captured_queries[0]["sql"])
+        self.assertEqual([b.title for b in context["object_list"]], ["e", "d"])
+
+    def test_invalid_cursor(self):
+        class CursorBookmarkView(BookmarkView):
+            paginate_by = 2
+            pagination_mode = "cursor"
+
+        with self.assertRaises(Http404):
+            self.get_context(CursorBookmarkView, page="not-a-cursor")
+
+
+class CountFreePaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(5):
+            Bookmark.objects.create(url=f"https://example.com/{i}/", title=f"{i}")
+
+    def get_response(self, view_class, **params):
+        view = view_class.as_view(role=Role.LIST)
+        return view(RequestFactory().get("/", params))
+
+    def test_nocount_pagination(self):
+        class NoCountBookmarkView(BookmarkView):
+            paginate_by = 2
+            pagination_mode = "nocount"
+            ordering = ["title"]
+
+        for page, titles, has_next in [
+            (1, ["0", "1"], True),
+            (2, ["2", "3"], True),
+            (3, ["4"], False),
+        ]:
+            with self.subTest(page=page):
+                with self.assertNumQueries(1) as ctx:
+                    response = self.get_response(NoCountBookmarkView, page=page)
+                self.assertNotIn("COUNT", ctx.captured_queries[0]["sql"])
+                page_obj = response.context_data["page_obj"]
+                self.assertEqual([b.title for b in page_obj], titles)
+                self.assertEqual(page_obj.has_next(), has_next)
+                self.assertTrue(response.context_data["is_paginated"])
+
+        with self.assertRaises(Http404):
+            self.get_response(NoCountBookmarkView, page=4)
+
+    def test_estimated_count(self):
+        queryset = Bookmark.objects.order_by("pk")
+        Bookmark.objects.create(url="https://example.com/new/", title="new")
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+        # Statistics are used once over the threshold...
+        paginator = EstimatedCountPaginator(queryset, 2, estimate_threshold=1)
+        with self.assertNumQueries(2):
+            self.assertEqual(paginator.count, 6)
+
+        # ... but not for filtered querysets, or below the threshold.
+        filtered = queryset.filter(title__in=["0", "1"])
+        paginator = EstimatedCountPaginator(filtered, 2, estimate_threshold=1)
+        self.assertEqual(paginator.count, 2)
+        paginator = EstimatedCountPaginator(queryset, 2, estimate_threshold=100)
+        with self.assertNumQueries(3):
+            self.assertEqual(paginator.count, 6)
+
+
+class RelatedLookupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(3):
+            bookmark = Bookmark.objects.create(
+                url=f"https://example.com/{i}/", title=f"Bookmark {i}"
+            )
+            BookmarkTag.objects.create(bookmark=bookmark, tag=f"tag-{i}")
+
+    def test_related_lookups_from_fields(self):
+        class BookmarkWithTagsView(CRUDView):
+            model = Bookmark
+            fields = ["title", "tags"]
+
+        class NoAutoRelatedView(BookmarkTagView):
+            auto_related = False
+            prefetch_related = ["bookmark__tags"]
+
+        tests = [
+            (BookmarkTagView, (["bookmark"], [])),
+            (BookmarkWithTagsView, ([], ["tags"])),
+            (NoAutoRelatedView, ([], ["bookmark__tags"])),
+        ]
+        for view_class, lookups in tests:
+            with self.subTest(view_class=view_class):
+                self.assertEqual(view_class().get_related_lookups(), lookups)
+
+    def test_list_does_not_query_per_row(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/bookmarktag/")
+        self.assertContains(response, "Bookmark 2")
+
+    def test_detail_selects_related(self):
+        tag = BookmarkTag.objects.get(tag="tag-0")
+        with self.assertNumQueries(1):
+            response = self.client.get(f"/bookmarktag/{tag.pk}/")
+        self.assertContains(response, "Bookmark 0")
+
+    @override_settings(DEBUG=True)
+    def test_query_budget_warning(self):
+        class BudgetBookmarkTagView(BookmarkTagView):
+            auto_related = False
+            query_budget = 2
+
+        view = BudgetBookmarkTagView.as_view(role=Role.LIST)
+        response = view(RequestFactory().get("/bookmarktag/"))
+        with self.assertLogs("neapolitan", "WARNING") as logs:
+            response.render()
+        self.assertIn("took 4 queries", logs.output[0])
+        self.assertIn("exceeding its query_budget of 2", logs.output[0])
+
+
+class ListProjectionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.bookmark = Bookmark.objects.create(
+            url="https://example.com/", title="Example", note="A long note."
+        )
+        BookmarkTag.objects.create(bookmark=cls.bookmark, tag="python")
+
+    def get_sql(self, view_class):
+        view = view_class.as_view(role=Role.LIST)
+        with self.assertNumQueries(1) as ctx:
+            view(RequestFactory().get("/")).render()
+        return ctx.captured_queries[0]["sql"]
+
+    def test_list_projection(self):
+        class ProjectedBookmarkView(CRUDView):
+            model = Bookmark
+            fields = ["url", "title"]
+            ordering = ["-favourite"]
+            list_projection = True
+
+        self.assertEqual(
+            ProjectedBookmarkView().get_projection_fields(),
+            ["id", "url", "title", "favourite"],
+        )
+        sql = self.get_sql(ProjectedBookmarkView)
+        self.assertIn('"title"', sql)
+        self.assertNotIn('"note"', sql)
+
+    def test_list_projection_of_related_columns(self):
+        class ProjectedBookmarkTagView(BookmarkTagView):
+            list_projection = True
+
+        self.assertIn('"tests_bookmark"."note"', self.get_sql(ProjectedBookmarkTagView))
+
+        ProjectedBookmarkTagView.list_projection_fields = ["bookmark__title"]
+        sql = self.get_sql(ProjectedBookmarkTagView)
+        self.assertIn('"tests_bookmark"."title"', sql)
+        self.assertNotIn('"tests_bookmark"."note"', sql)
+
+    def test_list_projection_with_select_related(self):
+        class ProjectedBookmarkTagView(BookmarkTagView):
+            fields = ["tag"]
+            select_related = ("bookmark",)
+            list_projection = True
+
+        self.assertEqual(
+            ProjectedBookmarkTagView().get_projection_fields(),
+            ["id", "tag", "bookmark"],
+        )
+        sql = self.get_sql(ProjectedBookmarkTagView)
+        self.assertIn('"tests_bookmark"."title"', sql)
+
+
+class GeneratedClassCacheTests(TestCase):
+    def get_filterset_class(self, view_class):
+        view = view_class()
+        view.request = RequestFactory().get("/")
+        return view.get_filterset(Bookmark.objects.all()).__class__
+
+    def test_form_class_is_cached(self):
+        class TitleOnlyView(BookmarkView):
+            fields = ["title"]
+
+        form_class = BookmarkView().get_form_class()
+        self.assertIs(BookmarkView().get_form_class(), form_class)
+        self.assertEqual(list(form_class.base_fields), ["url", "title", "note"])
+
+        # Subclasses, and changed attributes, get their own class.
+        title_form_class = TitleOnlyView().get_form_class()
+        self.assertIsNot(title_form_class, form_class)
+        self.assertEqual(list(title_form_class.base_fields), ["title"])
+        TitleOnlyView.fields = ["url"]
+        self.assertEqual(list(TitleOnlyView().get_form_class().base_fields), ["url"])
+
+    def test_filterset_class_is_cached(self):
+        class TitleFilterView(BookmarkView):
+            filterset_fields = {"title": ["exact", "icontains"]}
+
+        filterset_class = self.get_filterset_class(BookmarkView)
+        self.assertIs(self.get_filterset_class(BookmarkView), filterset_class)
+        self.assertEqual(list(filterset_class.base_filters), ["favourite"])
+
+        title_filterset_class = self.get_filterset_class(TitleFilterView)
+        self.assertIs(self.get_filterset_class(TitleFilterView), title_filterset_class)
+        self.assertEqual(
+            list(title_filterset_class.base_filters), ["title", "title__icontains"]
+        )
+
+
+class CompiledPartialsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.bookmark = Bookmark.objects.create(
+            url="https://example.com/", title="<b>Bold</b> & brave", note="Note"
+        )
+        BookmarkTag.objects.create(bookmark=cls.bookmark, tag="python")
+
+    def render(self, template, **context):
+        return Template("{% load neapolitan %}" + template).render(Context(context))
+
+    def test_list_matches_template(self):
+        tests = [
+            (BookmarkView, Bookmark),
+            (BookmarkTagView, BookmarkTag),
+            (BulkBookmarkView, Bookmark),
+        ]
+        for view_class, model in tests:
+            with self.subTest(view_class=view_class):
+                view = view_class()
+                objects = list(model.objects.all())
+                expected = self.render(
+                    "{% object_list objects view %}", objects=objects, view=view
+                )
+                compiled = self.render(
+                    "{% render_object_list objects view %}",
+                    objects=objects,
+                    view=view,
+                )
+                self.assertHTMLEqual(compiled, expected)
+        self.assertIn("&lt;b&gt;Bold&lt;/b&gt; &amp; brave", compiled)
+
+    def test_detail_matches_template(self):
+        view = BookmarkView()
+        expected = self.render(
+            "{% object_detail object view.fields %}", object=self.bookmark, view=view
+        )
+        compiled = self.render(
+            "{% render_object_detail object view %}", object=self.bookmark, view=view
+        )
+        self.assertHTMLEqual(compiled, expected)
+        self.assertIn("&lt;b&gt;Bold&lt;/b&gt; &amp; brave", compiled)
+
+    def test_views_use_compiled_partials(self):
+        class CompiledBookmarkView(BookmarkView):
+            compiled_partials = True
+
+        tests = [
+            (Role.LIST, {}, '<td class="py-3.5 px-3 font-medium text-gray-900">'),
+            (
+                Role.DETAIL,
+                {"pk": self.bookmark.pk},
+                '<dl class="divide-y divide-gray-100"><div',
+            ),
+        ]
+        for role, kwargs, compiled_markup in tests:
+            with self.subTest(role=role):
+                view = CompiledBookmarkView.as_view(role=role)
+                response = view(RequestFactory().get("/"), **kwargs).render()
+                self.assertContains(response, "&lt;b&gt;Bold&lt;/b&gt; &amp; brave")
+                self.assertContains(response, compiled_markup)
+
+
+class StreamingListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(5):
+            bookmark = Bookmark.objects.create(
+                url=f"https://example.com/{i}/", title=f"Bookmark {i}"
+            )
+            BookmarkTag.objects.create(bookmark=bookmark, tag=f"tag-{i}")
+
+    def test_streamed_list(self):
+        class StreamedBookmarkTagView(BookmarkTagView):
+            stream_list = True
+            stream_chunk_size = 2
+
+        view = StreamedBookmarkTagView.as_view(role=Role.LIST)
+        response = view(RequestFactory().get("/"))
+        self.assertTrue(response.streaming)
+        chunks = [chunk.decode() for chunk in response.streaming_content]
+        # The page start, three chunks of rows, and the page end.
+        self.assertEqual(len(chunks), 5)
+        self.assertIn("Bookmark tags", chunks[0])
+        self.assertIn("<table", chunks[0])
+        self.assertEqual(chunks[1].count("<tr>"), 2)
+        self.assertEqual(chunks[3].count("<tr>"), 1)
+        self.assertIn("</table>", chunks[4])
+        content = "".join(chunks)
+        for i in range(5):
+            self.assertIn(f"Bookmark {i}", content)
+            self.assertIn(f"tag-{i}", content)
+        self.assertNotIn("<!-- neapolitan:rows -->", content)
+
+    async def test_async_streamed_list(self):
+        class AsyncStreamedBookmarkTagView(AsyncCRUDView):
+            model = BookmarkTag
+            fields = ["bookmark", "tag"]
+            url_base = "bookmarktag"
+            stream_list = True
+            stream_chunk_size = 2
+
+        view = AsyncStreamedBookmarkTagView.as_view(role=Role.LIST)
+        response = await view(RequestFactory().get("/"))
+        self.assertTrue(response.streaming)
+        # Streamed from the event loop, not read into a list in a thread.
+        self.assertTrue(response.is_async)
+        chunks = [chunk.decode() async for chunk in response]
+        self.assertEqual(len(chunks), 5)
+        self.assertEqual(chunks[1].count("<tr>"), 2)
+        self.assertEqual(chunks[3].count("<tr>"), 1)
+        content = "".join(chunks)
+        for i in range(5):
+            self.assertIn(f"Bookmark {i}", content)
+            self.assertIn(f"tag-{i}", content)
+        self.assertNotIn("<!-- neapolitan:rows -->", content)
+
+    def test_streamed_empty_list(self):
+        class StreamedBookmarkView(BookmarkView):
+            stream_list = True
+
+        Bookmark.objects.all().delete()
+        view = StreamedBookmarkView.as_view(role=Role.LIST)
+        response = view(RequestFactory().get("/"))
+        content = b"".join(response.streaming_content).decode()
+        self.assertIn("There are no bookmarks. Create one now?", content)
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.homepage = Bookmark.objects.create(
+            url="https://noumenal.es/",
+            title="Noumenal • Dr Carlton Gibson",
+            note='Blog, "Contact" and Project links.',
+            favourite=True,
+        )
+        cls.github = Bookmark.objects.create(
+            url="https://github.com/carltongibson",
+            title="Carlton Gibson - GitHub",
+        )
+
+    def test_export_is_opt_in(self):
+        routes = [url.pattern._route for url in BookmarkView.get_urls()]
+        self.assertNotIn("bookmark/export/", routes)
+        self.assertEqual(reverse("bookmark-export"), "/bookmark/export/")
+
+    def test_csv_export(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/bookmark/export/")
+            content = b"".join(response.streaming_content).decode()
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertEqual(
+            response["Content-Disposition"], 'attachment; filename="bookmark.csv"'
+        )
+        self.assertEqual(
+            content.splitlines(),
+            [
+                "url,title,note",
+                'https://noumenal.es/,Noumenal • Dr Carlton Gibson,"Blog, ""Contact"" '
+                'and Project links."',
+                "https://github.com/carltongibson,Carlton Gibson - GitHub,",
+            ],
+        )
+
+    def test_jsonl_export_is_filtered(self):
+        response = self.client.get("/bookmark/export/?format=jsonl&favourite=true")
+        self.assertEqual(response["Content-Type"], "application/jsonl; charset=utf-8")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            [json.loads(line) for line in lines],
+            [
+                {
+                    "url": "https://noumenal.es/",
+                    "title": "Noumenal • Dr Carlton Gibson",
+                    "note": 'Blog, "Contact" and Project links.',
+                }
+            ],
+        )
+
+    def test_export_in_chunks(self):
+        class ChunkedBookmarkView(BookmarkView):
+            stream_chunk_size = 1
+
+        view = ChunkedBookmarkView.as_view(role=Role.EXPORT)
+        response = view(RequestFactory().get("/", {"format": "jsonl"}))
+        chunks = list(response.streaming_content)
+        self.assertEqual(len(chunks), 2)
+
+    def test_unsupported_export_format(self):
+        response = self.client.get("/bookmark/export/?format=xml")
+        self.assertEqual(response.status_code, 404)
+
+
+class AsyncCRUDViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.homepage = Bookmark.objects.create(
+            url="https://noumenal.es/",
+            title="Noumenal • Dr Carlton Gibson",
+            favourite=True,
+        )
+        cls.github = Bookmark.objects.create(
+            url="https://github.com/carltongibson",
+            title="Carlton Gibson - GitHub",
+        )
+
+    def test_views_are_coroutine_functions(self):
+        for role in Role:
+            with self.subTest(role=role):
+                view = AsyncBookmarkView.as_view(role=role)
+                self.assertTrue(iscoroutinefunction(view))
+        self.assertFalse(
+            iscoroutinefunction(BookmarkView.as_view(role=Role.LIST))
+        )
+
+    async def test_list(self):
+        response = await self.async_client.get("/asyncbookmark/?favourite=true")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["object_list"], [self.homepage])
+        self.assertContains(response, self.homepage.title)
+        self.assertNotContains(response, self.github.title)
+
+    async def test_paginated_list(self):
+        for pagination_mode in ["page", "nocount", "cursor"]:
+            with self.subTest(pagination_mode=pagination_mode):
+                view = AsyncBookmarkView.as_view(
+                    role=Role.LIST,
+                    paginate_by=1,
+                    ordering=["pk"],
+                    pagination_mode=pagination_mode,
+                )
+                response = await view(RequestFactory().get("/"))
+                page = response.context_data["page_obj"]
+                self.assertEqual(list(page.object_list), [self.homepage])
+                self.assertTrue(page.has_next())
+
+    async def test_detail(self):
+        response = await self.async_client.get(f"/asyncbookmark/{self.github.pk}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["object"], self.github)
+
+        response = await self.async_client.get("/asyncbookmark/0/")
+        self.assertEqual(response.status_code, 404)
+
+    async def test_create_update_and_delete(self):
+        response = await self.async_client.post(
+            "/asyncbookmark/new/",
+            {"url": "https://example.com/", "title": "Example"},
+        )
+        bookmark = await Bookmark.objects.aget(url="https://example.com/")
+        self.assertRedirects(
+            response,
+            f"/asyncbookmark/{bookmark.pk}/",
+            fetch_redirect_response=False,
+        )
+
+        # Invalid, since the url is already used.
+        response = await self.async_client.post(
+            f"/asyncbookmark/{bookmark.pk}/edit/",
+            {"url": self.homepage.url, "title": "Example"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("url", response.context["form"].errors)
+
+        response = await self.async_client.post(
+            f"/asyncbookmark/{bookmark.pk}/edit/",
+            {"url": "https://example.com/", "title": "Updated"},
+        )
+        self.assertEqual(response.status_code, 302)
+        await bookmark.arefresh_from_db()
+        self.assertEqual(bookmark.title, "Updated")
+
+        response = await self.async_client.post(
+            f"/asyncbookmark/{bookmark.pk}/delete/"
+        )
+        self.assertRedirects(
+            response, "/asyncbookmark/", fetch_redirect_response=False
+        )
+        self.assertFalse(await Bookmark.objects.filter(pk=bookmark.pk).aexists())
+
+    async def test_many_to_many_forms(self):
+        class AsyncReadingListView(AsyncCRUDView):
+            model = ReadingList
+            fields = ["name", "bookmarks"]
+
+            def get_success_url(self):
+                return "/"
+
+        reading_list = await ReadingList.objects.acreate(name="Reading")
+        await reading_list.bookmarks.aadd(self.homepage)
+
+        # Building the forms reads the many-to-many values.
+        view = AsyncReadingListView.as_view(role=Role.UPDATE)
+        response = await view(RequestFactory().get("/"), pk=reading_list.pk)
+        form = response.context_data["form"]
+        self.assertEqual(form.initial["bookmarks"], [self.homepage])
+
+        request = RequestFactory().post(
+            "/", {"name": "Reading", "bookmarks": [self.github.pk]}
+        )
+        response = await view(request, pk=reading_list.pk)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            [bookmark async for bookmark in reading_list.bookmarks.all()],
+            [self.github],
+        )
+
+        view = AsyncReadingListView.as_view(role=Role.GRID)
+        response = await view(RequestFactory().get("/"))
+        formset = response.context_data["formset"]
+        self.assertEqual(formset.forms[0].initial["bookmarks"], [self.github])
+
+    async def test_export(self):
+        response = await self.async_client.get(
+            "/asyncbookmark/export/?format=jsonl&favourite=false"
+        )
+        content = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(
+            json.loads(content),
+            {
+                "url": "https://github.com/carltongibson",
+                "title": "Carlton Gibson - GitHub",
+                "note": "",
+            },
+        )
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.homepage = Bookmark.objects.create(
+            url="https://noumenal.es/",
+            title="Noumenal • Dr Carlton Gibson",
+            favourite=True,
+        )
+        cls.github = Bookmark.objects.create(
+            url="https://github.com/carltongibson",
+            title="Carlton Gibson - GitHub",
+        )
+
+    class ConditionalBookmarkView(BookmarkView):
+        last_modified_field = "updated"
+
+    def get(self, role, etag=None, query=None, **kwargs):
+        headers = {} if etag is None else {"HTTP_IF_NONE_MATCH": etag}
+        request = RequestFactory().get("/", query, **headers)
+        view = self.ConditionalBookmarkView.as_view(role=role)
+        return view(request, **kwargs)
+
+    def test_not_enabled_by_default(self):
+        view = BookmarkView.as_view(role=Role.DETAIL)
+        response = view(RequestFactory().get("/"), pk=self.homepage.pk)
+        self.assertFalse(response.has_header("ETag"))
+        self.assertFalse(response.has_header("Last-Modified"))
+
+    def test_detail(self):
+        response = self.get(Role.DETAIL, pk=self.homepage.pk)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertTrue(etag.startswith('W/"'))
+        self.assertTrue(response.has_header("Last-Modified"))
+
+        # Only the object is fetched. Nothing is rendered.
+        with self.assertNumQueries(1):
+            response = self.get(Role.DETAIL, etag=etag, pk=self.homepage.pk)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+        response = self.get(Role.DETAIL, etag=etag, pk=self.github.pk)
+        self.assertEqual(response.status_code, 200)
+
+        self.homepage.save()
+        response = self.get(Role.DETAIL, etag=etag, pk=self.homepage.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_detail_if_modified_since(self):
+        response = self.get(Role.DETAIL, pk=self.homepage.pk)
+        view = self.ConditionalBookmarkView.as_view(role=Role.DETAIL)
+        request = RequestFactory().get(
+            "/", HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+        )
+        response = view(request, pk=self.homepage.pk)
+        self.assertEqual(response.status_code, 304)
+
+    def test_list(self):
+        response = self.get(Role.LIST)
+        etag = response["ETag"]
+
+        # A single aggregate query.
+        with self.assertNumQueries(1):
+            response = self.get(Role.LIST, etag=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # Filtering or paging changes the ETag.
+        response = self.get(Role.LIST, etag=etag, query={"favourite": "true"})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+        # As does deleting an object, even if it wasn't the latest modified.
+        self.homepage.delete()
+        response = self.get(Role.LIST, etag=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_ignores_if_modified_since(self):
+        response = self.get(Role.LIST)
+        self.assertFalse(response.has_header("Last-Modified"))
+
+        # Deleting an object that wasn't the latest modified leaves the latest
+        # modified time as it was, so it can't validate the list.
+        since = http_date(timezone.now().timestamp() + 60)
+        self.homepage.delete()
+        view = self.ConditionalBookmarkView.as_view(role=Role.LIST)
+        response = view(RequestFactory().get("/", HTTP_IF_MODIFIED_SINCE=since))
+        self.assertEqual(response.status_code, 200)
+
+    async def test_async_list(self):
+        class AsyncConditionalBookmarkView(AsyncBookmarkView):
+            last_modified_field = "updated"
+
+        view = AsyncConditionalBookmarkView.as_view(role=Role.LIST)
+        response = await view(RequestFactory().get("/"))
+        etag = response["ETag"]
+        response = await view(RequestFactory().get("/", HTTP_IF_NONE_MATCH=etag))
+        self.assertEqual(response.status_code, 304)
+
+
+class RowCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.homepage = Bookmark.objects.create(
+            url="https://noumenal.es/",
+            title="Noumenal • Dr Carlton Gibson",
+        )
+        cls.github = Bookmark.objects.create(
+            url="https://github.com/carltongibson",
+            title="Carlton Gibson - GitHub",
+        )
+
+    class RowCachedBookmarkView(BookmarkView):
+        row_cache = True
+
+    def setUp(self):
+        cache.clear()
+
+    def render_list(self, view_class=RowCachedBookmarkView):
+        view = view_class.as_view(role=Role.LIST)
+        return view(RequestFactory().get("/")).render().content.decode()
+
+    def test_cached_rows_match_rendered_rows(self):
+        class CompiledBookmarkView(BookmarkView):
+            compiled_partials = True
+
+        uncached = self.render_list(CompiledBookmarkView)
+        self.assertEqual(self.render_list(), uncached)
+        self.assertEqual(self.render_list(), uncached)
+        key = "neapolitan:row:tests.tests.RowCacheTests.RowCachedBookmarkView:%s"
+        self.assertIsNotNone(cache.get(key % self.homepage.pk))
+
+    def test_rows_are_served_from_the_cache(self):
+        self.render_list()
+        # QuerySet.update() sends no signals, so the cached row is served...
+        Bookmark.objects.filter(pk=self.github.pk).update(title="GitHub")
+        self.assertNotIn(">GitHub<", self.render_list())
+
+        # ...until the view is told that it has changed.
+        view = self.RowCachedBookmarkView(role=Role.LIST)
+        view.objects_changed([self.github.pk])
+        self.assertIn(">GitHub<", self.render_list())
+
+    def test_saving_and_deleting_invalidate_rows(self):
+        self.render_list()
+        self.github.title = "GitHub"
+        self.github.save()
+        self.assertIn(">GitHub<", self.render_list())
+
+        response = self.client.post(f"/bookmark/{self.homepage.pk}/delete/")
+        self.assertEqual(response.status_code, 302)
+        self.assertNotIn("Noumenal", self.render_list())
+
+    def test_last_modified_field_versions_rows(self):
+        class VersionedBookmarkView(self.RowCachedBookmarkView):
+            last_modified_field = "updated"
+
+        self.render_list(VersionedBookmarkView)
+        Bookmark.objects.filter(pk=self.github.pk).update(
+            title="GitHub", updated=timezone.now()
+        )
+        self.assertIn(">GitHub<", self.render_list(VersionedBookmarkView))
+
+    def test_last_modified_field_with_list_projection(self):
+        class ProjectedBookmarkView(self.RowCachedBookmarkView):
+            last_modified_field = "updated"
+            list_projection = True
+
+        for i in range(10):
+            Bookmark.objects.create(url=f"https://example.com/{i}/", title=f"{i}")
+        self.render_list(ProjectedBookmarkView)
+        # The validators' aggregate, and the list, without fetching each row
+        # for its version.
+        with self.assertNumQueries(2):
+            self.render_list(ProjectedBookmarkView)
+
+
+class ListCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.homepage = Bookmark.objects.create(
+            url="https://noumenal.es/",
+            title="Noumenal • Dr Carlton Gibson",
+            favourite=True,
+        )
+        cls.github = Bookmark.objects.create(
+            url="https://github.com/carltongibson",
+            title="Carlton Gibson - GitHub",
+        )
+
+    class ListCachedBookmarkView(BookmarkView):
+        list_cache = True
+        last_modified_field = "updated"
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, query=None, **headers):
+        view = self.ListCachedBookmarkView.as_view(role=Role.LIST)
+        response = view(RequestFactory().get("/", query, **headers))
+        if hasattr(response, "render"):
+            response.render()
+        return response
+
+    def test_cached_response(self):
+        response = self.get()
+        self.assertIsInstance(response, TemplateResponse)
+        with self.assertNumQueries(0):
+            cached = self.get()
+        self.assertNotIsInstance(cached, TemplateResponse)
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(cached["Content-Type"], response["Content-Type"])
+        self.assertEqual(cached["ETag"], response["ETag"])
+
+        # Validated against the cached ETag, without a query.
+        with self.assertNumQueries(0):
+            response = self.get(HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_query_string_is_normalised(self):
+        self.get({"favourite": "true", "page": ""})
+        with self.assertNumQueries(0):
+            response = self.get({"favourite": "true"})
+        self.assertNotContains(response, "GitHub")
+
+        response = self.get({"favourite": "false"})
+        self.assertIsInstance(response, TemplateResponse)
+        self.assertContains(response, "GitHub")
+
+    def test_views_of_a_class_do_not_share_entries(self):
+        all_view = self.ListCachedBookmarkView.as_view(role=Role.LIST)
+        favourites_view = self.ListCachedBookmarkView.as_view(
+            role=Role.LIST, queryset=Bookmark.objects.filter(favourite=True)
+        )
+        all_view(RequestFactory().get("/")).render()
+        response = favourites_view(RequestFactory().get("/")).render()
+        self.assertIsInstance(response, TemplateResponse)
+        self.assertNotContains(response, "GitHub")
+
+        # Nor do URLs routed to the same view.
+        response = all_view(RequestFactory().get("/bookmarks/")).render()
+        self.assertIsInstance(response, TemplateResponse)
+        with self.assertNumQueries(0):
+            all_view(RequestFactory().get("/bookmarks/"))
+
+    def test_stale_while_revalidate(self):
+        self.get()
+        self.github.title = "GitHub"
+        self.github.save()
+
+        # Another request is refreshing the stale list, so it's served stale.
+        view = self.ListCachedBookmarkView(role=Role.LIST)
+        view.setup(RequestFactory().get("/"))
+        cache.add(f"{view.get_list_cache_key()}:refresh", True)
+        self.assertNotContains(self.get(), ">GitHub<")
+
+        # Once the refresh has finished, a request refreshes it.
+        cache.delete(f"{view.get_list_cache_key()}:refresh")
+        self.assertContains(self.get(), ">GitHub<")
+        with self.assertNumQueries(0):
+            self.assertContains(self.get(), ">GitHub<")
+
+    def test_objects_changed_invalidates_lists(self):
+        self.get()
+        Bookmark.objects.filter(pk=self.github.pk).update(title="GitHub")
+        self.assertNotContains(self.get(), ">GitHub<")
+
+        view = self.ListCachedBookmarkView(role=Role.LIST)
+        view.objects_changed([self.github.pk])
+        self.assertContains(self.get(), ">GitHub<")
+
+
+class BulkActionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.homepage = Bookmark.objects.create(
+            url="https://noumenal.es/",
+            title="Noumenal • Dr Carlton Gibson",
+            favourite=True,
+        )
+        cls.github = Bookmark.objects.create(
+            url="https://github.com/carltongibson",
+            title="Carlton Gibson - GitHub",
+        )
+        cls.django = Bookmark.objects.create(
+            url="https://www.djangoproject.com/",
+            title="Django",
+            favourite=True,
+        )
+
+    def test_list_rows_are_selectable(self):
+        response = self.client.get("/bulkbookmark/?favourite=true")
+        self.assertContains(
+            response,
+            f'<input type="checkbox" name="selected" value="{self.homepage.pk}" '
+            'form="neapolitan-bulk-actions">',
+            html=True,
+        )
+        self.assertContains(response, 'formaction="/bulkbookmark/bulk-delete/"')
+        self.assertContains(response, 'formaction="/bulkbookmark/bulk-update/"')
+        # The filters are passed on to the bulk roles.
+        self.assertContains(
+            response, '<input type="hidden" name="favourite" value="true">', html=True
+        )
+
+        response = self.client.get("/bookmark/")
+        self.assertNotContains(response, 'name="selected"')
+
+    def test_bulk_delete_selected(self):
+        url = (
+            f"/bulkbookmark/bulk-delete/"
+            f"?selected={self.homepage.pk}&selected={self.github.pk}"
+        )
+        response = self.client.get(url)
+        self.assertContains(response, "delete 2 bookmarks?")
+
+        response = self.client.post(url)
+        self.assertRedirects(response, "/bulkbookmark/")
+        self.assertQuerySetEqual(Bookmark.objects.all(), [self.django])
+
+    def test_bulk_delete_all_matching_filter(self):
+        class BatchedBookmarkView(BulkBookmarkView):
+            bulk_batch_size = 1
+
+        view = BatchedBookmarkView.as_view(role=Role.BULK_DELETE)
+        request = RequestFactory().post("/?select_all=1&favourite=true")
+        response = view(request)
+        self.assertEqual(response.status_code, 302)
+        self.assertQuerySetEqual(Bookmark.objects.all(), [self.github])
+
+    def test_invalid_selection(self):
+        response = self.client.get("/bulkbookmark/bulk-delete/?selected=x")
+        self.assertEqual(response.status_code, 404)
+
+    def test_bulk_update(self):
+        url = "/bulkbookmark/bulk-update/?select_all=1&favourite=true"
+        response = self.client.get(url)
+        self.assertContains(response, "Edit 2 bookmarks")
+        # Unique fields can't be bulk updated.
+        self.assertEqual(
+            list(response.context["form"].fields), ["bulk_fields", "title", "note"]
+        )
+
+        # Nothing chosen to update.
+        response = self.client.post(url, {"note": "Read later"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("bulk_fields", response.context["form"].errors)
+
+        # Title is required, but isn't applied, so needn't be given.
+        updated = self.homepage.updated
+        response = self.client.post(
+            url, {"bulk_fields": ["note"], "note": "Read later"}
+        )
+        self.assertRedirects(response, "/bulkbookmark/")
+        self.assertQuerySetEqual(
+            Bookmark.objects.filter(note="Read later").order_by("pk"),
+            [self.homepage, self.django],
+        )
+        self.homepage.refresh_from_db()
+        self.assertEqual(self.homepage.title, "Noumenal • Dr Carlton Gibson")
+        self.assertGreater(self.homepage.updated, updated)
+
+    async def test_async_bulk_delete(self):
+        class AsyncBulkBookmarkView(AsyncBookmarkView):
+            url_base = "bulkbookmark"
+
+        view = AsyncBulkBookmarkView.as_view(role=Role.BULK_DELETE)
+        request = RequestFactory().post(f"/?selected={self.github.pk}")
+        response = await view(request)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(await Bookmark.objects.acount(), 2)
+
+
+class ImportTests(TestCase):
+    def upload(self, name, content):
+        return SimpleUploadedFile(name, content.encode())
+
+    def test_import_form(self):
+        response = self.client.get("/bookmark/import/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, "neapolitan/object_import.html")
+        self.assertContains(response, 'enctype="multipart/form-data"')
+
+    def test_import_csv(self):
+        file = self.upload(
+            "bookmarks.csv",
+            "\ufeffurl,title,note\n"
+            "https://noumenal.es/,Noumenal,\n"
+            'https://github.com/carltongibson,"Carlton Gibson, GitHub",On GitHub\n',
+        )
+        response = self.client.post("/bookmark/import/", {"file": file})
+        self.assertEqual(response.status_code, 200)
+        result = response.context["import_result"]
+        self.assertEqual((result.created, result.error_count), (2, 0))
+        self.assertContains(response, "Created 2 bookmarks.")
+        self.assertQuerySetEqual(
+            Bookmark.objects.order_by("pk").values_list("title", "note"),
+            [("Noumenal", ""), ("Carlton Gibson, GitHub", "On GitHub")],
+            transform=tuple,
+        )
+
+    def test_import_jsonl(self):
+        file = self.upload(
+            "bookmarks.txt",
+            json.dumps({"url": "https://noumenal.es/", "title": "Noumenal"})
+            + "\n\nnot json\n",
+        )
+        response = self.client.post(
+            "/bookmark/import/", {"file": file, "format": "jsonl"}
+        )
+        result = response.context["import_result"]
+        self.assertEqual(result.created, 1)
+        self.assertEqual(
+            result.errors, [(3, {"__all__": ["The row could not be read."]})]
+        )
+
+    def test_format_required_for_unknown_extension(self):
+        file = self.upload("bookmarks.txt", "url,title\n")
+        response = self.client.post("/bookmark/import/", {"file": file})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context["form"].is_valid())
+        self.assertNotIn("import_result", response.context)
+
+    def test_format_required_without_extension(self):
+        file = self.upload("bookmarks", "url,title\n")
+        response = self.client.post("/bookmark/import/", {"file": file})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.context["form"].errors["__all__"],
+            ["Choose the format of the file."],
+        )
+        self.assertNotIn("import_result", response.context)
+
+    def test_row_errors(self):
+        Bookmark.objects.create(url="https://noumenal.es/", title="Noumenal")
+        file = self.upload(
+            "bookmarks.csv",
+            "url,title\n"
+            "https://noumenal.es/,Duplicate\n"
+            "not a url,Invalid\n"
+            "https://www.djangoproject.com/,Django\n",
+        )
+        response = self.client.post("/bookmark/import/", {"file": file})
+        result = response.context["import_result"]
+        self.assertEqual(result.created, 1)
+        self.assertEqual([line for line, errors in result.errors], [2, 3])
+        self.assertEqual(list(result.errors[0][1]), ["url"])
+        self.assertContains(response, "2 rows could not be imported")
+        self.assertEqual(Bookmark.objects.count(), 2)
+
+    def test_batches(self):
+        rows = "".join(f"https://example.com/{n},Example {n}\n" for n in range(5))
+        file = self.upload("bookmarks.csv", "url,title\n" + rows)
+        view = BookmarkView.as_view(role=Role.IMPORT, import_batch_size=2)
+        request = RequestFactory().post("/", {"file": file})
+        # Per batch, a savepoint, the insert, and its release.
+        with self.assertNumQueries(5 + 3 * 3):
+            response = view(request)
+        self.assertEqual(response.context_data["import_result"].created, 5)
+        self.assertEqual(Bookmark.objects.count(), 5)
+
+    def test_duplicates_within_file(self):
+        # Both rows pass validation, but the batch's insert fails, so the rows
+        # are saved one at a time.
+        file = self.upload(
+            "bookmarks.csv",
+            "url,title\n"
+            "https://noumenal.es/,Noumenal\n"
+            "https://www.djangoproject.com/,Django\n"
+            "https://noumenal.es/,Duplicate\n",
+        )
+        response = self.client.post("/bookmark/import/", {"file": file})
+        result = response.context["import_result"]
+        self.assertEqual(result.created, 2)
+        self.assertEqual([line for line, errors in result.errors], [4])
+        self.assertQuerySetEqual(
+            Bookmark.objects.order_by("pk").values_list("title", flat=True),
+            ["Noumenal", "Django"],
+        )
+
+    async def test_async_import(self):
+        file = self.upload("bookmarks.csv", "url,title\nhttps://noumenal.es/,Noumenal\n")
+        view = AsyncBookmarkView.as_view(role=Role.IMPORT)
+        request = RequestFactory().post("/", {"file": file})
+        response = await view(request)
+        self.assertEqual(response.context_data["import_result"].created, 1)
+        self.assertEqual(await Bookmark.objects.acount(), 1)
+
+
+class GridTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.homepage = Bookmark.objects.create(
+            url="https://noumenal.es/",
+            title="Noumenal • Dr Carlton Gibson",
+            favourite=True,
+        )
+        cls.github = Bookmark.objects.create(
+            url="https://github.com/carltongibson",
+            title="Carlton Gibson - GitHub",
+        )
+        cls.django = Bookmark.objects.create(
+            url="https://www.djangoproject.com/",
+            title="Django",
+            favourite=True,
+        )
+
+    def get_data(self, bookmarks, **changes):
+        # The grid's POST data for the bookmarks, with changed values by
+        # "<index>-<field>".
+        data = {
+            "form-TOTAL_FORMS": len(bookmarks),
+            "form-INITIAL_FORMS": len(bookmarks),
+        }
+        for i, bookmark in enumerate(bookmarks):
+            data[f"form-{i}-id"] = bookmark.pk
+            for field in ("url", "title", "note"):
+                data[f"form-{i}-{field}"] = getattr(bookmark, field)
+        for key, value in changes.items():
+            data[f"form-{key.replace('_', '-', 1)}"] = value
+        return data
+
+    def test_grid_uses_filters(self):
+        response = self.client.get("/bulkbookmark/grid/?favourite=true")
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, "neapolitan/object_grid.html")
+        formset = response.context["formset"]
+        self.assertEqual(
+            [form.instance for form in formset], [self.homepage, self.django]
+        )
+        self.assertContains(response, 'value="Django"')
+        self.assertNotContains(response, 'value="Carlton Gibson - GitHub"')
+
+    def test_grid_uses_pagination(self):
+        view = BulkBookmarkView.as_view(
+            role=Role.GRID, paginate_by=2, ordering=["pk"]
+        )
+        response = view(RequestFactory().get("/?page=2"))
+        formset = response.context_data["formset"]
+        self.assertEqual([form.instance for form in formset], [self.django])
+        self.assertEqual(response.context_data["page_obj"].number, 2)
+
+    def test_changed_rows_saved_with_bulk_update(self):
+        bookmarks = [self.homepage, self.github, self.django]
+        data = self.get_data(bookmarks, **{"0_note": "Blog", "2_title": "Django!"})
+        updated = self.github.updated
+        # The list, the unique check of the changed rows' URLs, and the update.
+        with self.assertNumQueries(1 + 2 + 1):
+            response = self.client.post("/bulkbookmark/grid/?favourite=", data)
+        self.assertRedirects(response, "/bulkbookmark/grid/?favourite=")
+
+        self.homepage.refresh_from_db()
+        self.django.refresh_from_db()
+        self.github.refresh_from_db()
+        self.assertEqual(self.homepage.note, "Blog")
+        self.assertEqual(self.django.title, "Django!")
+        self.assertEqual(self.github.updated, updated)
+        self.assertGreater(self.django.updated, updated)
+
+    def test_unchanged(self):
+        data = self.get_data([self.homepage, self.github, self.django])
+        with self.assertNumQueries(1):
+            response = self.client.post("/bulkbookmark/grid/", data)
+        self.assertRedirects(response, "/bulkbookmark/grid/")
+
+    def test_invalid(self):
+        data = self.get_data([self.homepage, self.django], **{"1_url": "nope"})
+        response = self.client.post("/bulkbookmark/grid/?favourite=true", data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context["formset"].errors[1]), ["url"])
+        self.django.refresh_from_db()
+        self.assertEqual(self.django.url, "https://www.djangoproject.com/")
+
+    def test_objects_not_on_page_rejected(self):
+        data = self.get_data([self.homepage, self.github], **{"1_note": "Edited"})
+        response = self.client.post("/bulkbookmark/grid/?favourite=true", data)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("id", response.context["formset"].errors[1])
+        self.assertFalse(Bookmark.objects.filter(note="Edited").exists())
+
+    async def test_async_grid(self):
+        class AsyncBulkBookmarkView(AsyncBookmarkView):
+            url_base = "bulkbookmark"
+
+        view = AsyncBulkBookmarkView.as_view(role=Role.GRID)
+        response = await view(RequestFactory().get("/?favourite=true"))
+        self.assertEqual(len(response.context_data["formset"].forms), 2)
+
+        data = self.get_data([self.homepage, self.django], **{"1_note": "Docs"})
+        response = await view(RequestFactory().post("/?favourite=true", data))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(await Bookmark.objects.filter(note="Docs").acount(), 1)
+
+
+class SaveChangedFieldsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.homepage = Bookmark.objects.create(
+            url="https://noumenal.es/",
+            title="Noumenal • Dr Carlton Gibson",
+            note="Carlton Gibson's homepage.",
+        )
+
+    def post(self, view_class, data):
+        view = view_class.as_view(role=Role.UPDATE, save_changed_fields=True)
+        request = RequestFactory().post("/", data)
+        if view_class.view_is_async:
+            view = async_to_sync(view)
+        with CaptureQueriesContext(connection) as queries:
+            response = view(request, pk=self.homepage.pk)
+        updates = [q["sql"] for q in queries if q["sql"].startswith("UPDATE")]
+        return response, updates
+
+    def test_changed_fields_saved(self):
+        data = {
+            "url": self.homepage.url,
+            "title": "Noumenal",
+            "note": self.homepage.note,
+        }
+        response, updates = self.post(BookmarkView, data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"title"', updates[0])
+        self.assertIn('"updated"', updates[0])
+        self.assertNotIn('"note"', updates[0])
+        self.homepage.refresh_from_db()
+        self.assertEqual(self.homepage.title, "Noumenal")
+
+    def test_unchanged_not_saved(self):
+        data = {
+            "url": self.homepage.url,
+            "title": self.homepage.title,
+            "note": self.homepage.note,
+        }
+        response, updates = self.post(BookmarkView, data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(updates, [])
+
+    def test_create_saves_all_fields(self):
+        view = BookmarkView.as_view(role=Role.CREATE, save_changed_fields=True)
+        request = RequestFactory().post(
+            "/", {"url": "https://www.djangoproject.com/", "title": "Django"}
+        )
+        response = view(request)
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Bookmark.objects.filter(title="Django").exists())
+
+    def test_async(self):
+        data = {
+            "url": self.homepage.url,
+            "title": self.homepage.title,
+            "note": "Blog",
+        }
+        response, updates = self.post(AsyncBookmarkView, data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('"title"', updates[0])
+        self.homepage.refresh_from_db()
+        self.assertEqual(self.homepage.note, "Blog")
+
+
+class InstrumentationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.homepage = Bookmark.objects.create(
+            url="https://noumenal.es/",
+            title="Noumenal • Dr Carlton Gibson",
+        )
+        cls.github = Bookmark.objects.create(
+            url="https://github.com/carltongibson",
+            title="Carlton Gibson - GitHub",
+        )
+
+    def measure(self, view, request, **kwargs):
+        # Returns the response, rendered, and the measured phases.
+        measured = []
+
+        def receiver(sender, view, request, phases, **kwargs):
+            measured.append(phases)
+
+        request_measured.connect(receiver)
+        self.addCleanup(request_measured.disconnect, receiver)
+        if view.view_class.view_is_async:
+            view = async_to_sync(view)
+        response = view(request, **kwargs)
+        if isinstance(response, TemplateResponse):
+            response.render()
+        self.assertEqual(len(measured), 1)
+        return response, measured[0]
+
+    def test_list_phases(self):
+        view = BookmarkView.as_view(
+            role=Role.LIST, instrument=True, paginate_by=1, ordering=["pk"]
+        )
+        response, phases = self.measure(view, RequestFactory().get("/"))
+        self.assertEqual(
+            [phase.name for phase in phases],
+            [
+                "queryset",
+                "filter",
+                "validators",
+                "paginate",
+                "context",
+                "render",
+                "total",
+            ],
+        )
+        queries = {phase.name: phase.queries for phase in phases}
+        # The count, then the page's objects as the template renders them.
+        self.assertEqual(queries["paginate"], 1)
+        self.assertEqual(queries["render"], 1)
+        self.assertIsNone(queries["total"])
+        self.assertTrue(all(phase.duration >= 0 for phase in phases))
+        self.assertFalse(response.has_header("Server-Timing"))
+
+    def test_server_timing(self):
+        view = BookmarkView.as_view(
+            role=Role.DETAIL, instrument=True, server_timing=True
+        )
+        response, phases = self.measure(
+            view, RequestFactory().get("/"), pk=self.homepage.pk
+        )
+        metrics = response["Server-Timing"].split(", ")
+        self.assertEqual(
+            [metric.split(";")[0] for metric in metrics],
+            ["object", "validators", "context", "render", "total"],
+        )
+        self.assertRegex(metrics[0], r'^object;dur=\d+\.\d;desc="1 queries"$')
+        self.assertRegex(metrics[-1], r"^total;dur=\d+\.\d$")
+
+    def test_form_and_delete_phases(self):
+        view = BookmarkView.as_view(role=Role.UPDATE, instrument=True)
+        data = {"url": self.homepage.url, "title": "Noumenal"}
+        response, phases = self.measure(
+            view, RequestFactory().post("/", data), pk=self.homepage.pk
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            [phase.name for phase in phases], ["object", "form", "save", "total"]
+        )
+
+        view = BookmarkView.as_view(role=Role.DELETE, instrument=True)
+        response, phases = self.measure(
+            view, RequestFactory().post("/"), pk=self.github.pk
+        )
+        self.assertEqual(
+            [phase.name for phase in phases], ["object", "delete", "total"]
+        )
+        # The bookmark's tags and reading list memberships, then the bookmark,
+        # then its row in SearchBookmarkView's index.
+        self.assertEqual(phases[1].queries, 4)
+
+    def test_not_instrumented(self):
+        def receiver(**kwargs):
+            self.fail("request_measured sent")
+
+        request_measured.connect(receiver)
+        self.addCleanup(request_measured.disconnect, receiver)
+        response = self.client.get("/bookmark/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_async_phases_not_counted(self):
+        view = AsyncBookmarkView.as_view(role=Role.LIST, instrument=True)
+        response, phases = self.measure(view, RequestFactory().get("/"))
+        self.assertEqual(
+            [phase.name for phase in phases],
+            [
+                "queryset",
+                "filter",
+                "validators",
+                "objects",
+                "context",
+                "render",
+                "total",
+            ],
+        )
+        self.assertTrue(all(phase.queries is None for phase in phases))
+
+
+class ConstantQueriesTests(TestCase):
+    def make_bookmarks(self, count):
+        Bookmark.objects.bulk_create(
+            Bookmark(url=f"https://example.com/{n}/", title=f"Example {n}")
+            for n in range(Bookmark.objects.count(), count)
+        )
+
+    def make_tags(self, count):
+        bookmark, _ = Bookmark.objects.get_or_create(
+            url="https://noumenal.es/", defaults={"title": "Noumenal"}
+        )
+        BookmarkTag.objects.bulk_create(
+            BookmarkTag(bookmark=bookmark, tag=f"tag-{n}")
+            for n in range(BookmarkTag.objects.count(), count)
+        )
+
+    def test_constant(self):
+        assert_constant_queries(BookmarkView, self.make_bookmarks)
+
+    def test_opt_in_roles(self):
+        assert_constant_queries(
+            BulkBookmarkView,
+            self.make_bookmarks,
+            roles=set(Role),
+            many=10,
+        )
+
+    def test_async(self):
+        assert_constant_queries(AsyncBookmarkView, self.make_bookmarks, many=10)
+
+    def test_grid_foreign_keys(self):
+        # The bookmark choices are fetched once, rather than for each row.
+        assert_constant_queries(
+            BookmarkTagView, self.make_tags, roles={Role.GRID}, many=20
+        )
+
+    def test_queries_growing_with_rows(self):
+        class NPlusOneTagView(BookmarkTagView):
+            def get_related_lookups(self):
+                return [], []
+
+        assert_constant_queries(BookmarkTagView, self.make_tags, many=10)
+        BookmarkTag.objects.all().delete()
+        with self.assertRaisesMessage(
+            AssertionError,
+            "NPlusOneTagView's list page took 2 queries with 1 objects, but 11 "
+            "with 10:\n1. SELECT",
+        ):
+            assert_constant_queries(NPlusOneTagView, self.make_tags, many=10)
+
+
+class AutocompleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.homepage = Bookmark.objects.create(
+            url="https://noumenal.es/",
+            title="Noumenal • Dr Carlton Gibson",
+        )
+        cls.github = Bookmark.objects.create(
+            url="https://github.com/carltongibson",
+            title="Carlton Gibson - GitHub",
+        )
+        cls.django = Bookmark.objects.create(
+            url="https://www.djangoproject.com/",
+            title="Django",
+        )
+        cls.tag = BookmarkTag.objects.create(bookmark=cls.django, tag="python")
+
+    def get_results(self, **params):
+        response = self.client.get("/autocompletetag/autocomplete/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_routed(self):
+        names = [pattern.name for pattern in AutocompleteTagView.get_urls()]
+        self.assertIn("autocompletetag-autocomplete", names)
+        names = [pattern.name for pattern in BookmarkTagView.get_urls()]
+        self.assertNotIn("bookmarktag-autocomplete", names)
+
+    def test_search(self):
+        data = self.get_results(field="bookmark", q="carlton")
+        self.assertEqual(
+            data,
+            {
+                "results": [{"id": self.github.pk, "text": "Carlton Gibson - GitHub"}],
+                "next": None,
+            },
+        )
+        # Any of the search fields may match.
+        data = self.get_results(field="bookmark", q="https://www.django")
+        self.assertEqual([r["id"] for r in data["results"]], [self.django.pk])
+
+    def test_pages(self):
+        data = self.get_results(field="bookmark")
+        self.assertEqual(
+            [r["id"] for r in data["results"]], [self.homepage.pk, self.github.pk]
+        )
+        self.assertEqual(data["next"], self.github.pk)
+        data = self.get_results(field="bookmark", after=data["next"])
+        self.assertEqual([r["id"] for r in data["results"]], [self.django.pk])
+        self.assertIsNone(data["next"])
+
+    def test_invalid_parameters(self):
+        response = self.client.get("/autocompletetag/autocomplete/", {"field": "tag"})
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(
+            "/autocompletetag/autocomplete/", {"field": "bookmark", "after": "x"}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def get_view_results(self, view_class, **params):
+        view = view_class.as_view(role=Role.AUTOCOMPLETE)
+        response = view(RequestFactory().get("/", params))
+        self.assertEqual(response.status_code, 200)
+        return [r["id"] for r in json.loads(response.content)["results"]]
+
+    def test_choices_from_form_field(self):
+        class FavouriteTagForm(forms.ModelForm):
+            bookmark = forms.ModelChoiceField(Bookmark.objects.filter(favourite=True))
+
+            class Meta:
+                model = BookmarkTag
+                fields = ["bookmark", "tag"]
+
+        class FavouriteTagView(AutocompleteTagView):
+            form_class = FavouriteTagForm
+
+        Bookmark.objects.filter(pk=self.django.pk).update(favourite=True)
+        self.assertEqual(
+            self.get_view_results(FavouriteTagView, field="bookmark"),
+            [self.django.pk],
+        )
+
+    def test_choices_from_filter_field(self):
+        class FilterOnlyTagView(AutocompleteTagView):
+            fields = ["tag"]
+
+        self.assertEqual(
+            self.get_view_results(FilterOnlyTagView, field="bookmark", q="dj"),
+            [self.django.pk],
+        )
+
+        class NoFieldTagView(FilterOnlyTagView):
+            filterset_fields = None
+
+        view = NoFieldTagView.as_view(role=Role.AUTOCOMPLETE)
+        with self.assertRaises(Http404):
+            view(RequestFactory().get("/", {"field": "bookmark"}))
+
+    def test_form_renders_only_selected(self):
+        response = self.client.get(f"/autocompletetag/{self.tag.pk}/edit/")
+        self.assertContains(
+            response,
+            'data-autocomplete-url="/autocompletetag/autocomplete/?field=bookmark"',
+        )
+        self.assertContains(response, "neapolitan/autocomplete.js")
+        self.assertContains(response, "<option", count=1)
+        self.assertContains(
+            response, f'<option value="{self.django.pk}" selected>Django</option>'
+        )
+
+    def test_form_validates_any_choice(self):
+        response = self.client.post(
+            f"/autocompletetag/{self.tag.pk}/edit/",
+            {"bookmark": self.homepage.pk, "tag": "python"},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.tag.refresh_from_db()
+        self.assertEqual(self.tag.bookmark, self.homepage)
+
+    def test_filter(self):
+        response = self.client.get(
+            "/autocompletetag/", {"bookmark": self.django.pk}
+        )
+        form = response.context["filterset"].form
+        self.assertEqual(
+            form.fields["bookmark"].widget.attrs["data-autocomplete-url"],
+            "/autocompletetag/autocomplete/?field=bookmark",
+        )
+        self.assertContains(response, self.tag.tag)
+
+    def test_widget_not_replaced_unrouted(self):
+        class UnroutedTagView(AutocompleteTagView):
+            url_base = "unroutedtag"
+
+        form = UnroutedTagView(role=Role.CREATE).get_form()
+        self.assertNotIsInstance(form.fields["bookmark"].widget, AutocompleteSelect)
+
+    def test_async(self):
+        class AsyncAutocompleteTagView(AsyncCRUDView):
+            model = BookmarkTag
+            fields = ["bookmark", "tag"]
+            autocomplete_fields = {"bookmark": ["title"]}
+
+        view = AsyncAutocompleteTagView.as_view(role=Role.AUTOCOMPLETE)
+        request = RequestFactory().get("/", {"field": "bookmark", "q": "dj"})
+        response = async_to_sync(view)(request)
+        self.assertEqual(
+            json.loads(response.content),
+            {"results": [{"id": self.django.pk, "text": "Django"}], "next": None},
+        )
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.homepage = Bookmark.objects.create(
+            url="https://noumenal.es/",
+            title="Noumenal • Dr Carlton Gibson",
+            note="Carlton Gibson's homepage. Blog, Contact and Project links.",
+        )
+        cls.github = Bookmark.objects.create(
+            url="https://github.com/carltongibson",
+            title="Carlton Gibson - GitHub",
+        )
+        cls.django = Bookmark.objects.create(
+            url="https://www.djangoproject.com/",
+            title="Django",
+            note="The web framework for perfectionists with deadlines.",
+        )
+
+    def search(self, query, view_class=SearchBookmarkView):
+        view = view_class.as_view(role=Role.LIST)
+        request = RequestFactory().get("/", {"q": query})
+        return list(view(request).context_data["object_list"])
+
+    def test_default_backend(self):
+        self.assertIsInstance(
+            SearchBookmarkView().get_search_backend(), SQLiteFTS5Backend
+        )
+
+    def test_search(self):
+        self.assertEqual(self.search("gibson"), [self.homepage, self.github])
+        # Terms match word prefixes, in any of the fields.
+        self.assertEqual(self.search("perfect deadline"), [self.django])
+        self.assertEqual(self.search("gibson django"), [])
+        self.assertEqual(self.search(""), [self.homepage, self.github, self.django])
+
+    def test_get_filtered_queryset(self):
+        class NoGitHubView(SearchBookmarkView):
+            def get_filtered_queryset(self, queryset):
+                queryset, filterset = super().get_filtered_queryset(queryset)
+                return queryset.exclude(url__contains="github"), filterset
+
+        self.assertEqual(self.search("gibson", NoGitHubView), [self.homepage])
+
+        # The other roles acting on the filtered objects use it too.
+        view = NoGitHubView.as_view(role=Role.EXPORT)
+        response = view(RequestFactory().get("/", {"q": "gibson"}))
+        content = b"".join(response.streaming_content).decode()
+        self.assertIn("noumenal.es", content)
+        self.assertNotIn("github.com", content)
+
+        view = NoGitHubView(role=Role.BULK_DELETE)
+        view.setup(RequestFactory().get("/", {"select_all": "1"}))
+        self.assertEqual(set(view.get_bulk_queryset()), {self.homepage, self.django})
+
+    def test_query_syntax_is_literal(self):
+        self.assertEqual(self.search('"carlton'), [self.homepage, self.github])
+        self.assertEqual(self.search("AND NOT *"), [])
+
+    def test_contains_backend(self):
+        class ContainsSearchView(SearchBookmarkView):
+            search_backend = "contains"
+
+        self.assertEqual(self.search("ithu", ContainsSearchView), [self.github])
+        self.assertEqual(
+            self.search("GIBSON home", ContainsSearchView), [self.homepage]
+        )
+
+    def test_unknown_backend(self):
+        class UnknownSearchView(SearchBookmarkView):
+            search_backend = "whoosh"
+
+        with self.assertRaisesMessage(
+            ImproperlyConfigured,
+            "'UnknownSearchView' has an unknown search_backend 'whoosh'.",
+        ):
+            self.search("django", UnknownSearchView)
+
+    def test_index_follows_views(self):
+        response = self.client.post(
+            f"/searchbookmark/{self.django.pk}/edit/",
+            {"url": self.django.url, "title": "Django Project", "note": ""},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.search("project"), [self.homepage, self.django])
+        self.assertEqual(self.search("perfectionists"), [])
+
+        response = self.client.post(f"/searchbookmark/{self.github.pk}/delete/")
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.search("gibson"), [self.homepage])
+
+    def test_index_follows_signals(self):
+        bookmark = Bookmark.objects.create(
+            url="https://example.com/", title="Example Domain"
+        )
+        self.assertEqual(self.search("exam"), [bookmark])
+        bookmark.delete()
+        self.assertEqual(self.search("exam"), [])
+
+    def test_objects_changed(self):
+        Bookmark.objects.filter(pk=self.github.pk).update(title="Octocat")
+        self.assertEqual(self.search("octocat"), [])
+        SearchBookmarkView(role=Role.LIST).objects_changed([self.github.pk])
+        self.assertEqual(self.search("octocat"), [self.github])
+
+    def test_rebuild_command(self):
+        Bookmark.objects.bulk_create(
+            Bookmark(url=f"https://example.com/{n}/", title=f"Example {n}")
+            for n in range(3)
+        )
+        self.assertEqual(self.search("example"), [])
+        out = io.StringIO()
+        call_command("rebuild_search_index", "tests.bookmark", batch_size=2, stdout=out)
+        self.assertEqual(
+            out.getvalue(), "tests.Bookmark (title, note): indexed 6 objects.\n"
+        )
+        self.assertEqual(len(self.search("example")), 3)
+
+    def test_list_template(self):
+        response = self.client.get(
+            "/searchbookmark/", {"q": "gibson", "favourite": "true", "page": "2"}
+        )
+        self.assertContains(
+            response, '<input type="search" name="q" value="gibson"', html=False
+        )
+        self.assertContains(response, '<input type="hidden" name="favourite"')
+        self.assertNotContains(response, '<input type="hidden" name="page"')
+        self.assertContains(response, "No bookmarks match “gibson”.")
+
+    def test_async(self):
+        class AsyncSearchView(AsyncBookmarkView):
+            search_fields = ["title", "note"]
+
+        view = AsyncSearchView.as_view(role=Role.LIST)
+        request = RequestFactory().get("/", {"q": "django"})
+        response = async_to_sync(view)(request)
+        self.assertEqual(list(response.context_data["object_list"]), [self.django])
+
+    def test_get_crud_views(self):
+        views = get_crud_views()
+        self.assertIn(SearchBookmarkView, [type(view) for view in views])
+        self.assertEqual(
+            len([view for view in views if type(view) is BookmarkView]), 1
+        )
+
+
+class SuggestIndexesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.bookmark = Bookmark.objects.create(
+            url="https://noumenal.es/", title="Noumenal", favourite=True
+        )
+
+    def call(self, *args):
+        out = io.StringIO()
+        call_command("suggest_indexes", *args, stdout=out)
+        return out.getvalue()
+
+    def test_is_indexed(self):
+        self.assertIs(is_indexed(Bookmark, Bookmark._meta.get_field("url")), True)
+        self.assertIs(
+            is_indexed(Bookmark, Bookmark._meta.get_field("favourite"), "default"),
+            False,
+        )
+        # Foreign keys are indexed by default.
+        field = BookmarkTag._meta.get_field("bookmark")
+        self.assertIs(is_indexed(BookmarkTag, field), True)
+
+    def test_find_missing_indexes(self):
+        class OrderedTagView(BookmarkTagView):
+            filterset_fields = ["bookmark__title", "bookmark__url"]
+            ordering = ["-tag"]
+
+        missing = find_missing_indexes(OrderedTagView())
+        self.assertEqual(
+            [(index.model, index.field, index.reason) for index in missing],
+            [(Bookmark, "title", "filter"), (BookmarkTag, "tag", "ordering")],
+        )
+
+    def test_report(self):
+        output = self.call()
+        self.assertIn(
+            "tests.Bookmark (tests.tests.BookmarkView)\n"
+            "  filter favourite: no index on tests.Bookmark.favourite.\n"
+            "  filter favourite query: full table scan.\n",
+            output,
+        )
+        self.assertNotIn("NamedCollection", output)
+        self.assertIn(
+            "  tests.Bookmark: models.Index(fields=['favourite'], "
+            "name='tests_bookm_favouri_5f2e19_idx')\n",
+            output,
+        )
+
+    def test_no_explain(self):
+        output = self.call("--no-explain")
+        self.assertNotIn("query:", output)
+        self.assertIn("filter favourite: no index", output)
+
+    def test_plan_problems(self):
+        self.assertEqual(
+            get_plan_problems(
+                "3 0 0 SCAN tests_bookmark\n"
+                "10 0 0 USE TEMP B-TREE FOR ORDER BY",
+                "sqlite",
+            ),
+            ["full table scan", "sort"],
+        )
+        self.assertEqual(
+            get_plan_problems(
+                "3 0 0 SEARCH tests_bookmark USING INDEX x (favourite=?)", "sqlite"
+            ),
+            [],
+        )
+        self.assertEqual(
+            get_plan_problems("3 0 0 SCAN tests_bookmark", "sqlite", filtered=False),
+            [],
+        )
+        self.assertEqual(
+            get_plan_problems(
+                "Sort  (cost=1.0..2.0)\n  ->  Seq Scan on tests_bookmark",
+                "postgresql",
+            ),
+            ["full table scan", "sort"],
+        )
+
+    def test_write_migrations(self):
+        path = os.path.join(
+            os.path.dirname(__file__), "migrations", "0006_neapolitan_indexes.py"
+        )
+        self.addCleanup(lambda: os.path.exists(path) and os.remove(path))
+        output = self.call("--write-migrations", "--no-explain")
+        self.assertIn(f"Wrote {path}.", output)
+        with open(path) as f:
+            migration = f.read()
+        self.assertIn("('tests', '0005_readinglist')", migration)
+        self.assertIn("migrations.AddIndex(", migration)
+        self.assertIn("fields=['favourite']", migration)
+
+
+class SortBookmarkView(BookmarkView):
+    ordering_fields = ["url", "title"]
+
+
+class OrderingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.homepage = Bookmark.objects.create(
+            url="https://noumenal.es/", title="Noumenal", favourite=True
+        )
+        cls.github = Bookmark.objects.create(
+            url="https://github.com/carltongibson", title="GitHub"
+        )
+        cls.django = Bookmark.objects.create(
+            url="https://www.djangoproject.com/", title="Django", favourite=True
+        )
+
+    def get(self, view_class=SortBookmarkView, **params):
+        view = view_class.as_view(role=Role.LIST)
+        return view(RequestFactory().get("/", params))
+
+    def test_requested_ordering(self):
+        response = self.get(ordering="-title")
+        self.assertEqual(
+            list(response.context_data["object_list"]),
+            [self.homepage, self.github, self.django],
+        )
+        view = response.context_data["view"]
+        self.assertEqual(view.get_ordering(), ["-title", "pk"])
+        response = self.get(ordering="url,-title")
+        self.assertEqual(
+            response.context_data["view"].get_ordering(), ["url", "-title", "pk"]
+        )
+
+    def test_invalid_ordering_ignored(self):
+        for ordering in ["note", "title,note", "--title", ""]:
+            with self.subTest(ordering=ordering):
+                response = self.get(ordering=ordering)
+                view = response.context_data["view"]
+                self.assertEqual(view.get_ordering(), ["pk"])
+
+    def test_default_ordering(self):
+        class DefaultOrderingView(SortBookmarkView):
+            ordering = ["title"]
+
+        response = self.get(DefaultOrderingView)
+        self.assertEqual(
+            list(response.context_data["object_list"]),
+            [self.django, self.github, self.homepage],
+        )
+        self.assertEqual(response.context_data["view"].get_ordering(), ["title", "pk"])
+        # Without ordering_fields, the ordering is left as is.
+        self.assertIsNone(BookmarkView().get_ordering())
+
+    def test_sort_links(self):
+        response = self.get(ordering="title", favourite="true", page="2")
+        links = response.context_data["view"].get_sort_links()
+        self.assertEqual(
+            links,
+            {
+                "url": {"url": "?ordering=url&favourite=true", "direction": None},
+                "title": {
+                    "url": "?ordering=-title&favourite=true",
+                    "direction": "ascending",
+                },
+            },
+        )
+
+    def test_sortable_headers(self):
+        class PaginatedSortView(SortBookmarkView):
+            paginate_by = 2
+
+        response = self.get(PaginatedSortView, ordering="-title").render()
+        self.assertContains(
+            response,
+            '<th scope="col" aria-sort="descending" class="py-3.5 px-3 text-left '
+            'text-sm font-semibold text-gray-900"><a href="?ordering=title">Title ▼'
+            "</a></th>",
+            html=True,
+        )
+        self.assertContains(
+            response,
+            '<th scope="col" class="py-3.5 px-3 text-left text-sm font-semibold '
+            'text-gray-900"><a href="?ordering=url">Url</a></th>',
+            html=True,
+        )
+        self.assertContains(response, "Note</th>")
+
+    def test_compiled_headers_match_template(self):
+        view = SortBookmarkView(role=Role.LIST)
+        view.request = RequestFactory().get("/", {"ordering": "-url", "q": "a&b"})
+        objects = list(Bookmark.objects.all())
+        context = Context({"objects": objects, "view": view})
+        expected = Template("{% load neapolitan %}{% object_list objects view %}")
+        compiled = Template(
+            "{% load neapolitan %}{% render_object_list objects view %}"
+        )
+        self.assertHTMLEqual(compiled.render(context), expected.render(context))
+        self.assertIn('href="?ordering=url&amp;q=a%26b"', compiled.render(context))
+
+    def test_cursor_pagination(self):
+        class CursorSortView(SortBookmarkView):
+            paginate_by = 2
+            pagination_mode = "cursor"
+
+        response = self.get(CursorSortView, ordering="-title")
+        self.assertEqual(
+            list(response.context_data["object_list"]), [self.homepage, self.github]
+        )
+        response = self.get(
+            CursorSortView,
+            ordering="-title",
+            page=response.context_data["next_cursor"],
+        )
+        self.assertEqual(list(response.context_data["object_list"]), [self.django])
+
+    def test_check(self):
+        self.assertEqual(check_ordering_indexes(), [])
+        warnings = check_ordering_fields(SortBookmarkView())
+        self.assertEqual([warning.id for warning in warnings], ["neapolitan.W001"])
+        self.assertEqual(
+            warnings[0].msg,
+            "SortBookmarkView.ordering_fields includes 'title', which has no index.",
+        )
+        self.assertIs(warnings[0].obj, SortBookmarkView)
+        missing = find_missing_indexes(SortBookmarkView())
+        self.assertIn(
+            (Bookmark, "title", "ordering_fields"),
+            [(index.model, index.field, index.reason) for index in missing],
+        )